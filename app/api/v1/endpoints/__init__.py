@@ -1,3 +1,8 @@
-from app.api.v1.endpoints import auth, users, companies, invoices, dashboard
+from app.api.v1.endpoints import (
+    auth, users, companies, invoices, dashboard, api_keys, async_invoices, async_dashboard
+)
 
-__all__ = ["auth", "users", "companies", "invoices", "dashboard"]
+__all__ = [
+    "auth", "users", "companies", "invoices", "dashboard", "api_keys",
+    "async_invoices", "async_dashboard"
+]
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.orm import Session
+from typing import List
+from app.db.database import get_db, get_writer
+from app.db.write_queue import RequestWriter
+from app.db.lazy_session import SessionReleasingRoute
+from app.schemas.api_key import ApiKeyCreate, ApiKeyOut, ApiKeyCreated
+from app.services.api_key_service import ApiKeyService
+from app.core.dependencies import require_roles
+from app.models.user import User, RoleEnum
+
+router = APIRouter(prefix="/api-keys", tags=["api-keys"], route_class=SessionReleasingRoute)
+
+
+@router.get("/", response_model=List[ApiKeyOut])
+def list_api_keys(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(RoleEnum.superadmin))
+):
+    """List all API keys (SuperAdmin only)"""
+    api_key_service = ApiKeyService(db)
+    return api_key_service.get_all_api_keys()
+
+
+@router.post("/", response_model=ApiKeyCreated, status_code=status.HTTP_201_CREATED)
+def create_api_key(
+    key_data: ApiKeyCreate,
+    writer: RequestWriter = Depends(get_writer),
+    current_user: User = Depends(require_roles(RoleEnum.superadmin))
+):
+    """Create an API key for a service account (SuperAdmin only)
+    
+    The plain key is returned only once; only its hash is stored.
+    """
+    api_key, plain_key = writer.run(
+        lambda write_db: ApiKeyService(write_db).create_api_key(key_data, current_user)
+    )
+    return ApiKeyCreated(**ApiKeyOut.model_validate(api_key).model_dump(), key=plain_key)
+
+
+@router.delete("/{api_key_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_api_key(
+    api_key_id: int,
+    writer: RequestWriter = Depends(get_writer),
+    current_user: User = Depends(require_roles(RoleEnum.superadmin))
+):
+    """Revoke an API key (SuperAdmin only)"""
+    writer.run(lambda write_db: ApiKeyService(write_db).delete_api_key(api_key_id))
+    return None
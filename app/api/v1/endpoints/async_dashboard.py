@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.db.statement_timeout import query_budget
+from app.services.async_invoice_service import AsyncInvoiceService
+from app.core.config import settings
+from app.core.dependencies import get_tenant_scope_async
+from app.core.tenancy import TenantScope
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard (async)"])
+
+
+@router.get("/stats", dependencies=[Depends(query_budget(settings.DASHBOARD_QUERY_BUDGET_MS))])
+async def get_stats(
+    db: AsyncSession = Depends(get_async_db),
+    scope: TenantScope = Depends(get_tenant_scope_async)
+):
+    """Get dashboard statistics"""
+    invoice_service = AsyncInvoiceService(db, scope)
+    return await invoice_service.get_dashboard_stats()
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.db.database import get_async_db
+from app.db.statement_timeout import query_budget
+from app.schemas.invoice import InvoiceOut, InvoiceWithCompany
+from app.services.async_invoice_service import AsyncInvoiceService
+from app.core.config import settings
+from app.core.dependencies import get_tenant_scope_async
+from app.core.tenancy import TenantScope
+
+router = APIRouter(prefix="/invoices", tags=["invoices (async)"])
+
+
+@router.get(
+    "/",
+    response_model=List[InvoiceWithCompany],
+    dependencies=[Depends(query_budget(settings.INVOICE_LIST_QUERY_BUDGET_MS))]
+)
+async def list_invoices(
+    company_id: Optional[int] = None,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    is_paid: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db),
+    scope: TenantScope = Depends(get_tenant_scope_async)
+):
+    """List invoices with optional filters"""
+    invoice_service = AsyncInvoiceService(db, scope)
+    return await invoice_service.get_all_invoices(
+        company_id=company_id,
+        month=month,
+        year=year,
+        is_paid=is_paid
+    )
+
+
+@router.get("/calendar")
+async def get_calendar(
+    month: int,
+    year: int,
+    company_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    scope: TenantScope = Depends(get_tenant_scope_async)
+):
+    """Get calendar data for a specific month"""
+    invoice_service = AsyncInvoiceService(db, scope)
+    return await invoice_service.get_calendar_data(month, year, company_id)
+
+
+@router.get("/by-date")
+async def get_invoices_by_date(
+    date: str,
+    company_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    scope: TenantScope = Depends(get_tenant_scope_async)
+):
+    """Get invoices for a specific date"""
+    try:
+        target_date = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Data inválida. Use YYYY-MM-DD"
+        )
+    
+    invoice_service = AsyncInvoiceService(db, scope)
+    return await invoice_service.get_invoices_by_date(target_date, company_id)
+
+
+@router.get("/{invoice_id}", response_model=InvoiceOut)
+async def get_invoice(
+    invoice_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    scope: TenantScope = Depends(get_tenant_scope_async)
+):
+    """Get a specific invoice"""
+    invoice_service = AsyncInvoiceService(db, scope)
+    return await invoice_service.get_invoice_by_id(invoice_id)
@@ -2,13 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.db.database import get_db
+from app.db.lazy_session import SessionReleasingRoute
 from app.schemas.token import Token
 from app.schemas.user import UserOut
 from app.services.auth_service import AuthService
 from app.core.dependencies import get_current_user
 from app.models.user import User
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=SessionReleasingRoute)
 
 
 @router.post("/login", response_model=Token)
@@ -1,84 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
+from typing import List, Optional
+from app.db.database import get_db, get_writer
+from app.db.lazy_session import SessionReleasingRoute
+from app.db.write_queue import RequestWriter
 from app.schemas.company import CompanyCreate, CompanyUpdate, CompanyOut
 from app.services.company_service import CompanyService
-from app.core.dependencies import require_roles, get_current_user
+from app.core.dependencies import require_roles, get_tenant_scope, get_expected_version
+from app.core.concurrency import ETAG_HEADER, make_etag
+from app.core.tenancy import TenantScope
 from app.models.user import User, RoleEnum
 
-router = APIRouter(prefix="/companies", tags=["companies"])
+router = APIRouter(prefix="/companies", tags=["companies"], route_class=SessionReleasingRoute)
 
 
 @router.get("/", response_model=List[CompanyOut])
 def list_companies(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """List companies (users see only their company, admins see all)"""
-    company_service = CompanyService(db)
-    
-    if current_user.role == RoleEnum.user:
-        # Users can only see their own company
-        if not current_user.company_id:
-            return []
-        company = company_service.get_company_by_id(current_user.company_id)
-        return [company]
-    
-    # Admins and superadmins see all companies
+    company_service = CompanyService(db, scope)
     return company_service.get_all_companies()
 
 
 @router.get("/{company_id}", response_model=CompanyOut)
 def get_company(
     company_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Get a specific company"""
-    company_service = CompanyService(db)
+    company_service = CompanyService(db, scope)
     company = company_service.get_company_by_id(company_id)
-    
-    # Users can only access their own company
-    if current_user.role == RoleEnum.user and current_user.company_id != company_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Permissão negada"
-        )
-    
+    response.headers[ETAG_HEADER] = make_etag(company.version)
     return company
 
 
 @router.post("/", response_model=CompanyOut, status_code=status.HTTP_201_CREATED)
 def create_company(
     company_data: CompanyCreate,
-    db: Session = Depends(get_db),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
 ):
     """Create a new company (Admin only)"""
-    company_service = CompanyService(db)
-    return company_service.create_company(company_data)
+    return writer.run(lambda db: CompanyService(db).create_company(company_data))
 
 
 @router.put("/{company_id}", response_model=CompanyOut)
 def update_company(
     company_id: int,
     company_data: CompanyUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    expected_version: Optional[int] = Depends(get_expected_version),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
 ):
     """Update a company (Admin only)"""
-    company_service = CompanyService(db)
-    return company_service.update_company(company_id, company_data)
+    company = writer.run(
+        lambda db: CompanyService(db).update_company(company_id, company_data, expected_version)
+    )
+    response.headers[ETAG_HEADER] = make_etag(company.version)
+    return company
 
 
 @router.delete("/{company_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_company(
     company_id: int,
-    db: Session = Depends(get_db),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
 ):
     """Delete a company (Admin only)"""
-    company_service = CompanyService(db)
-    company_service.delete_company(company_id)
+    writer.run(lambda db: CompanyService(db).delete_company(company_id))
     return None
@@ -1,24 +1,21 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_read_db
+from app.db.lazy_session import SessionReleasingRoute
+from app.db.statement_timeout import query_budget
 from app.services.invoice_service import InvoiceService
-from app.core.dependencies import get_current_user
-from app.models.user import User, RoleEnum
+from app.core.config import settings
+from app.core.dependencies import get_tenant_scope
+from app.core.tenancy import TenantScope
 
-router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/dashboard", tags=["dashboard"], route_class=SessionReleasingRoute)
 
 
-@router.get("/stats")
+@router.get("/stats", dependencies=[Depends(query_budget(settings.DASHBOARD_QUERY_BUDGET_MS))])
 def get_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Get dashboard statistics"""
-    invoice_service = InvoiceService(db)
-    
-    # Users can only see stats for their company
-    company_id = None
-    if current_user.role == RoleEnum.user:
-        company_id = current_user.company_id
-    
-    return invoice_service.get_dashboard_stats(company_id)
+    invoice_service = InvoiceService(db, scope)
+    return invoice_service.get_dashboard_stats()
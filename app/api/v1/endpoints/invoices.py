@@ -1,33 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import re
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile as FormFile
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional
 from datetime import datetime
-from app.db.database import get_db
-from app.schemas.invoice import InvoiceCreate, InvoiceUpdate, InvoiceOut, InvoiceWithCompany
+from app.db.database import get_db, get_read_db, get_writer
+from app.db.lazy_session import SessionReleasingRoute
+from app.db.statement_timeout import query_budget
+from app.db.write_queue import RequestWriter
+from app.schemas.invoice import (
+    InvoiceCreate,
+    InvoiceUpdate,
+    InvoiceOut,
+    InvoiceWithCompany,
+    UploadSessionCreate,
+    UploadSessionOut
+)
 from app.services.invoice_service import InvoiceService
-from app.core.dependencies import require_roles, get_current_user
+from app.services.stored_file_service import StoredFileService
+from app.services.idempotency_service import (
+    IdempotencyService,
+    IDEMPOTENCY_HEADER,
+    request_fingerprint
+)
+from app.core.config import settings
+from app.core.dependencies import require_roles, get_tenant_scope, get_expected_version
+from app.core.concurrency import ETAG_HEADER, make_etag
+from app.core.tenancy import TenantScope
+from app.models.idempotency_key import IdempotencyKey
+from app.models.invoice import Invoice
 from app.models.user import User, RoleEnum
-from app.utils.file_handler import FileHandler
+from app.utils.file_handler import FileHandler, content_url, not_a_pdf, too_large, upload_slot
+from app.utils.invoice_archive import stream_invoice_archive
+from app.utils.resumable_upload import UPLOAD_OFFSET_HEADER, resumable_uploads
 
-router = APIRouter(prefix="/invoices", tags=["invoices"])
+router = APIRouter(prefix="/invoices", tags=["invoices"], route_class=SessionReleasingRoute)
 
+# How a bulk-uploaded file names its invoice: field "123", or file 123.pdf / fatura-123.pdf
+BULK_FIELD_ID = re.compile(r"\d+", re.ASCII)
+BULK_FILENAME_ID = re.compile(r"(?:.*[-_ ])?(\d+)\.pdf", re.ASCII | re.IGNORECASE)
 
-@router.get("/", response_model=List[InvoiceWithCompany])
+
+@router.get(
+    "/",
+    response_model=List[InvoiceWithCompany],
+    dependencies=[Depends(query_budget(settings.INVOICE_LIST_QUERY_BUDGET_MS))]
+)
 def list_invoices(
     company_id: Optional[int] = None,
     month: Optional[int] = None,
     year: Optional[int] = None,
     is_paid: Optional[bool] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """List invoices with optional filters"""
-    invoice_service = InvoiceService(db)
-    
-    # Users can only see invoices from their company
-    if current_user.role == RoleEnum.user:
-        company_id = current_user.company_id
-    
+    invoice_service = InvoiceService(db, scope)
     return invoice_service.get_all_invoices(
         company_id=company_id,
         month=month,
@@ -41,16 +71,11 @@ def get_calendar(
     month: int,
     year: int,
     company_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Get calendar data for a specific month"""
-    invoice_service = InvoiceService(db)
-    
-    # Users can only see their company's data
-    if current_user.role == RoleEnum.user:
-        company_id = current_user.company_id
-    
+    invoice_service = InvoiceService(db, scope)
     return invoice_service.get_calendar_data(month, year, company_id)
 
 
@@ -58,8 +83,8 @@ def get_calendar(
 def get_invoices_by_date(
     date: str,
     company_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Get invoices for a specific date"""
     try:
@@ -70,109 +95,466 @@ def get_invoices_by_date(
             detail="Data inválida. Use YYYY-MM-DD"
         )
     
-    invoice_service = InvoiceService(db)
-    
-    # Users can only see their company's data
-    if current_user.role == RoleEnum.user:
-        company_id = current_user.company_id
-    
+    invoice_service = InvoiceService(db, scope)
     return invoice_service.get_invoices_by_date(target_date, company_id)
 
 
+@router.get("/archive")
+def download_invoice_archive(
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=1),
+    company_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    scope: TenantScope = Depends(get_tenant_scope)
+):
+    """Download the PDFs of a month's invoices as one ZIP
+    
+    The ZIP (store mode, with a CSV manifest) is built while it is sent,
+    never in memory or on disk; see app/utils/invoice_archive.py.
+    """
+    invoices = InvoiceService(db, scope).get_month_archive(month, year, company_id)
+    company_id = scope.default_company(company_id)
+    filename = f"faturas-{year}-{month:02d}.zip"
+    if company_id is not None:
+        filename = f"faturas-{company_id}-{year}-{month:02d}.zip"
+    return StreamingResponse(
+        stream_invoice_archive(invoices),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/{invoice_id}", response_model=InvoiceOut)
 def get_invoice(
     invoice_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Get a specific invoice"""
-    invoice_service = InvoiceService(db)
+    invoice_service = InvoiceService(db, scope)
     invoice = invoice_service.get_invoice_by_id(invoice_id)
-    
-    # Users can only access invoices from their company
-    if current_user.role == RoleEnum.user and invoice.company_id != current_user.company_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Permissão negada"
-        )
-    
+    response.headers[ETAG_HEADER] = make_etag(invoice.version)
     return invoice
 
 
 @router.post("/", response_model=InvoiceOut, status_code=status.HTTP_201_CREATED)
 def create_invoice(
     invoice_data: InvoiceCreate,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
 ):
-    """Create a new invoice (Admin only)"""
-    invoice_service = InvoiceService(db)
-    return invoice_service.create_invoice(invoice_data, current_user.id)
+    """Create a new invoice (Admin only)
+    
+    With an Idempotency-Key header, a retried request gets the stored
+    response instead of creating the invoice again. The response is stored
+    in the same write job as the invoice, so both commit or neither does.
+    """
+    record = None
+    if idempotency_key:
+        fingerprint = request_fingerprint("POST /invoices", invoice_data.model_dump_json())
+        record = writer.run(
+            lambda write_db: IdempotencyService(write_db).begin(idempotency_key, current_user.id, fingerprint)
+        )
+        if record.is_complete:
+            return IdempotencyService.replay(record)
+    
+    def create(write_db: Session):
+        invoice = InvoiceService(write_db).create_invoice(invoice_data, current_user.id)
+        if record is not None:
+            body = InvoiceOut.model_validate(invoice).model_dump(mode="json")
+            IdempotencyService(write_db).complete(record, status.HTTP_201_CREATED, body)
+        return invoice
+    
+    try:
+        return writer.run(create)
+    except Exception:
+        if record is not None:
+            writer.run(lambda write_db: IdempotencyService(write_db).release(record))
+        raise
 
 
 @router.put("/{invoice_id}", response_model=InvoiceOut)
 def update_invoice(
     invoice_id: int,
     invoice_data: InvoiceUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    expected_version: Optional[int] = Depends(get_expected_version),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
 ):
     """Update an invoice (Admin only)"""
-    invoice_service = InvoiceService(db)
-    return invoice_service.update_invoice(invoice_id, invoice_data)
+    invoice = writer.run(
+        lambda db: InvoiceService(db).update_invoice(invoice_id, invoice_data, expected_version)
+    )
+    response.headers[ETAG_HEADER] = make_etag(invoice.version)
+    return invoice
 
 
 @router.patch("/{invoice_id}/toggle-paid", response_model=InvoiceOut)
 def toggle_paid(
     invoice_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    expected_version: Optional[int] = Depends(get_expected_version),
+    writer: RequestWriter = Depends(get_writer),
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Toggle paid status of an invoice"""
-    invoice_service = InvoiceService(db)
-    invoice = invoice_service.get_invoice_by_id(invoice_id)
-    
-    # Users can only toggle invoices from their company
-    if current_user.role == RoleEnum.user and invoice.company_id != current_user.company_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Permissão negada"
-        )
-    
-    return invoice_service.toggle_paid_status(invoice_id)
+    invoice = writer.run(
+        lambda db: InvoiceService(db, scope).toggle_paid_status(invoice_id, expected_version)
+    )
+    response.headers[ETAG_HEADER] = make_etag(invoice.version)
+    return invoice
 
 
 @router.delete("/{invoice_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_invoice(
     invoice_id: int,
-    db: Session = Depends(get_db),
+    expected_version: Optional[int] = Depends(get_expected_version),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
 ):
     """Delete an invoice (Admin only)"""
-    invoice_service = InvoiceService(db)
-    invoice_service.delete_invoice(invoice_id)
+    writer.run(lambda db: InvoiceService(db).delete_invoice(invoice_id, expected_version))
     return None
 
 
+def bulk_invoice_id(field: str, filename: Optional[str]) -> Optional[int]:
+    """Invoice a bulk-uploaded file is for: its field name, else its file name"""
+    if BULK_FIELD_ID.fullmatch(field):
+        return int(field)
+    match = BULK_FILENAME_ID.fullmatch(filename or "")
+    return int(match.group(1)) if match else None
+
+
+def _bulk_failed(result: dict, status_code: int, detail: str) -> None:
+    result.update(status=status_code, detail=detail)
+
+
+@router.post("/bulk-upload")
+async def bulk_upload_invoice_files(
+    request: Request,
+    db: Session = Depends(get_db),
+    writer: RequestWriter = Depends(get_writer),
+    current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
+):
+    """Attach many PDFs to their invoices in one request (Admin only)
+    
+    A multipart form whose files name their invoice by field name (the
+    invoice id) or by file name (123.pdf, fatura-123.pdf). Each file is
+    validated, hashed and streamed to storage on its own, and a file that
+    fails only fails itself; the invoices of all accepted files are then
+    updated in a single transaction. The response reports every file.
+    The declared body size is checked before any part is parsed.
+    """
+    content_length = request.headers.get("content-length", "")
+    if not content_length.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_411_LENGTH_REQUIRED,
+            detail="Informe o Content-Length do envio em lote"
+        )
+    if int(content_length) > settings.BULK_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Envio em lote excede o tamanho máximo de {settings.BULK_UPLOAD_MAX_BYTES // (1024 * 1024)} MB"
+        )
+    async with request.form(max_files=settings.BULK_UPLOAD_MAX_FILES) as form:
+        files = [(field, value) for field, value in form.multi_items() if isinstance(value, FormFile)]
+        return await _bulk_attach(files, db, writer)
+
+
+async def _bulk_attach(files: list[tuple[str, FormFile]], db: Session, writer: RequestWriter) -> dict:
+    """Validate, store and attach (field, file) pairs; one result per file
+    
+    An invoice is claimed by the first of its files that passes inspection,
+    so an invalid file does not block a valid one sent after it. The
+    session's queries run in the threadpool, off the event loop.
+    """
+    results = [
+        {"field": field, "filename": file.filename, "invoice_id": bulk_invoice_id(field, file.filename)}
+        for field, file in files
+    ]
+    named = list({result["invoice_id"] for result in results if result["invoice_id"] is not None})
+    existing = {invoice.id for invoice in await run_in_threadpool(InvoiceService(db).get_invoices_by_ids, named)}
+    
+    inspected, claimed = [], set()
+    for result, (_, file) in zip(results, files):
+        invoice_id = result["invoice_id"]
+        if invoice_id is None:
+            _bulk_failed(result, status.HTTP_400_BAD_REQUEST, "Fatura não identificada pelo campo nem pelo nome do arquivo")
+        elif invoice_id not in existing:
+            _bulk_failed(result, status.HTTP_404_NOT_FOUND, "Fatura não encontrada")
+        elif invoice_id in claimed:
+            _bulk_failed(result, status.HTTP_409_CONFLICT, "Mais de um arquivo para a mesma fatura")
+        else:
+            try:
+                contents_hash, size = await FileHandler.inspect(file)
+            except HTTPException as exc:
+                _bulk_failed(result, exc.status_code, exc.detail)
+            else:
+                claimed.add(invoice_id)
+                inspected.append((result, file, contents_hash, size))
+    
+    # Contents already stored, or repeated within the batch, are written once
+    hashes = list({contents_hash for _, _, contents_hash, _ in inspected})
+    known = {
+        stored_file.sha256
+        for stored_file in await run_in_threadpool(StoredFileService(db).get_by_sha256s, hashes)
+    }
+    stored, saved = set(known), []
+    for result, file, contents_hash, size in inspected:
+        if contents_hash not in stored:
+            try:
+                await FileHandler.save_file(file, contents_hash)
+            except HTTPException as exc:
+                _bulk_failed(result, exc.status_code, exc.detail)
+                continue
+            stored.add(contents_hash)
+        saved.append((result, file, contents_hash, size))
+    
+    def attach(write_db: Session) -> tuple[list[Invoice], set[str]]:
+        # Rows seen above but released since leave their files to the sweeper
+        still_known = {stored_file.sha256 for stored_file in StoredFileService(write_db).get_by_sha256s(list(known))}
+        entries = [(result["invoice_id"], contents_hash, size) for result, _, contents_hash, size in saved]
+        return InvoiceService(write_db).attach_files(entries), known - still_known
+    
+    # One transaction and one commit for every accepted file. An invoice
+    # deleted since the lookup is skipped; its file is left to the sweeper
+    attached, released = set(), set()
+    if saved:
+        invoices, released = await writer.run_async(attach)
+        attached = {invoice.id for invoice in invoices}
+    
+    # A released file is kept from a running sweep, or stored again
+    unrestored = {}
+    for contents_hash in released:
+        if not await run_in_threadpool(FileHandler.touch_file, content_url(contents_hash)):
+            file = next(file for _, file, saved_hash, _ in saved if saved_hash == contents_hash)
+            try:
+                await FileHandler.save_file(file, contents_hash)
+            except HTTPException as exc:
+                unrestored[contents_hash] = exc
+    
+    for result, _, contents_hash, size in saved:
+        if result["invoice_id"] not in attached:
+            _bulk_failed(result, status.HTTP_404_NOT_FOUND, "Fatura não encontrada")
+        elif contents_hash in unrestored:
+            _bulk_failed(result, unrestored[contents_hash].status_code, unrestored[contents_hash].detail)
+        else:
+            result.update(status=status.HTTP_200_OK, file_url=content_url(contents_hash), sha256=contents_hash, size=size)
+    succeeded = sum(result.get("status") == status.HTTP_200_OK for result in results)
+    return {"attached": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+@router.get("/{invoice_id}/file")
+def download_invoice_file(
+    invoice_id: int,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_read_db),
+    scope: TenantScope = Depends(get_tenant_scope)
+):
+    """Download the PDF of an invoice
+    
+    Only invoices in the caller's tenant scope are served. The session is
+    released before the file is sent. Only the proxy's X-Accel-Redirect keeps
+    the bytes out of Python: FileResponse reads the file in chunks in the
+    worker unless the server supports the ``http.response.pathsend``
+    extension, which uvicorn does not.
+    """
+    invoice = InvoiceService(db, scope).get_invoice_by_id(invoice_id)
+    stored = invoice.stored_file
+    return FileHandler.file_response(
+        invoice.file_url,
+        if_none_match,
+        etag=stored.etag if stored else None,
+        filename=f"fatura-{invoice.id}.pdf"
+    )
+
+
 @router.post("/{invoice_id}/upload")
 async def upload_invoice_file(
     invoice_id: int,
+    response: Response,
     file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     db: Session = Depends(get_db),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
 ):
-    """Upload PDF file for an invoice (Admin only)"""
-    invoice_service = InvoiceService(db)
-    invoice = invoice_service.get_invoice_by_id(invoice_id)
+    """Upload PDF file for an invoice (Admin only)
+    
+    With an Idempotency-Key header, a retried upload gets the stored
+    response instead of storing the PDF again. The file is stored under the
+    SHA-256 of its contents, which is also returned as a strong ETag.
+    """
+    # Validated and hashed chunk by chunk, so nothing ever holds the whole file
+    contents_hash, size = await FileHandler.inspect(file)
+    record = None
+    if idempotency_key:
+        fingerprint = request_fingerprint(f"POST /invoices/{invoice_id}/upload", file.filename, contents_hash)
+        record = await writer.run_async(
+            lambda write_db: IdempotencyService(write_db).begin(idempotency_key, current_user.id, fingerprint)
+        )
+        if record.is_complete:
+            return IdempotencyService.replay(record)
+    
+    try:
+        body = await _attach_file(
+            invoice_id, contents_hash, size, lambda: FileHandler.save_file(file, contents_hash), db, writer, record
+        )
+    except Exception:
+        if record is not None:
+            await writer.run_async(
+                lambda write_db: IdempotencyService(write_db).release(record)
+            )
+        raise
+    
+    response.headers[ETAG_HEADER] = f'"{contents_hash}"'
+    return body
+
+
+async def _attach_file(
+    invoice_id: int,
+    contents_hash: str,
+    size: int,
+    save: Callable[[], Awaitable[str]],
+    db: Session,
+    writer: RequestWriter,
+    idempotency_record: Optional[IdempotencyKey] = None
+) -> dict:
+    """Store an upload's contents unless known and point the invoice at them
     
-    # Delete old file if exists
-    if invoice.file_url:
-        FileHandler.delete_file(invoice.file_url)
+    The invoice is read once, by the write job: a missing one fails there
+    with 404, and a file saved for it is left to the upload sweeper.
+    """
+    # Identical contents are already on disk: the stored file row says so
+    # without a stat call, and the upload costs no write
+    known = await run_in_threadpool(StoredFileService(db).get_by_sha256, contents_hash) is not None
+    if not known:
+        await save()
     
-    # Save new file
-    file_url = await FileHandler.save_file(file)
+    file_url = content_url(contents_hash)
+    body = {"ok": True, "file_url": file_url, "sha256": contents_hash, "size": size}
     
-    # Update invoice with new file URL
-    invoice = invoice_service.update_invoice(invoice_id, InvoiceUpdate(file_url=file_url))
+    def attach(write_db: Session) -> bool:
+        # The row seen above may have been released since, leaving its file
+        # to the sweeper; the new row then needs the file kept or restored
+        released = known and StoredFileService(write_db).get_by_sha256(contents_hash) is None
+        InvoiceService(write_db).attach_file(invoice_id, contents_hash, size)
+        if idempotency_record is not None:
+            IdempotencyService(write_db).complete(
+                idempotency_record, status.HTTP_200_OK, body, {ETAG_HEADER: f'"{contents_hash}"'}
+            )
+        return released
     
-    return {"ok": True, "file_url": file_url}
+    # The previous file is left to the upload sweeper (app/db/sweep_uploads.py)
+    if await writer.run_async(attach) and not await run_in_threadpool(FileHandler.touch_file, file_url):
+        await save()
+    return body
+
+
+@router.post("/{invoice_id}/uploads", response_model=UploadSessionOut, status_code=status.HTTP_201_CREATED)
+def create_upload_session(
+    invoice_id: int,
+    data: UploadSessionCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
+):
+    """Start a resumable upload of an invoice's PDF (Admin only)
+    
+    The file is then sent with PATCH requests carrying an Upload-Offset
+    header, over as many connections as it takes, and attached to the
+    invoice by completing the session. With sha256, the received bytes are
+    checked against it on completion.
+    """
+    InvoiceService(db).get_invoice_by_id(invoice_id)
+    if not data.filename.lower().endswith(".pdf"):
+        raise not_a_pdf()
+    if data.size > settings.UPLOAD_MAX_BYTES:
+        raise too_large()
+    
+    session = resumable_uploads.create(invoice_id, current_user.id, data.filename, data.size, data.sha256)
+    response.headers["Location"] = str(
+        request.url_for("get_upload_session", invoice_id=invoice_id, upload_id=session.id)
+    )
+    response.headers[UPLOAD_OFFSET_HEADER] = "0"
+    return resumable_uploads.status(session)
+
+
+@router.get("/{invoice_id}/uploads/{upload_id}", response_model=UploadSessionOut)
+def get_upload_session(
+    invoice_id: int,
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
+):
+    """Offset to resume a resumable upload from"""
+    session = resumable_uploads.get(upload_id, invoice_id, current_user.id)
+    status_body = resumable_uploads.status(session)
+    response.headers[UPLOAD_OFFSET_HEADER] = str(status_body["offset"])
+    response.headers["Cache-Control"] = "no-store"
+    return status_body
+
+
+@router.patch("/{invoice_id}/uploads/{upload_id}", response_model=UploadSessionOut)
+async def append_upload_chunk(
+    invoice_id: int,
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias=UPLOAD_OFFSET_HEADER),
+    current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
+):
+    """Append the request body to a resumable upload at Upload-Offset
+    
+    The body is streamed to disk in chunks as it arrives. A mismatched
+    offset gets 409 with the current one in the Upload-Offset header.
+    """
+    session = await run_in_threadpool(resumable_uploads.get, upload_id, invoice_id, current_user.id)
+    async with upload_slot():
+        offset = await resumable_uploads.append(session, upload_offset, request.stream())
+    response.headers[UPLOAD_OFFSET_HEADER] = str(offset)
+    return await run_in_threadpool(resumable_uploads.status, session)
+
+
+@router.post("/{invoice_id}/uploads/{upload_id}/complete")
+async def complete_upload_session(
+    invoice_id: int,
+    upload_id: str,
+    response: Response,
+    db: Session = Depends(get_db),
+    writer: RequestWriter = Depends(get_writer),
+    current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
+):
+    """Attach a fully received resumable upload to its invoice (Admin only)
+    
+    Answers like the single-request upload; the session is removed once
+    the invoice points at the stored file.
+    """
+    session = await run_in_threadpool(resumable_uploads.get, upload_id, invoice_id, current_user.id)
+    contents_hash, size = await run_in_threadpool(resumable_uploads.inspect, session)
+    body = await _attach_file(
+        invoice_id,
+        contents_hash,
+        size,
+        lambda: FileHandler.store(contents_hash, resumable_uploads.chunks(session)),
+        db,
+        writer
+    )
+    await run_in_threadpool(resumable_uploads.discard, session.id)
+    response.headers[ETAG_HEADER] = f'"{contents_hash}"'
+    return body
+
+
+@router.delete("/{invoice_id}/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def cancel_upload_session(
+    invoice_id: int,
+    upload_id: str,
+    current_user: User = Depends(require_roles(RoleEnum.admin, RoleEnum.superadmin))
+):
+    """Abandon a resumable upload and drop its partial data"""
+    session = resumable_uploads.get(upload_id, invoice_id, current_user.id)
+    resumable_uploads.discard(session.id)
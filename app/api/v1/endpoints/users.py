@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
+from typing import List, Optional
+from app.db.database import get_db, get_writer
+from app.db.lazy_session import SessionReleasingRoute
+from app.db.write_queue import RequestWriter
 from app.schemas.user import UserCreate, UserUpdate, UserOut
 from app.services.user_service import UserService
-from app.core.dependencies import require_roles, get_current_user
+from app.core.dependencies import require_roles, get_expected_version
+from app.core.concurrency import ETAG_HEADER, make_etag
+from app.core.security import get_password_hash
 from app.models.user import User, RoleEnum
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=SessionReleasingRoute)
 
 
 @router.get("/", response_model=List[UserOut])
@@ -23,44 +27,53 @@ def list_users(
 @router.get("/{user_id}", response_model=UserOut)
 def get_user(
     user_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles(RoleEnum.superadmin))
 ):
     """Get a specific user (SuperAdmin only)"""
     user_service = UserService(db)
-    return user_service.get_user_by_id(user_id)
+    user = user_service.get_user_by_id(user_id)
+    response.headers[ETAG_HEADER] = make_etag(user.version)
+    return user
 
 
 @router.post("/", response_model=UserOut, status_code=status.HTTP_201_CREATED)
 def create_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.superadmin))
 ):
     """Create a new user (SuperAdmin only)"""
-    user_service = UserService(db)
-    return user_service.create_user(user_data)
+    # Hashed here: the write job holds the single writer while it runs
+    hashed_password = get_password_hash(user_data.password)
+    return writer.run(lambda db: UserService(db).create_user(user_data, hashed_password))
 
 
 @router.put("/{user_id}", response_model=UserOut)
 def update_user(
     user_id: int,
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    expected_version: Optional[int] = Depends(get_expected_version),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.superadmin))
 ):
     """Update a user (SuperAdmin only)"""
-    user_service = UserService(db)
-    return user_service.update_user(user_id, user_data)
+    hashed_password = get_password_hash(user_data.password) if user_data.password else None
+    user = writer.run(
+        lambda db: UserService(db).update_user(user_id, user_data, expected_version, hashed_password)
+    )
+    response.headers[ETAG_HEADER] = make_etag(user.version)
+    return user
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    writer: RequestWriter = Depends(get_writer),
     current_user: User = Depends(require_roles(RoleEnum.superadmin))
 ):
     """Delete a user (SuperAdmin only)"""
-    user_service = UserService(db)
-    user_service.delete_user(user_id)
+    writer.run(lambda db: UserService(db).delete_user(user_id))
     return None
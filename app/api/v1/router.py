@@ -1,5 +1,7 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, companies, invoices, dashboard
+from app.api.v1.endpoints import (
+    auth, users, companies, invoices, dashboard, api_keys, async_invoices, async_dashboard
+)
 
 api_router = APIRouter()
 
@@ -9,3 +11,8 @@ api_router.include_router(users.router)
 api_router.include_router(companies.router)
 api_router.include_router(invoices.router)
 api_router.include_router(dashboard.router)
+api_router.include_router(api_keys.router)
+
+# Read endpoints served by the async database stack
+api_router.include_router(async_invoices.router, prefix="/async")
+api_router.include_router(async_dashboard.router, prefix="/async")
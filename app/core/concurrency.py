@@ -0,0 +1,34 @@
+from typing import Optional
+from fastapi import HTTPException, status
+
+ETAG_HEADER = "ETag"
+
+
+def make_etag(version: int) -> str:
+    """Entity tag for a row version"""
+    return f'"{version}"'
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """Row version expected by an If-Match header; None when any version is accepted"""
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cabeçalho If-Match inválido"
+        )
+
+
+def check_version(entity, expected_version: Optional[int]) -> None:
+    """Reject a write made against an outdated copy of the row"""
+    if expected_version is not None and entity.version != expected_version:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Registro alterado por outra requisição. Recarregue e tente novamente"
+        )
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -9,6 +9,97 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
     
     DATABASE_URL: str = "sqlite:///./dev.db"
+    
+    # Refuse to start when the schema is behind the migrations
+    DB_SCHEMA_CHECK: bool = True
+    
+    # Read replicas for GET traffic; empty means everything uses the primary
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_MAX_WAIT_MS: int = 200
+    REPLICA_POLL_INTERVAL_MS: int = 10
+    
+    # Connection pool; pool_size + max_overflow should cover the worker thread
+    # limit (AnyIO defaults to 40) so sync requests never starve on checkout
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = -1
+    
+    # SQLite pragmas: a named profile (see app/db/sqlite_pragmas.py) plus
+    # per-pragma overrides
+    SQLITE_PRAGMA_PROFILE: str = "balanced"
+    SQLITE_JOURNAL_MODE: Optional[str] = None
+    SQLITE_SYNCHRONOUS: Optional[str] = None
+    SQLITE_CACHE_SIZE: Optional[int] = None
+    SQLITE_MMAP_SIZE: Optional[int] = None
+    SQLITE_TEMP_STORE: Optional[str] = None
+    SQLITE_BUSY_TIMEOUT: Optional[int] = None
+    
+    # Route SQLite writes through one writer thread that commits concurrent
+    # requests together (see app/db/write_queue.py)
+    DB_WRITE_QUEUE_ENABLED: bool = True
+    DB_WRITE_QUEUE_MAX_PENDING: int = 1000
+    DB_WRITE_QUEUE_MAX_BATCH: int = 64
+    
+    # Longest a single SQL statement of a request may run before it is
+    # cancelled (0 disables); the admin listing and dashboard have their own
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+    INVOICE_LIST_QUERY_BUDGET_MS: int = 2000
+    DASHBOARD_QUERY_BUDGET_MS: int = 3000
+    
+    # PDF uploads are streamed to disk in chunks; larger files are refused
+    # and at most UPLOAD_MAX_CONCURRENCY uploads are written per worker at once
+    UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_CONCURRENCY: int = 4
+    # Files and total body bytes accepted by one bulk upload (POST
+    # /invoices/bulk-upload); each file holds up to 1 MB in memory while parsed
+    BULK_UPLOAD_MAX_FILES: int = 100
+    BULK_UPLOAD_MAX_BYTES: int = 200 * 1024 * 1024
+    
+    # Resumable uploads keep their partial data in UPLOAD_SESSION_DIR (empty:
+    # upload-sessions/ next to uploads/) until completed, or until no bytes
+    # arrived for UPLOAD_SESSION_TTL_SECONDS
+    UPLOAD_SESSION_DIR: str = ""
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+    
+    # Where PDFs are stored: "local" (the uploads directory of this node) or
+    # "s3" (any S3-compatible bucket shared by every node; needs boto3 and
+    # takes credentials from the usual AWS_* variables)
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: str = ""
+    S3_REGION: str = ""
+    S3_PART_SIZE: int = 8 * 1024 * 1024
+    
+    # Serve PDFs at /uploads without authentication; with the mount off they
+    # are only downloaded through GET /invoices/{id}/file. A non-empty
+    # accel-redirect prefix hands those downloads to the front proxy
+    # (nginx `internal` location) instead of streaming them from Python
+    UPLOAD_PUBLIC_MOUNT: bool = True
+    UPLOAD_ACCEL_REDIRECT_PREFIX: str = ""
+    
+    # Signed, expiring /files links embedded in invoice listings; verified
+    # with an HMAC only (empty secret: derived from SECRET_KEY)
+    DOWNLOAD_URL_TTL_SECONDS: int = 300
+    DOWNLOAD_URL_SECRET: str = ""
+    
+    # Files no invoice references (replaced, deleted or failed uploads) are
+    # removed by a background sweep every UPLOAD_GC_INTERVAL_SECONDS (0
+    # disables it). Files younger than the grace period are never touched,
+    # so an upload whose invoice update has not committed yet is safe
+    UPLOAD_GC_INTERVAL_SECONDS: int = 3600
+    UPLOAD_GC_GRACE_SECONDS: int = 24 * 3600
+    UPLOAD_GC_BATCH_SIZE: int = 500
+    UPLOAD_GC_DRY_RUN: bool = False
+    
+    # How long a completed Idempotency-Key response is replayed
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    # How long a request may hold its key before a retry can take it over
+    IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS: int = 300
+    
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:5174", "http://localhost:3000", "http://127.0.0.1:5173", "http://127.0.0.1:5174"]
     
     SUPERADMIN_EMAIL: str = "super@example.com"
@@ -1,49 +1,112 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.db.database import get_principal_db, get_async_db
 from app.models.user import User, RoleEnum
 from app.core.security import decode_access_token
+from app.core.tenancy import TenantScope
+from app.core.concurrency import parse_if_match
+from app.services.api_key_service import ApiKeyService
 
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
-    """Get the current authenticated user from JWT token"""
+def get_token_user_id(token: Optional[str]) -> int:
+    """Validate a bearer token and return the user ID it was issued for"""
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado"
         )
-    
+
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido"
         )
-    
-    user = db.query(User).filter(User.id == int(user_id)).first()
+
+    return int(user_id)
+
+
+def check_user(user: Optional[User]) -> User:
+    """Ensure the token's user exists and is active"""
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuário não encontrado"
         )
-    
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Usuário inativo"
         )
-    
+
     return user
 
 
+def get_current_user(
+    db: Session = Depends(get_principal_db),
+    token: Optional[str] = Depends(oauth2_scheme),
+    api_key: Optional[str] = Depends(api_key_header)
+) -> User:
+    """Get the current authenticated user from JWT token or API key"""
+    if api_key:
+        return ApiKeyService(db).authenticate_api_key(api_key)
+
+    user_id = get_token_user_id(token)
+    user = db.get(User, user_id)
+    return check_user(user)
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: Optional[str] = Depends(oauth2_scheme),
+    api_key: Optional[str] = Depends(api_key_header)
+) -> User:
+    """Async variant of get_current_user for endpoints on the async stack"""
+    if api_key:
+        return await db.run_sync(
+            lambda session: ApiKeyService(session).authenticate_api_key(api_key)
+        )
+
+    user_id = get_token_user_id(token)
+    user = await db.get(User, user_id)
+    return check_user(user)
+
+
+def get_tenant_scope(current_user: User = Depends(get_current_user)) -> TenantScope:
+    """Tenant scope of the authenticated principal"""
+    return TenantScope.for_user(current_user)
+
+
+async def get_tenant_scope_async(
+    current_user: User = Depends(get_current_user_async)
+) -> TenantScope:
+    """Async variant of get_tenant_scope"""
+    return TenantScope.for_user(current_user)
+
+
+def get_expected_version(
+    if_match: Optional[str] = Header(None, alias="If-Match")
+) -> Optional[int]:
+    """Row version the client last read, from the If-Match header"""
+    return parse_if_match(if_match)
+
+
 def require_roles(*roles: RoleEnum):
     """Dependency to require specific roles"""
     def role_checker(current_user: User = Depends(get_current_user)) -> User:
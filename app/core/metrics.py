@@ -0,0 +1,120 @@
+"""
+In-process metrics exposed at ``/metrics`` in the Prometheus text format.
+
+Counters live for the lifetime of the process and are per worker; scrape
+each worker (or sum in Prometheus) when running several.
+"""
+import threading
+
+_registry: list = []
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, value in sorted(self._values.items()):
+            label_text = ",".join(f'{label}="{item}"' for label, item in zip(self.labels, key))
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}{suffix} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+
+    def samples(self) -> list[str]:
+        lines = [
+            f'{self.name}_bucket{{le="{bound:g}"}} {count}'
+            for bound, count in zip(self.buckets, self._counts)
+        ]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum:g}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format"""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+statement_timeouts = Counter(
+    "db_statement_timeouts_total",
+    "SQL statements cancelled for exceeding their time budget",
+    labels=("route",)
+)
+
+write_queue_latency = Histogram(
+    "db_write_queue_latency_seconds",
+    "Time from queueing a write job until its batch committed",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+write_batch_size = Histogram(
+    "db_write_batch_size",
+    "Write jobs committed together by the writer",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+write_queue_rejected = Counter(
+    "db_write_queue_rejected_total",
+    "Write jobs refused because the queue was full"
+)
+
+upload_gc_deleted_files = Counter(
+    "upload_gc_deleted_files_total",
+    "Unreferenced uploaded files deleted by the sweeper"
+)
+
+upload_gc_reclaimed_bytes = Counter(
+    "upload_gc_reclaimed_bytes_total",
+    "Bytes freed by deleting unreferenced uploaded files"
+)
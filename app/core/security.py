@@ -1,3 +1,8 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import time
 import bcrypt
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
@@ -33,3 +38,66 @@ def decode_access_token(token: str) -> dict | None:
         return payload
     except JWTError:
         return None
+
+
+API_KEY_PREFIX = "dk"
+
+
+def generate_api_key() -> tuple[str, str]:
+    """Generate a new API key, returning the full key and its lookup prefix"""
+    prefix = secrets.token_hex(6)
+    return f"{API_KEY_PREFIX}_{prefix}_{secrets.token_urlsafe(32)}", prefix
+
+
+def get_api_key_prefix(api_key: str) -> str | None:
+    """Extract the lookup prefix from an API key"""
+    parts = api_key.split("_", 2)
+    if len(parts) != 3 or parts[0] != API_KEY_PREFIX or not parts[1] or not parts[2]:
+        return None
+    return parts[1]
+
+
+def get_api_key_hash(api_key: str) -> str:
+    """Hash an API key with HMAC-SHA256 keyed by the application secret"""
+    return hmac.new(
+        settings.SECRET_KEY.encode("utf-8"), api_key.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+
+def verify_api_key(api_key: str, hashed_key: str) -> bool:
+    """Verify an API key against its hash in constant time"""
+    return hmac.compare_digest(get_api_key_hash(api_key), hashed_key)
+
+
+def _download_key() -> bytes:
+    # Derived from the application secret unless one is configured, so a
+    # download signature can never be replayed as another HMAC of the app
+    secret = settings.DOWNLOAD_URL_SECRET or f"download:{settings.SECRET_KEY}"
+    return secret.encode("utf-8")
+
+
+def sign_download(path: str, expires: int) -> str:
+    """HMAC-SHA256 of a download path and its expiry, URL-safe base64"""
+    digest = hmac.new(_download_key(), f"{path}\n{expires}".encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def download_expiry(now: float | None = None) -> int:
+    """Expiry for a download link issued now
+    
+    Rounded up to the end of the next TTL window, so every link to a file
+    issued within one window is the same URL (and cacheable); a link stays
+    valid for between one and two TTLs.
+    """
+    ttl = settings.DOWNLOAD_URL_TTL_SECONDS
+    now = time.time() if now is None else now
+    return (int(now) // ttl + 2) * ttl
+
+
+def verify_download(path: str, expires: str | None, signature: str | None, now: float | None = None) -> bool:
+    """Check a signed download link without touching the database"""
+    if not expires or not signature or not expires.isdigit():
+        return False
+    if int(expires) < (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(sign_download(path, int(expires)), signature)
@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import false
+from app.models.user import User, RoleEnum
+
+
+@dataclass(frozen=True)
+class TenantScope:
+    """Company boundary applied by repositories as a WHERE clause
+
+    An unrestricted scope (admins, internal callers) adds no criteria. A
+    restricted scope only matches rows of its company, and matches nothing
+    at all when the principal has no company.
+    """
+    company_id: Optional[int] = None
+    restricted: bool = False
+
+    @classmethod
+    def for_user(cls, user: User) -> "TenantScope":
+        """Build the scope for an authenticated principal"""
+        if user.role == RoleEnum.user:
+            return cls(company_id=user.company_id, restricted=True)
+        return cls()
+
+    def criteria(self, column) -> list:
+        """WHERE criteria restricting the given tenant column"""
+        if not self.restricted:
+            return []
+        if self.company_id is None:
+            return [false()]
+        return [column == self.company_id]
+
+    def allows(self, company_id: Optional[int]) -> bool:
+        """Check a value already in memory against the scope"""
+        return not self.restricted or (self.company_id is not None and company_id == self.company_id)
+
+    def default_company(self, company_id: Optional[int] = None) -> Optional[int]:
+        """Company to filter on when the caller did not pick one"""
+        return company_id if company_id is not None else self.company_id
+
+
+UNSCOPED = TenantScope()
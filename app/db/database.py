@@ -1,21 +1,252 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from typing import Optional
+from fastapi import Depends, Header, Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.core.config import settings, Settings
+from app.db.sqlite_pragmas import resolve_pragmas, apply_pragmas
+from app.db.lazy_session import LazySession, track_session
+from app.db.read_only import READ_ONLY_KEY, install_read_only_mode, install_query_only_reset
+from app.db.statement_timeout import (
+    TIMEOUT_KEY,
+    get_request_budget,
+    install_statement_budget,
+    install_statement_timeout
+)
+from app.db.write_queue import WriteQueue, InlineWriter, RequestWriter, install_sqlite_savepoints
+from app.db.replication import (
+    ReplicaSet,
+    RoutingSession,
+    CONSISTENCY_HEADER,
+    install_write_tracking,
+    parse_consistency_token
+)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Map a sync database URL onto its async driver"""
+    scheme, sep, rest = database_url.partition(":")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def get_engine_options(database_url: str, config: Settings = settings) -> dict:
+    """Build create_engine keyword arguments from settings"""
+    url = make_url(database_url)
+    options = {
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+
+    # In-memory SQLite uses a singleton pool that takes no sizing options
+    if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        options.update(
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT
+        )
+    return options
+
+
+def install_sqlite_pragmas(sync_engine: Engine, config: Settings = settings) -> None:
+    """Apply the configured SQLite pragmas to every new connection"""
+    if sync_engine.dialect.name != "sqlite":
+        return
+    pragmas = resolve_pragmas(config)
+    if not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+
+def build_engine(database_url: str) -> Engine:
+    """Create a sync engine with pool options and SQLite pragmas"""
+    new_engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False} if "sqlite" in database_url else {},
+        **get_engine_options(database_url)
+    )
+    install_sqlite_pragmas(new_engine)
+    install_query_only_reset(new_engine)
+    install_statement_timeout(new_engine)
+    return new_engine
+
+
+def build_write_queue(database_url: str, config: Settings = settings) -> Optional[WriteQueue]:
+    """Create the single writer for a SQLite database file, if enabled"""
+    url = make_url(database_url)
+    if not config.DB_WRITE_QUEUE_ENABLED or url.get_backend_name() != "sqlite":
+        return None
+    if url.database in (None, "", ":memory:"):
+        return None
+    writer_engine = build_engine(database_url)
+    install_sqlite_savepoints(writer_engine)
+    return WriteQueue(
+        writer_engine,
+        max_pending=config.DB_WRITE_QUEUE_MAX_PENDING,
+        max_batch=config.DB_WRITE_QUEUE_MAX_BATCH
+    )
+
 
 # Create engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+engine = build_engine(settings.DATABASE_URL)
+
+# Read replicas
+replica_set = ReplicaSet(
+    [build_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    max_wait_ms=settings.REPLICA_MAX_WAIT_MS,
+    poll_interval_ms=settings.REPLICA_POLL_INTERVAL_MS
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Committed objects keep their loaded state, so serializing a response after
+# the commit does not reload every row
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+    class_=RoutingSession
+)
+if replica_set:
+    install_write_tracking(SessionLocal)
+install_statement_budget(SessionLocal)
+
+# Read-only sessions for GET routes (see app.db.read_only)
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+    class_=RoutingSession,
+    info={READ_ONLY_KEY: True}
+)
+install_read_only_mode(ReadSessionLocal)
+install_statement_budget(ReadSessionLocal)
+
+# Single writer with group commit (see app.db.write_queue)
+write_queue = build_write_queue(settings.DATABASE_URL)
+if write_queue and replica_set:
+    install_write_tracking(write_queue.session_factory)
 
+# Async engine and session factory for async endpoints
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    **get_engine_options(settings.DATABASE_URL)
+)
+install_sqlite_pragmas(async_engine.sync_engine)
+install_statement_timeout(async_engine.sync_engine)
+
+
+class AsyncRequestSession(Session):
+    """Sync side of the async sessions; async_sessionmaker takes no session events"""
+
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AsyncRequestSession
+)
+install_statement_budget(AsyncRequestSession)
 
-def get_db():
-    """Dependency to get database session"""
-    db = SessionLocal()
+
+def _shared_session(request: Request, key: str, factory) -> LazySession:
+    """The request's lazy session of one kind, shared by every dependency that asks"""
+    db = getattr(request.state, key, None)
+    if db is None:
+        db = LazySession(factory)
+        setattr(request.state, key, db)
+        track_session(request, db)
+    return db
+
+
+def _write_session(request: Request, response: Response) -> LazySession:
+    def open_session():
+        session = SessionLocal()
+        session.info[TIMEOUT_KEY] = get_request_budget(request, settings.DB_STATEMENT_TIMEOUT_MS)
+        # Lets a committing write publish its consistency token on the response
+        session.info["response"] = response
+        return session
+    
+    return _shared_session(request, "write_db", open_session)
+
+
+def _read_session(request: Request, consistency_token: Optional[str]) -> LazySession:
+    def open_session():
+        session = ReadSessionLocal()
+        session.info[TIMEOUT_KEY] = get_request_budget(request, settings.DB_STATEMENT_TIMEOUT_MS)
+        session.info["replica"] = replica_set.choose(parse_consistency_token(consistency_token))
+        return session
+    
+    return _shared_session(request, "read_db", open_session)
+
+
+def get_db(request: Request, response: Response):
+    """Dependency to get database session
+    
+    The session is opened on first use and released as soon as the
+    endpoint returns (see app.db.lazy_session).
+    """
+    db = _write_session(request, response)
+    try:
+        yield db
+    except Exception:
+        # Services commit once per request; anything left pending is abandoned
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def get_read_db(
+    request: Request,
+    consistency_token: Optional[str] = Header(None, alias=CONSISTENCY_HEADER)
+):
+    """Dependency to get a read-only session, routed to a replica when available"""
+    db = _read_session(request, consistency_token)
     try:
         yield db
     finally:
         db.close()
+
+
+def uses_read_db(request: Request) -> bool:
+    """Whether the matched route reads through get_read_db"""
+    dependant = getattr(request.scope.get("route"), "dependant", None)
+    return dependant is not None and any(
+        dependency.call is get_read_db for dependency in dependant.dependencies
+    )
+
+
+def get_principal_db(request: Request, response: Response):
+    """Dependency to get the session authentication loads the principal with
+    
+    It is the same lazy session the route reads or writes with, so an
+    authenticated request holds a single pooled connection.
+    """
+    if uses_read_db(request):
+        db = _read_session(request, request.headers.get(CONSISTENCY_HEADER))
+    else:
+        db = _write_session(request, response)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_writer(response: Response, db: Session = Depends(get_db)) -> RequestWriter:
+    """Dependency to get the executor that runs the request's write jobs"""
+    executor = write_queue if write_queue is not None else InlineWriter(db)
+    return RequestWriter(executor, response=response)
+
+
+async def get_async_db(request: Request):
+    """Dependency to get async database session, with the route's statement budget"""
+    async with AsyncSessionLocal() as db:
+        db.info[TIMEOUT_KEY] = get_request_budget(request, settings.DB_STATEMENT_TIMEOUT_MS)
+        yield db
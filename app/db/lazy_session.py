@@ -0,0 +1,77 @@
+"""
+Lazily materialized request sessions.
+
+``get_db`` hands endpoints a ``LazySession`` instead of a ``Session``. The
+real session (and with it a pooled connection) is only created when it is
+first touched. Requests rejected before that (missing or malformed
+credentials, invalid parameters, routes that never query) take no pool
+slot. Authenticated requests always load their principal from the
+database, so they take exactly one, shared with the route (see
+``get_principal_db``); nothing answers them from a cache or ETag first.
+
+``SessionReleasingRoute`` closes the request's sessions as soon as the
+endpoint has produced its response, instead of when the dependency is torn
+down after the response has been sent to the client.
+"""
+from typing import Callable, Optional
+from fastapi import Request
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session
+
+
+class LazySession:
+    """Session proxy that opens the real session on first use"""
+
+    def __init__(self, factory: Callable[[], Session]):
+        self._factory = factory
+        self._session: Optional[Session] = None
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._session is not None
+
+    def _materialize(self) -> Session:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name):
+        return getattr(self._materialize(), name)
+
+    def rollback(self) -> None:
+        """Roll back the real session, if one was opened"""
+        if self._session is not None:
+            self._session.rollback()
+
+    def close(self) -> None:
+        """Release the connection; a closed session reopens if used again"""
+        if self._session is not None:
+            self._session.close()
+
+
+def track_session(request: Request, session: LazySession) -> None:
+    """Register a session to be released when the endpoint returns"""
+    if not hasattr(request.state, "db_sessions"):
+        request.state.db_sessions = []
+    request.state.db_sessions.append(session)
+
+
+def release_request_sessions(request: Request) -> None:
+    """Close every session opened for the request"""
+    for session in getattr(request.state, "db_sessions", []):
+        session.close()
+
+
+class SessionReleasingRoute(APIRoute):
+    """Route that releases database sessions once the response is built"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def release_sessions_handler(request: Request):
+            try:
+                return await handler(request)
+            finally:
+                release_request_sessions(request)
+
+        return release_sessions_handler
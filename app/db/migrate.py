@@ -0,0 +1,34 @@
+"""
+Aplica migrações do banco de dados.
+Uso: python -m app.db.migrate [upgrade [--to VERSION] | current | pending]
+"""
+import argparse
+from app.db.database import engine
+from app.db.migrations import upgrade, get_pending_migrations, get_current_version
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.db.migrate")
+    subcommands = parser.add_subparsers(dest="command")
+    upgrade_parser = subcommands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="target version")
+    subcommands.add_parser("current", help="show the applied version")
+    subcommands.add_parser("pending", help="list pending migrations")
+    args = parser.parse_args(argv)
+    
+    if args.command == "current":
+        with engine.connect() as connection:
+            print(get_current_version(connection))
+    elif args.command == "pending":
+        for migration in get_pending_migrations(engine):
+            print(f"{migration.version:04d} {migration.name}")
+    else:
+        applied = upgrade(engine, getattr(args, "to", None))
+        for migration in applied:
+            print(f"Applied {migration.version:04d} {migration.name}")
+        if not applied:
+            print("Database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+from app.db.migrations.runner import (
+    Migration,
+    SchemaOutOfDateError,
+    load_migrations,
+    get_current_version,
+    get_pending_migrations,
+    upgrade,
+    check_schema_version
+)
+
+__all__ = [
+    "Migration", "SchemaOutOfDateError", "load_migrations", "get_current_version",
+    "get_pending_migrations", "upgrade", "check_schema_version"
+]
@@ -0,0 +1,100 @@
+"""
+Versioned schema migrations.
+
+Each module in ``app/db/migrations/versions`` named ``vNNNN_<name>.py``
+defines ``upgrade(connection)``. Applied versions are recorded in the
+``schema_version`` table, one row per migration, and every migration runs
+in its own transaction. Migrations describe the schema as it was when they
+were written; they never import the current models.
+"""
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+VERSIONS_PACKAGE = "app.db.migrations.versions"
+MODULE_PATTERN = re.compile(r"^v(\d{4})_(\w+)$")
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+class SchemaOutOfDateError(RuntimeError):
+    """Raised when the database schema is behind the code"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def load_migrations() -> list[Migration]:
+    """Discover migration modules ordered by version"""
+    package = importlib.import_module(VERSIONS_PACKAGE)
+    migrations = []
+    for module_info in pkgutil.iter_modules(package.__path__):
+        match = MODULE_PATTERN.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{VERSIONS_PACKAGE}.{module_info.name}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), module.upgrade))
+    
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def get_current_version(connection: Connection) -> int:
+    """Get the latest applied migration version, 0 for an unmanaged database"""
+    if not inspect(connection).has_table(schema_version.name):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def get_pending_migrations(engine: Engine) -> list[Migration]:
+    """Get the migrations not yet applied to the database"""
+    with engine.connect() as connection:
+        current = get_current_version(connection)
+    return [migration for migration in load_migrations() if migration.version > current]
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> list[Migration]:
+    """Apply pending migrations up to target (default: latest)"""
+    applied = []
+    for migration in get_pending_migrations(engine):
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as connection:
+            version_metadata.create_all(connection, checkfirst=True)
+            migration.upgrade(connection)
+            connection.execute(
+                schema_version.insert().values(version=migration.version, name=migration.name)
+            )
+        applied.append(migration)
+    return applied
+
+
+def check_schema_version(engine: Engine) -> int:
+    """Fail fast if the database is behind the code; return the current version"""
+    expected = load_migrations()[-1].version
+    with engine.connect() as connection:
+        current = get_current_version(connection)
+    if current < expected:
+        raise SchemaOutOfDateError(
+            f"Banco de dados na versão {current}, esperado {expected}. "
+            "Execute: python -m app.db.migrate upgrade"
+        )
+    return current
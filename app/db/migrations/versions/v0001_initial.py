@@ -0,0 +1,83 @@
+"""Initial schema.
+
+Tables are created with checkfirst so databases created by the old
+create_all-on-startup code are adopted as-is and only gain missing tables.
+"""
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, ForeignKey, Integer, MetaData, Numeric, String,
+    Table, func
+)
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+role_enum = Enum("superadmin", "admin", "user", name="roleenum")
+
+Table(
+    "companies",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("cnpj", String(20), unique=True, nullable=False),
+    Column("email", String(255), nullable=True),
+    Column("phone", String(20), nullable=True),
+    Column("address", String(500), nullable=True),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String(255), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("name", String(255), nullable=True),
+    Column("role", role_enum, nullable=False),
+    Column("company_id", Integer, ForeignKey("companies.id"), nullable=True),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "invoices",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("company_id", Integer, ForeignKey("companies.id"), nullable=False),
+    Column("description", String(500), nullable=False),
+    Column("amount", Numeric(12, 2), nullable=False),
+    Column("due_date", Date, nullable=False),
+    Column("file_url", String(500), nullable=True),
+    Column("is_paid", Boolean),
+    Column("paid_at", DateTime(timezone=True), nullable=True),
+    Column("notes", String(1000), nullable=True),
+    Column("created_by", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "api_keys",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("prefix", String(16), unique=True, index=True, nullable=False),
+    Column("hashed_key", String(64), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("company_id", Integer, ForeignKey("companies.id"), nullable=True),
+    Column("role", role_enum, nullable=False),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "replication_state",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("position", Integer, nullable=False),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,21 @@
+"""Indexes for the tenant and calendar queries.
+
+Every invoice listing filters by company and/or due date, and user lookups
+by company back the company deletion check. CREATE INDEX IF NOT EXISTS
+keeps the migration safe on databases where the index was added by hand.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+def upgrade(connection: Connection) -> None:
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_invoices_company_id_due_date "
+        "ON invoices (company_id, due_date)"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_invoices_due_date ON invoices (due_date)"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_users_company_id ON users (company_id)"
+    ))
@@ -0,0 +1,19 @@
+"""Version column for optimistic concurrency on companies, users and invoices.
+
+Writes match on the version they read (UPDATE ... WHERE id = ? AND
+version = ?), so existing rows start at version 1.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+TABLES = ("companies", "users", "invoices")
+
+
+def upgrade(connection: Connection) -> None:
+    inspector = inspect(connection)
+    for table in TABLES:
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        if "version" not in columns:
+            connection.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            ))
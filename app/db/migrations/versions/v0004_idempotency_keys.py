@@ -0,0 +1,26 @@
+"""Store for Idempotency-Key responses on invoice creation and uploads."""
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, MetaData, String, Table, Text, UniqueConstraint
+)
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+Table(
+    "idempotency_keys",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("key", String(255), nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("fingerprint", String(64), nullable=False),
+    Column("status_code", Integer, nullable=True),
+    Column("response_body", Text, nullable=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+    Index("ix_idempotency_keys_expires_at", "expires_at"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
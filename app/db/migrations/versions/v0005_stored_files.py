@@ -0,0 +1,29 @@
+"""Content-addressed file metadata and the invoice reference to it.
+
+Uploads are stored once per SHA-256 of their contents; invoices point at
+the stored file, whose ref_count counts them. Files uploaded before this
+migration keep their file_url and have no stored file.
+"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, text
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+Table(
+    "stored_files",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("sha256", String(64), nullable=False, unique=True, index=True),
+    Column("size", Integer, nullable=False),
+    Column("ref_count", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
+    columns = {column["name"] for column in inspect(connection).get_columns("invoices")}
+    if "stored_file_id" not in columns:
+        connection.execute(text(
+            "ALTER TABLE invoices ADD COLUMN stored_file_id INTEGER REFERENCES stored_files (id)"
+        ))
@@ -0,0 +1,13 @@
+"""Index on invoices.file_url.
+
+The upload sweeper looks up which listed files are still referenced by an
+invoice, one batch of URLs at a time.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+def upgrade(connection: Connection) -> None:
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_invoices_file_url ON invoices (file_url)"
+    ))
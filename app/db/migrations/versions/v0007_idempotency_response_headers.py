@@ -0,0 +1,12 @@
+"""Response headers stored with Idempotency-Key responses.
+
+Replayed uploads carry the same ETag as the original response.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def upgrade(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("idempotency_keys")}
+    if "response_headers" not in columns:
+        connection.execute(text("ALTER TABLE idempotency_keys ADD COLUMN response_headers TEXT"))
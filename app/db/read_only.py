@@ -0,0 +1,59 @@
+"""
+Read-only sessions for GET routes.
+
+Sessions from ``ReadSessionLocal`` carry ``info["read_only"]`` and:
+
+- never flush: autoflush is off and an explicit flush raises, so a read
+  route cannot take SQLite's write lock by accident;
+- set ``PRAGMA query_only`` on the connection when their transaction
+  begins, so even raw SQL writes fail. The pragma is switched back off when
+  the connection returns to the pool, where writers may pick it up;
+- keep the driver's deferred BEGIN: pysqlite only opens a transaction
+  before DML, so each SELECT holds its shared lock only while its cursor
+  is read and an idle read session never pins a WAL snapshot that would
+  stop checkpoints;
+- never expire loaded objects, since nothing they load can change through
+  the session.
+
+Run ``python benchmarks/bench_read_only_sessions.py`` to compare reader and
+writer throughput with and without the read-only mode.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import InvalidRequestError
+
+READ_ONLY_KEY = "read_only"
+
+
+def _enable_query_only(session, transaction, connection) -> None:
+    if not session.info.get(READ_ONLY_KEY) or connection.dialect.name != "sqlite":
+        return
+    connection.exec_driver_sql("PRAGMA query_only = ON")
+    connection.info[READ_ONLY_KEY] = True
+
+
+def _reject_flush(session, flush_context, instances) -> None:
+    if session.info.get(READ_ONLY_KEY):
+        raise InvalidRequestError("Read-only session cannot flush changes")
+
+
+def install_read_only_mode(session_factory) -> None:
+    """Enforce read-only behaviour on sessions flagged with info["read_only"]"""
+    event.listen(session_factory, "after_begin", _enable_query_only)
+    event.listen(session_factory, "before_flush", _reject_flush)
+
+
+def install_query_only_reset(engine: Engine) -> None:
+    """Clear query_only on connections a read-only session used before reuse"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "checkin")
+    def reset_query_only(dbapi_connection, connection_record):
+        if not connection_record.info.pop(READ_ONLY_KEY, False) or dbapi_connection is None:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA query_only = OFF")
+        finally:
+            cursor.close()
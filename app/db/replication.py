@@ -0,0 +1,144 @@
+"""
+Read-replica routing with read-your-writes consistency tokens.
+
+Every committed write on the primary advances a position stored in the
+single-row ``replication_state`` table, so any replica copied from the
+primary carries the position it has caught up to. Write responses return
+that position as ``X-Consistency-Token``; a client sending it back on a
+read is routed to a replica at or past that position, waiting up to
+``REPLICA_MAX_WAIT_MS`` before falling back to the primary.
+"""
+import itertools
+import time
+from typing import Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+CONSISTENCY_HEADER = "X-Consistency-Token"
+
+
+class ReplicaSet:
+    """Replica engines picked round-robin, filtered by replication position"""
+    
+    def __init__(self, engines: list[Engine], max_wait_ms: int = 200, poll_interval_ms: int = 10):
+        self.engines = engines
+        self.max_wait = max_wait_ms / 1000
+        self.poll_interval = poll_interval_ms / 1000
+        self._counter = itertools.count()
+    
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+    
+    def _rotation(self) -> list[Engine]:
+        start = next(self._counter) % len(self.engines)
+        return self.engines[start:] + self.engines[:start]
+    
+    @staticmethod
+    def get_position(engine: Engine) -> int:
+        """Read the replication position a database has reached"""
+        try:
+            with engine.connect() as conn:
+                position = conn.execute(
+                    text("SELECT position FROM replication_state WHERE id = 1")
+                ).scalar()
+        except OperationalError:
+            return 0
+        return position or 0
+    
+    def choose(self, min_position: int = 0) -> Optional[Engine]:
+        """Pick a replica at or past min_position, or None to use the primary"""
+        if not self.engines:
+            return None
+        if min_position <= 0:
+            return self._rotation()[0]
+        
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            for replica in self._rotation():
+                if self.get_position(replica) >= min_position:
+                    return replica
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+
+class RoutingSession(Session):
+    """Session that sends read-only work to a replica and writes to the primary"""
+    
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None and not self._flushing:
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def parse_consistency_token(token: Optional[str]) -> int:
+    """Parse a consistency token, treating anything invalid as no token"""
+    try:
+        return max(int(token), 0) if token else 0
+    except ValueError:
+        return 0
+
+
+def _advance_position(session: Session) -> None:
+    if not (session.info.pop("written", False) or session.new or session.dirty or session.deleted):
+        return
+    # A session that writes sticks to the primary from here on
+    session.info["replica"] = None
+    position = session.execute(
+        text("UPDATE replication_state SET position = position + 1 WHERE id = 1 RETURNING position")
+    ).scalar()
+    if position is None:
+        position = 1
+        session.execute(text("INSERT INTO replication_state (id, position) VALUES (1, 1)"))
+    session.info["position"] = position
+
+
+def _mark_written(session: Session, flush_context) -> None:
+    session.info["written"] = True
+    session.info["replica"] = None
+
+
+def _mark_bulk_written(orm_execute_state) -> None:
+    # update()/delete()/insert() run through Session.execute skip the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        _mark_written(orm_execute_state.session, None)
+
+
+def _publish_position(session: Session) -> None:
+    session.info.pop("written", None)
+    position = session.info.pop("position", None)
+    response = session.info.get("response")
+    if position is not None and response is not None:
+        response.headers[CONSISTENCY_HEADER] = str(position)
+
+
+def _discard_position(session: Session) -> None:
+    session.info.pop("written", None)
+    session.info.pop("position", None)
+
+
+def install_write_tracking(session_factory) -> None:
+    """Advance the replication position on every commit that writes
+    
+    Flushed changes and bulk DML (``session.execute(update(...))``,
+    ``query.delete()``) both count as writes.
+    """
+    event.listen(session_factory, "after_flush", _mark_written)
+    event.listen(session_factory, "do_orm_execute", _mark_bulk_written)
+    event.listen(session_factory, "before_commit", _advance_position)
+    event.listen(session_factory, "after_commit", _publish_position)
+    event.listen(session_factory, "after_rollback", _discard_position)
+
+
+def copy_sqlite_database(source: Engine, target: Engine) -> None:
+    """Refresh a SQLite replica from the primary through the backup API"""
+    source_conn = source.raw_connection()
+    target_conn = target.raw_connection()
+    try:
+        source_conn.driver_connection.backup(target_conn.driver_connection)
+    finally:
+        target_conn.close()
+        source_conn.close()
@@ -1,14 +1,15 @@
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
 from app.db.database import SessionLocal, engine
-from app.models import Base, User, Company, Invoice, RoleEnum
+from app.db.migrations import upgrade
+from app.models import User, Company, Invoice, RoleEnum
 from app.core.security import get_password_hash
 
 
 def seed_database():
     """Populate database with initial data for development"""
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Bring the schema up to date
+    upgrade(engine)
     
     db: Session = SessionLocal()
     
@@ -36,9 +37,7 @@ def seed_database():
             address="Rua das Flores, 200 - Rio de Janeiro, RJ"
         )
         db.add_all([company1, company2])
-        db.commit()
-        db.refresh(company1)
-        db.refresh(company2)
+        db.flush()
         
         # Create users
         superadmin = User(
@@ -72,8 +71,7 @@ def seed_database():
             is_active=True
         )
         db.add_all([superadmin, admin, user1, user2])
-        db.commit()
-        db.refresh(superadmin)
+        db.flush()
         
         # Create invoices
         today = date.today()
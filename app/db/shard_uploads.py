@@ -0,0 +1,87 @@
+"""
+Move os PDFs de uploads/ para o layout em subdiretórios (ab/cd/<nome>.pdf).
+Uso: python -m app.db.shard_uploads [--dry-run] [--batch-size N]
+
+Files are moved first, then Invoice.file_url is rewritten in batches. The
+/uploads mount resolves flat URLs in both layouts, so invoices keep working
+at every step, and the tool can be stopped and run again.
+"""
+import argparse
+import os
+from dataclasses import dataclass
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.engine import Engine
+from app.db.database import engine
+from app.models.invoice import Invoice
+from app.utils import file_handler
+from app.storage import LocalStorage, shard_path
+from app.utils.file_handler import UPLOAD_URL_PREFIX, is_flat_url, sharded_url
+
+
+@dataclass
+class ShardReport:
+    files_moved: int = 0
+    urls_rewritten: int = 0
+
+
+def move_files(store: LocalStorage, dry_run: bool = False) -> int:
+    """Move every file of the flat layout into its shard directory"""
+    moved = 0
+    with os.scandir(store.root) as entries:
+        flat = [entry.name for entry in entries if entry.is_file() and entry.name.endswith(".pdf")]
+    
+    for name in flat:
+        if not dry_run:
+            store.move(os.path.join(store.root, name), store.path(shard_path(name)))
+        moved += 1
+    return moved
+
+
+def rewrite_urls(engine: Engine, batch_size: int = 500, dry_run: bool = False) -> int:
+    """Point invoices with flat file URLs at the sharded layout
+    
+    Only the URL changes, not the file, so the row version is left alone
+    and clients holding an ETag are not told the invoice was edited.
+    """
+    with engine.connect() as connection:
+        urls = connection.scalars(
+            select(Invoice.file_url).where(Invoice.file_url.like(f"{UPLOAD_URL_PREFIX}%")).distinct()
+        ).all()
+    flat = [url for url in urls if is_flat_url(url)]
+    if dry_run:
+        return len(flat)
+    
+    table = Invoice.__table__
+    statement = update(table).where(table.c.file_url == bindparam("old_url")).values(
+        file_url=bindparam("new_url")
+    )
+    for start in range(0, len(flat), batch_size):
+        batch = flat[start:start + batch_size]
+        with engine.begin() as connection:
+            connection.execute(statement, [{"old_url": url, "new_url": sharded_url(url)} for url in batch])
+    return len(flat)
+
+
+def shard_uploads(engine: Engine, batch_size: int = 500, dry_run: bool = False) -> ShardReport:
+    """Move the flat upload store to the sharded layout"""
+    if not isinstance(file_handler.storage, LocalStorage):
+        raise RuntimeError("Only the local upload store has a flat layout to shard")
+    return ShardReport(
+        files_moved=move_files(file_handler.storage, dry_run),
+        urls_rewritten=rewrite_urls(engine, batch_size, dry_run)
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.db.shard_uploads")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--batch-size", type=int, default=500, help="file URLs rewritten per transaction")
+    args = parser.parse_args(argv)
+    
+    report = shard_uploads(engine, args.batch_size, args.dry_run)
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"{verb} {report.files_moved} files, {report.urls_rewritten} distinct file URLs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Per-statement time budgets enforced by the database.
+
+Request sessions carry ``info["statement_timeout_ms"]``: the route's budget
+set with the ``query_budget`` dependency, or ``DB_STATEMENT_TIMEOUT_MS``.
+When the session's transaction begins the budget is attached to its
+connection, and every statement on it is cancelled once it runs longer:
+
+- SQLite: a progress handler, checked every few thousand VM instructions,
+  interrupts the statement past its deadline. The handler stays installed
+  while rows are fetched and is removed when the connection is checked in.
+- PostgreSQL: ``SET LOCAL statement_timeout`` for the transaction.
+
+Async engines get the same treatment through their sync engine; aiosqlite
+installs the handler on its own thread.
+
+A cancelled statement raises ``StatementTimeoutError``, which the app turns
+into a 503 and counts in ``db_statement_timeouts_total``.
+"""
+import inspect
+import sqlite3
+import time
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.util import await_
+
+TIMEOUT_KEY = "statement_timeout_ms"
+
+# Connection record flag: a deadline handler is installed on the connection
+HANDLER_KEY = "statement_deadline_handler"
+
+# VM instructions between deadline checks
+PROGRESS_INTERVAL = 1000
+
+# PostgreSQL query_canceled
+PG_QUERY_CANCELED = "57014"
+
+
+class StatementTimeoutError(Exception):
+    """A statement ran past its time budget and was cancelled"""
+
+    def __init__(self, timeout_ms: int):
+        super().__init__(f"Statement exceeded its {timeout_ms} ms budget")
+        self.timeout_ms = timeout_ms
+
+
+def query_budget(timeout_ms: int):
+    """Route dependency overriding the statement budget of its sessions"""
+    async def set_query_budget(request: Request) -> None:
+        request.state.query_budget_ms = timeout_ms
+    return set_query_budget
+
+
+def get_request_budget(request: Request, default_ms: int) -> int:
+    """Budget for sessions opened by the request"""
+    return getattr(request.state, "query_budget_ms", default_ms)
+
+
+def _attach_budget(session, transaction, connection) -> None:
+    timeout_ms = session.info.get(TIMEOUT_KEY)
+    if not timeout_ms:
+        return
+    connection.execution_options(**{TIMEOUT_KEY: timeout_ms})
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def install_statement_budget(session_factory) -> None:
+    """Attach each session's budget to the connection it uses"""
+    event.listen(session_factory, "after_begin", _attach_budget)
+
+
+def _timeout_of(connection) -> Optional[int]:
+    if connection is None:
+        return None
+    return connection.get_execution_options().get(TIMEOUT_KEY)
+
+
+def _set_progress_handler(driver_connection, handler, interval: int) -> None:
+    # aiosqlite returns a coroutine that runs the call on its connection thread
+    result = driver_connection.set_progress_handler(handler, interval)
+    if inspect.isawaitable(result):
+        await_(result)
+
+
+def install_statement_timeout(engine: Engine) -> None:
+    """Cancel statements that run past the budget of their connection"""
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_deadline(conn, cursor, statement, parameters, context, executemany):
+            timeout_ms = _timeout_of(conn)
+            if not timeout_ms:
+                return
+            deadline = time.monotonic() + timeout_ms / 1000
+            _set_progress_handler(
+                conn.connection.driver_connection, lambda: time.monotonic() > deadline, PROGRESS_INTERVAL
+            )
+            conn.info[HANDLER_KEY] = True
+
+        @event.listens_for(engine, "checkin")
+        def clear_deadline(dbapi_connection, connection_record):
+            if dbapi_connection is not None and connection_record.info.pop(HANDLER_KEY, False):
+                _set_progress_handler(connection_record.driver_connection, None, 0)
+
+    @event.listens_for(engine, "handle_error")
+    def translate_timeout(context):
+        timeout_ms = _timeout_of(context.connection)
+        if not timeout_ms:
+            return None
+        error = context.original_exception
+        interrupted = isinstance(error, sqlite3.OperationalError) and str(error) == "interrupted"
+        if interrupted or getattr(error, "pgcode", None) == PG_QUERY_CANCELED:
+            return StatementTimeoutError(timeout_ms)
+        return None
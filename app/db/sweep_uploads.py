@@ -0,0 +1,177 @@
+"""
+Remove uploaded PDFs that no invoice references anymore.
+Uso: python -m app.db.sweep_uploads [--dry-run] [--batch-size N] [--grace-seconds S]
+
+Files are left behind when an invoice gets another PDF or is deleted, and
+when the invoice update after a save fails. Requests never delete them;
+instead the store is listed in batches, and each batch is checked against
+Invoice.file_url and stored_files with one query per table. Files younger
+than the grace period are skipped, so an upload that is still being
+attached is never taken, and a file stored again after it was listed is
+kept. An upload that skipped saving known contents whose row was released
+before it attached them touches the file (or stores it again), so the
+sweep keeps it the same way. The app runs the same sweep in the background every
+UPLOAD_GC_INTERVAL_SECONDS, along with the removal of stale resumable
+upload sessions and expired Idempotency-Key records.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.core.config import settings
+from app.db.database import engine
+from app.models.invoice import Invoice
+from app.models.stored_file import StoredFile
+from app.services.idempotency_service import IdempotencyService
+from app.storage import StorageBackend, shard_path
+from app.utils import file_handler
+from app.utils.file_handler import CONTENT_HASH, UPLOAD_URL_PREFIX
+from app.utils.resumable_upload import resumable_uploads
+
+logger = logging.getLogger(__name__)
+
+# Only what the upload code writes: PDFs and interrupted temporary files
+SWEPT_SUFFIXES = (".pdf", ".part")
+
+
+@dataclass
+class SweepReport:
+    scanned: int = 0
+    orphaned: int = 0
+    orphaned_bytes: int = 0
+    deleted: int = 0
+    reclaimed_bytes: int = 0
+
+
+def referencing_urls(key: str) -> set[str]:
+    """file_url values that resolve to the file under a key, in either layout"""
+    name = key.rsplit("/", 1)[-1]
+    return {UPLOAD_URL_PREFIX + key, UPLOAD_URL_PREFIX + name, UPLOAD_URL_PREFIX + shard_path(name)}
+
+
+def referenced_keys(connection: Connection, keys: list[str]) -> set[str]:
+    """The keys among these that an invoice or a stored file row still references"""
+    by_url, by_hash = {}, {}
+    for key in keys:
+        for url in referencing_urls(key):
+            by_url.setdefault(url, []).append(key)
+        stem = os.path.splitext(key.rsplit("/", 1)[-1])[0]
+        if CONTENT_HASH.match(stem):
+            by_hash.setdefault(stem, []).append(key)
+    
+    referenced = set()
+    for url in connection.scalars(select(Invoice.file_url).where(Invoice.file_url.in_(list(by_url)))):
+        referenced.update(by_url[url])
+    if by_hash:
+        for sha256 in connection.scalars(select(StoredFile.sha256).where(StoredFile.sha256.in_(list(by_hash)))):
+            referenced.update(by_hash[sha256])
+    return referenced
+
+
+def sweep_uploads(
+    engine: Engine,
+    store: StorageBackend,
+    grace_seconds: int,
+    batch_size: int = 500,
+    dry_run: bool = False,
+    now: Optional[float] = None
+) -> SweepReport:
+    """Delete the store's unreferenced files older than the grace period
+    
+    References are read from the primary (engine), never a replica that
+    could be missing a file's newest invoice.
+    """
+    cutoff = (time.time() if now is None else now) - grace_seconds
+    report = SweepReport()
+    listing = store.list_objects()
+    while batch := list(islice(listing, batch_size)):
+        report.scanned += len(batch)
+        candidates = [
+            item for item in batch if item.key.endswith(SWEPT_SUFFIXES) and item.modified < cutoff
+        ]
+        if not candidates:
+            continue
+        with engine.connect() as connection:
+            referenced = referenced_keys(connection, [item.key for item in candidates])
+        
+        for item in candidates:
+            if item.key in referenced:
+                continue
+            report.orphaned += 1
+            report.orphaned_bytes += item.size
+            if dry_run or not store.delete(item.key, unmodified_since=cutoff):
+                continue
+            report.deleted += 1
+            report.reclaimed_bytes += item.size
+            metrics.upload_gc_deleted_files.inc()
+            metrics.upload_gc_reclaimed_bytes.inc(item.size)
+    return report
+
+
+def expire_idempotency_keys(engine: Engine, writer=None) -> int:
+    """Delete expired Idempotency-Key records, through the single writer if there is one"""
+    def expire(db: Session) -> int:
+        return IdempotencyService(db).delete_expired()
+    
+    if writer is not None:
+        return writer.run(expire)
+    with Session(engine) as db:
+        return expire(db)
+
+
+async def sweep_periodically(engine: Engine, config=settings, writer=None) -> None:
+    """Sweep the upload store every UPLOAD_GC_INTERVAL_SECONDS until cancelled
+    
+    The sweep blocks on disk, the bucket and the database, so it runs in
+    the thread pool; a failed sweep is logged and retried next interval.
+    Database writes go through writer (the app's write queue) when given.
+    """
+    while True:
+        await asyncio.sleep(config.UPLOAD_GC_INTERVAL_SECONDS)
+        try:
+            report = await run_in_threadpool(
+                sweep_uploads,
+                engine,
+                file_handler.storage,
+                config.UPLOAD_GC_GRACE_SECONDS,
+                config.UPLOAD_GC_BATCH_SIZE,
+                config.UPLOAD_GC_DRY_RUN
+            )
+            expired = await run_in_threadpool(resumable_uploads.expire)
+            expired_keys = await run_in_threadpool(expire_idempotency_keys, engine, writer)
+        except Exception:
+            logger.exception("Upload sweep failed")
+        else:
+            logger.info(
+                "Upload sweep: %s; %d stale upload sessions and %d expired idempotency keys removed",
+                report, expired, expired_keys
+            )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.db.sweep_uploads")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    parser.add_argument("--batch-size", type=int, default=settings.UPLOAD_GC_BATCH_SIZE, help="files checked per query")
+    parser.add_argument(
+        "--grace-seconds", type=int, default=settings.UPLOAD_GC_GRACE_SECONDS, help="skip files younger than this"
+    )
+    args = parser.parse_args(argv)
+    
+    report = sweep_uploads(engine, file_handler.storage, args.grace_seconds, args.batch_size, args.dry_run)
+    verb = "Would delete" if args.dry_run else "Deleted"
+    deleted = report.orphaned if args.dry_run else report.deleted
+    freed = report.orphaned_bytes if args.dry_run else report.reclaimed_bytes
+    print(f"Scanned {report.scanned} files. {verb} {deleted} unreferenced files ({freed} bytes).")
+
+
+if __name__ == "__main__":
+    main()
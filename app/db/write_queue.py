@@ -0,0 +1,200 @@
+"""
+Single-writer queue with group commit for SQLite.
+
+SQLite allows one writer at a time; concurrent request sessions that write
+race for the lock (``database is locked`` once ``busy_timeout`` runs out)
+and every small transaction pays its own fsync. Instead, write endpoints
+hand their service call to ``WriteQueue`` as a job (``job(db) -> result``):
+
+- one writer thread owns the only write connection and opens a
+  ``BEGIN IMMEDIATE`` transaction per batch;
+- each job runs inside its own SAVEPOINT, with a session joined to it
+  through a nested one, so the services' ``db.commit()`` only releases the
+  inner savepoint, and a job that fails is rolled back alone and whole,
+  even after it committed once (e.g. a write followed by storing its
+  Idempotency-Key response);
+- the batch (everything queued while the previous batch committed, up to
+  ``max_batch``) is committed once, then every job's future resolves with
+  its result or exception;
+- the queue is bounded: when ``max_pending`` jobs are waiting, ``submit``
+  raises ``WriteQueueFull`` (served as 503) instead of piling up threads.
+
+``InlineWriter`` runs jobs directly on the request session; it is used when
+the queue is disabled or the database is not SQLite. Endpoints get either
+one wrapped in a ``RequestWriter`` through the ``get_writer`` dependency;
+async endpoints await ``RequestWriter.run_async``.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.core import metrics
+
+WriteJob = Callable[[Session], Any]
+
+
+class WriteQueueFull(Exception):
+    """The writer has more pending jobs than it accepts"""
+
+
+@dataclass
+class _QueuedJob:
+    job: WriteJob
+    info: dict
+    future: Future = field(default_factory=Future)
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+def install_sqlite_savepoints(engine: Engine) -> None:
+    """Let pysqlite run SAVEPOINTs and start write transactions eagerly
+
+    pysqlite's own transaction handling breaks SAVEPOINT, so it is turned
+    off and SQLAlchemy emits the BEGIN itself. IMMEDIATE takes the write
+    lock up front instead of failing on the first INSERT of a batch.
+    """
+    @event.listens_for(engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class InlineWriter:
+    """Runs write jobs on the request session, one commit per job"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def submit(self, job: WriteJob, **info) -> Future:
+        future = Future()
+        try:
+            future.set_result(job(self.db))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+class WriteQueue:
+    """Dedicated writer thread committing queued jobs in batches"""
+
+    def __init__(self, engine: Engine, max_pending: int = 1000, max_batch: int = 64):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.session_factory = sessionmaker(
+            join_transaction_mode="create_savepoint",
+            autoflush=False,
+            expire_on_commit=False
+        )
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the writer thread if it is not running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """Finish the queued jobs and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, job: WriteJob, **info) -> Future:
+        """Queue a job; the future resolves once its batch is committed"""
+        self.start()
+        queued = _QueuedJob(job, info)
+        try:
+            self._queue.put_nowait(queued)
+        except queue.Full:
+            metrics.write_queue_rejected.inc()
+            raise WriteQueueFull()
+        return queued.future
+
+    def run(self, job: WriteJob, **info) -> Any:
+        """Queue a job and wait for its result"""
+        return self.submit(job, **info).result()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            jobs = [queued for queued in batch if queued is not None]
+            if jobs:
+                self._commit_batch(jobs)
+            if stopping:
+                return
+
+    def _commit_batch(self, jobs: list[_QueuedJob]) -> None:
+        succeeded = []
+        try:
+            with self.engine.connect() as connection:
+                transaction = connection.begin()
+                for queued in jobs:
+                    savepoint = connection.begin_nested()
+                    session = self.session_factory(bind=connection, info=queued.info)
+                    try:
+                        result = queued.job(session)
+                    except Exception as exc:
+                        session.close()
+                        savepoint.rollback()
+                        queued.future.set_exception(exc)
+                    else:
+                        session.close()
+                        savepoint.commit()
+                        succeeded.append((queued, result))
+                transaction.commit()
+        except Exception as exc:
+            # The batch did not commit: no job's changes are durable
+            for queued in jobs:
+                if not queued.future.done():
+                    queued.future.set_exception(exc)
+            return
+
+        metrics.write_batch_size.observe(len(jobs))
+        committed_at = time.monotonic()
+        for queued, result in succeeded:
+            metrics.write_queue_latency.observe(committed_at - queued.queued_at)
+            queued.future.set_result(result)
+
+
+class RequestWriter:
+    """Write executor bound to the session info of one request"""
+
+    def __init__(self, executor, **info):
+        self.executor = executor
+        self.info = info
+
+    def submit(self, job: WriteJob) -> Future:
+        return self.executor.submit(job, **self.info)
+
+    def run(self, job: WriteJob) -> Any:
+        return self.submit(job).result()
+
+    async def run_async(self, job: WriteJob) -> Any:
+        """Run a job from async code without blocking the event loop
+
+        Queued jobs are awaited; inline ones run in the thread pool, since
+        they query on the calling thread.
+        """
+        if isinstance(self.executor, InlineWriter):
+            return await run_in_threadpool(self.run, job)
+        return await asyncio.wrap_future(self.submit(job))
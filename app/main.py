@@ -1,21 +1,41 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-import os
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.core.config import settings
-from app.db.database import engine
-from app.models import Base
+from app.core import metrics
+from app.db.database import engine, write_queue
+from app.db.replication import CONSISTENCY_HEADER
+from app.db.migrations import check_schema_version
+from app.db.statement_timeout import StatementTimeoutError
+from app.db.sweep_uploads import sweep_periodically
+from app.db.write_queue import WriteQueueFull
+from app.core.concurrency import ETAG_HEADER
+from app.services.idempotency_service import REPLAYED_HEADER
 from app.api.v1.router import api_router
+from app.storage import LocalStorage
+from app.utils.file_handler import UploadFiles, SignedFiles, storage
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Startup: Schema changes are applied by `python -m app.db.migrate upgrade`;
+    # here we only verify the database is not behind the code
+    if settings.DB_SCHEMA_CHECK:
+        check_schema_version(engine)
+    # Unreferenced PDFs are removed in the background, never by requests
+    sweeper = None
+    if settings.UPLOAD_GC_INTERVAL_SECONDS > 0:
+        sweeper = asyncio.create_task(sweep_periodically(engine, writer=write_queue))
     yield
-    # Shutdown: Cleanup if needed
+    # Shutdown: stop sweeping, then commit whatever writes are still queued
+    if sweeper is not None:
+        sweeper.cancel()
+    if write_queue is not None:
+        write_queue.stop()
 
 
 app = FastAPI(
@@ -32,12 +52,47 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CONSISTENCY_HEADER, ETAG_HEADER, REPLAYED_HEADER],
 )
 
-# Mount uploads directory as static files
-uploads_dir = os.path.join(os.path.dirname(__file__), "..", "uploads")
-os.makedirs(uploads_dir, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    """A versioned UPDATE/DELETE matched no row: someone else wrote first"""
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "Registro alterado por outra requisição. Recarregue e tente novamente"}
+    )
+
+
+@app.exception_handler(StatementTimeoutError)
+async def statement_timeout_handler(request: Request, exc: StatementTimeoutError):
+    """A query ran past its route's budget and was cancelled by the database"""
+    route = request.scope.get("route")
+    metrics.statement_timeouts.inc(route=route.name if route else request.url.path)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Consulta excedeu o tempo limite. Tente novamente"},
+        headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(WriteQueueFull)
+async def write_queue_full_handler(request: Request, exc: WriteQueueFull):
+    """The single writer has too many pending jobs"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servidor sobrecarregado. Tente novamente"},
+        headers={"Retry-After": "1"}
+    )
+
+
+# Mount the local upload store as static files; object storage serves its
+# own (presigned) links
+if isinstance(storage, LocalStorage):
+    if settings.UPLOAD_PUBLIC_MOUNT:
+        app.mount("/uploads", UploadFiles(directory=storage.root), name="uploads")
+    # Signed download links: verified with an HMAC, no authentication or database
+    app.mount("/files", SignedFiles(directory=storage.root), name="files")
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
@@ -57,3 +112,9 @@ def root():
 def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Process metrics in the Prometheus text format"""
+    return metrics.render()
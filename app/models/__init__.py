@@ -2,5 +2,12 @@ from app.models.base import Base
 from app.models.user import User, RoleEnum
 from app.models.company import Company
 from app.models.invoice import Invoice
+from app.models.api_key import ApiKey
+from app.models.replication_state import ReplicationState
+from app.models.idempotency_key import IdempotencyKey
+from app.models.stored_file import StoredFile
 
-__all__ = ["Base", "User", "RoleEnum", "Company", "Invoice"]
+__all__ = [
+    "Base", "User", "RoleEnum", "Company", "Invoice", "ApiKey", "ReplicationState",
+    "IdempotencyKey", "StoredFile"
+]
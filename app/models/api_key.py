@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum as SQLEnum, func
+from sqlalchemy.orm import relationship
+from app.models.base import Base, mapper_args
+from app.models.user import RoleEnum
+
+
+class ApiKey(Base):
+    __tablename__ = "api_keys"
+    __mapper_args__ = mapper_args()
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    prefix = Column(String(16), unique=True, index=True, nullable=False)
+    hashed_key = Column(String(64), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=True)
+    role = Column(SQLEnum(RoleEnum), default=RoleEnum.user, nullable=False)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    user = relationship("User")
+    company = relationship("Company")
@@ -1,3 +1,29 @@
+from sqlalchemy import event
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
+
+
+def mapper_args(version=None) -> dict:
+    """__mapper_args__ shared by the models
+
+    Server defaults are fetched through INSERT/UPDATE ... RETURNING instead
+    of a refresh. With a version column, every UPDATE/DELETE also matches on
+    it (compare-and-set).
+    """
+    args = {"eager_defaults": True}
+    if version is not None:
+        args["version_id_col"] = version
+    return args
+
+
+@event.listens_for(Base, "init", propagate=True)
+def init_update_only_columns(target, args, kwargs):
+    """Start columns that are only set on UPDATE (updated_at) as an explicit NULL
+
+    Otherwise eager_defaults treats them as unknown after the INSERT and
+    selects them back in a second round trip.
+    """
+    for column in target.__table__.columns:
+        if column.onupdate is not None:
+            kwargs.setdefault(column.key, None)
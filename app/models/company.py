@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, func
 from sqlalchemy.orm import relationship
-from app.models.base import Base
+from app.models.base import Base, mapper_args
 
 
 class Company(Base):
@@ -15,6 +15,9 @@ class Company(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, server_default="1")
+    
+    __mapper_args__ = mapper_args(version)
     
     users = relationship("User", back_populates="company")
     invoices = relationship("Invoice", back_populates="company")
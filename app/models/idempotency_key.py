@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from app.models.base import Base
+
+
+class IdempotencyKey(Base):
+    """Stored outcome of a request sent with an Idempotency-Key header
+
+    A row without status_code marks a request that is still running.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    key = Column(String(255), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    response_headers = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    @property
+    def is_complete(self) -> bool:
+        return self.status_code is not None
@@ -1,23 +1,31 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date, Boolean, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date, Boolean, Index, func
 from sqlalchemy.orm import relationship
-from app.models.base import Base
+from app.models.base import Base, mapper_args
 
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_company_id_due_date", "company_id", "due_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
     description = Column(String(500), nullable=False)
     amount = Column(Numeric(12, 2), nullable=False)
-    due_date = Column(Date, nullable=False)
-    file_url = Column(String(500), nullable=True)
+    due_date = Column(Date, nullable=False, index=True)
+    file_url = Column(String(500), nullable=True, index=True)
+    stored_file_id = Column(Integer, ForeignKey("stored_files.id"), nullable=True)
     is_paid = Column(Boolean, default=False)
     paid_at = Column(DateTime(timezone=True), nullable=True)
     notes = Column(String(1000), nullable=True)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, server_default="1")
+    
+    __mapper_args__ = mapper_args(version)
     
     company = relationship("Company", back_populates="invoices")
     creator = relationship("User", foreign_keys=[created_by])
+    stored_file = relationship("StoredFile")
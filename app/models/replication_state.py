@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer
+from app.models.base import Base
+
+
+class ReplicationState(Base):
+    """Single-row write position, copied to replicas along with the data"""
+    __tablename__ = "replication_state"
+    
+    id = Column(Integer, primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from app.models.base import Base, mapper_args
+
+
+class StoredFile(Base):
+    """A PDF on disk, stored once under the SHA-256 of its contents
+    
+    ref_count is the number of invoices pointing at the file; identical
+    uploads share one row and one file.
+    """
+    __tablename__ = "stored_files"
+    __mapper_args__ = mapper_args()
+    
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), unique=True, index=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    @property
+    def etag(self) -> str:
+        """Strong entity tag: the contents never change under a hash"""
+        return f'"{self.sha256}"'
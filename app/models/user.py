@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum as SQLEnum, func
 from sqlalchemy.orm import relationship
-from app.models.base import Base
+from app.models.base import Base, mapper_args
 import enum
 
 
@@ -18,9 +18,12 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     name = Column(String(255), nullable=True)
     role = Column(SQLEnum(RoleEnum), default=RoleEnum.user, nullable=False)
-    company_id = Column(Integer, ForeignKey("companies.id"), nullable=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=True, index=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, server_default="1")
+    
+    __mapper_args__ = mapper_args(version)
     
     company = relationship("Company", back_populates="users")
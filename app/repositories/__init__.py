@@ -2,5 +2,11 @@ from app.repositories.base import BaseRepository
 from app.repositories.user_repository import UserRepository
 from app.repositories.company_repository import CompanyRepository
 from app.repositories.invoice_repository import InvoiceRepository
+from app.repositories.api_key_repository import ApiKeyRepository
+from app.repositories.idempotency_key_repository import IdempotencyKeyRepository
+from app.repositories.stored_file_repository import StoredFileRepository
 
-__all__ = ["BaseRepository", "UserRepository", "CompanyRepository", "InvoiceRepository"]
+__all__ = [
+    "BaseRepository", "UserRepository", "CompanyRepository", "InvoiceRepository",
+    "ApiKeyRepository", "IdempotencyKeyRepository", "StoredFileRepository"
+]
@@ -0,0 +1,22 @@
+from typing import Optional
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session, joinedload
+from app.models.api_key import ApiKey
+from app.repositories.base import BaseRepository
+
+BY_PREFIX = (
+    select(ApiKey)
+    .options(joinedload(ApiKey.user))
+    .where(ApiKey.prefix == bindparam("prefix"))
+)
+
+
+class ApiKeyRepository(BaseRepository[ApiKey]):
+    """Repository for ApiKey model"""
+    
+    def __init__(self, db: Session):
+        super().__init__(ApiKey, db)
+    
+    def get_by_prefix(self, prefix: str) -> Optional[ApiKey]:
+        """Get API key by its lookup prefix, loading the owner in the same query"""
+        return self.db.scalars(BY_PREFIX, {"prefix": prefix}).first()
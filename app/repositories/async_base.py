@@ -0,0 +1,73 @@
+from typing import Generic, TypeVar, Type, List, Optional
+from sqlalchemy import select, Select
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.base import Base
+from app.repositories.base import pk_lookup
+from app.core.tenancy import TenantScope, UNSCOPED
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+
+class AsyncBaseRepository(Generic[ModelType]):
+    """Async counterpart of BaseRepository with common CRUD operations
+    
+    Like BaseRepository, writes are flushed and committed by the caller and
+    queries built through _select() carry the tenant scope.
+    """
+    
+    tenant_column: Optional[str] = None
+    
+    def __init__(self, model: Type[ModelType], db: AsyncSession, scope: TenantScope = UNSCOPED):
+        self.model = model
+        self.db = db
+        self.scope = scope
+    
+    def _scope_criteria(self) -> list:
+        if self.tenant_column is None:
+            return []
+        return self.scope.criteria(getattr(self.model, self.tenant_column))
+    
+    def _select(self) -> Select:
+        """Select on the model restricted to the tenant scope"""
+        return select(self.model).where(*self._scope_criteria())
+    
+    async def get(self, id: int) -> Optional[ModelType]:
+        """Get a single record by ID within the tenant scope"""
+        if not self._scope_criteria():
+            return await self.db.get(self.model, id)
+        
+        obj = self.db.identity_map.get(identity_key(self.model, id))
+        if obj is not None:
+            return obj if self.scope.allows(getattr(obj, self.tenant_column)) else None
+        if self.scope.company_id is None:
+            return None
+        _, scoped = pk_lookup(self.model, self.tenant_column)
+        return await self.db.scalar(scoped, {"id": id, "tenant_id": self.scope.company_id})
+    
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
+        """Get all records with pagination"""
+        result = await self.db.scalars(self._select().offset(skip).limit(limit))
+        return list(result)
+    
+    async def create(self, obj: ModelType) -> ModelType:
+        """Create a new record"""
+        self.db.add(obj)
+        await self.db.flush()
+        return obj
+    
+    async def update(self, db_obj: ModelType, update_data: dict) -> ModelType:
+        """Update an existing record"""
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
+        await self.db.flush()
+        return db_obj
+    
+    async def delete(self, id: int) -> bool:
+        """Delete a record by ID"""
+        obj = await self.get(id)
+        if obj:
+            await self.db.delete(obj)
+            await self.db.flush()
+            return True
+        return False
@@ -0,0 +1,50 @@
+from typing import Optional, List
+from datetime import date
+from sqlalchemy import extract
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.invoice import Invoice
+from app.repositories.async_base import AsyncBaseRepository
+from app.core.tenancy import TenantScope, UNSCOPED
+
+
+class AsyncInvoiceRepository(AsyncBaseRepository[Invoice]):
+    """Async repository for Invoice model
+    
+    Lazy loading is not available on AsyncSession, so list queries eager-load
+    the company needed for the company name in responses.
+    """
+    
+    tenant_column = "company_id"
+    
+    def __init__(self, db: AsyncSession, scope: TenantScope = UNSCOPED):
+        super().__init__(Invoice, db, scope)
+    
+    async def _all(self, query) -> list[Invoice]:
+        result = await self.db.scalars(query.options(selectinload(Invoice.company)))
+        return list(result)
+    
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[Invoice]:
+        """Get all invoices with pagination"""
+        return await self._all(self._select().offset(skip).limit(limit))
+    
+    async def get_by_company(self, company_id: int) -> list[Invoice]:
+        """Get all invoices for a specific company"""
+        return await self._all(self._select().where(Invoice.company_id == company_id))
+    
+    async def get_by_month_year(self, month: int, year: int, company_id: Optional[int] = None) -> list[Invoice]:
+        """Get invoices for a specific month and year"""
+        query = self._select().where(
+            extract('month', Invoice.due_date) == month,
+            extract('year', Invoice.due_date) == year
+        )
+        if company_id:
+            query = query.where(Invoice.company_id == company_id)
+        return await self._all(query)
+    
+    async def get_by_date(self, target_date: date, company_id: Optional[int] = None) -> list[Invoice]:
+        """Get invoices for a specific date"""
+        query = self._select().where(Invoice.due_date == target_date)
+        if company_id:
+            query = query.where(Invoice.company_id == company_id)
+        return await self._all(query.order_by(Invoice.amount.desc()))
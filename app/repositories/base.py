@@ -1,38 +1,117 @@
+from functools import lru_cache
 from typing import Generic, TypeVar, Type, List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select, Select
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.orm.util import identity_key
 from app.models.base import Base
+from app.core.tenancy import TenantScope, UNSCOPED
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+# A prebuilt lookup: the statement without tenant criteria, and the same
+# statement restricted to the :tenant_id bind parameter
+Lookup = tuple[Select, Select]
+
+
+def tenant_variants(model, tenant_column: Optional[str], statement: Select) -> Lookup:
+    """Build a hot lookup once, with and without the tenant criteria
+    
+    Module-level statements with bind parameters are constructed a single
+    time and hit SQLAlchemy's compiled cache on every call, instead of
+    rebuilding a Query per request.
+    """
+    if tenant_column is None:
+        return statement, statement
+    return statement, statement.where(getattr(model, tenant_column) == bindparam("tenant_id"))
+
+
+@lru_cache(maxsize=None)
+def pk_lookup(model, tenant_column: Optional[str]) -> Lookup:
+    """Primary-key lookup of a model, built once per model"""
+    return tenant_variants(model, tenant_column, select(model).where(model.id == bindparam("id")))
+
 
 class BaseRepository(Generic[ModelType]):
-    """Base repository with common CRUD operations"""
+    """Base repository with common CRUD operations
+    
+    Writes are only flushed; the service that owns the request's unit of work
+    commits once at the end. Server-generated columns come back through
+    INSERT/UPDATE ... RETURNING (eager_defaults on the models), so no
+    refresh round trip is needed.
+    
+    Repositories of tenant-owned models name their tenant column; every query
+    built through _query() then carries the scope's WHERE criteria.
+    """
     
-    def __init__(self, model: Type[ModelType], db: Session):
+    tenant_column: Optional[str] = None
+    
+    def __init__(self, model: Type[ModelType], db: Session, scope: TenantScope = UNSCOPED):
         self.model = model
         self.db = db
+        self.scope = scope
+    
+    def _scope_criteria(self) -> list:
+        if self.tenant_column is None:
+            return []
+        return self.scope.criteria(getattr(self.model, self.tenant_column))
+    
+    def _in_scope(self, obj: ModelType) -> bool:
+        return self.tenant_column is None or self.scope.allows(getattr(obj, self.tenant_column))
+    
+    def _query(self) -> Query:
+        """Query on the model restricted to the tenant scope"""
+        return self.db.query(self.model).filter(*self._scope_criteria())
+    
+    def _lookup_args(self, lookup: Lookup, params: dict) -> Optional[tuple[Select, dict]]:
+        """Pick the lookup variant for the scope; None when the scope matches nothing"""
+        unscoped, scoped = lookup
+        if self.tenant_column is None or not self.scope.restricted:
+            return unscoped, params
+        if self.scope.company_id is None:
+            return None
+        return scoped, {**params, "tenant_id": self.scope.company_id}
+    
+    def _first(self, lookup: Lookup, **params) -> Optional[ModelType]:
+        """First row of a prebuilt lookup within the tenant scope"""
+        args = self._lookup_args(lookup, params)
+        return self.db.scalars(*args).first() if args else None
+    
+    def _all(self, lookup: Lookup, **params) -> List[ModelType]:
+        """All rows of a prebuilt lookup within the tenant scope"""
+        args = self._lookup_args(lookup, params)
+        return list(self.db.scalars(*args)) if args else []
     
     def get(self, id: int) -> Optional[ModelType]:
-        """Get a single record by ID"""
-        return self.db.query(self.model).filter(self.model.id == id).first()
+        """Get a single record by ID
+        
+        A row already loaded in this request is taken from the session's
+        identity map without another query; otherwise the lookup is a single
+        primary-key query that also carries the tenant criteria, so rows of
+        other tenants are never loaded.
+        """
+        if not self._scope_criteria():
+            return self.db.get(self.model, id)
+        
+        obj = self.db.identity_map.get(identity_key(self.model, id))
+        if obj is not None:
+            return obj if self._in_scope(obj) else None
+        return self._first(pk_lookup(self.model, self.tenant_column), id=id)
     
     def get_all(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
         """Get all records with pagination"""
-        return self.db.query(self.model).offset(skip).limit(limit).all()
+        return self._query().offset(skip).limit(limit).all()
     
     def create(self, obj: ModelType) -> ModelType:
         """Create a new record"""
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        self.db.flush()
         return obj
     
     def update(self, db_obj: ModelType, update_data: dict) -> ModelType:
         """Update an existing record"""
         for field, value in update_data.items():
             setattr(db_obj, field, value)
-        self.db.commit()
-        self.db.refresh(db_obj)
+        self.db.flush()
         return db_obj
     
     def delete(self, id: int) -> bool:
@@ -40,6 +119,6 @@ class BaseRepository(Generic[ModelType]):
         obj = self.get(id)
         if obj:
             self.db.delete(obj)
-            self.db.commit()
+            self.db.flush()
             return True
         return False
@@ -1,19 +1,25 @@
 from typing import Optional
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from app.models.company import Company
-from app.repositories.base import BaseRepository
+from app.repositories.base import BaseRepository, tenant_variants
+from app.core.tenancy import TenantScope, UNSCOPED
+
+BY_CNPJ = tenant_variants(Company, "id", select(Company).where(Company.cnpj == bindparam("cnpj")))
 
 
 class CompanyRepository(BaseRepository[Company]):
     """Repository for Company model"""
     
-    def __init__(self, db: Session):
-        super().__init__(Company, db)
+    tenant_column = "id"
+    
+    def __init__(self, db: Session, scope: TenantScope = UNSCOPED):
+        super().__init__(Company, db, scope)
     
     def get_by_cnpj(self, cnpj: str) -> Optional[Company]:
         """Get company by CNPJ"""
-        return self.db.query(Company).filter(Company.cnpj == cnpj).first()
+        return self._first(BY_CNPJ, cnpj=cnpj)
     
     def get_active_companies(self) -> list[Company]:
         """Get all active companies"""
-        return self.db.query(Company).filter(Company.is_active == True).all()
+        return self._query().filter(Company.is_active == True).all()
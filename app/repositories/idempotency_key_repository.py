@@ -0,0 +1,35 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.idempotency_key import IdempotencyKey
+from app.repositories.base import BaseRepository
+
+
+class IdempotencyKeyRepository(BaseRepository[IdempotencyKey]):
+    """Repository for IdempotencyKey model"""
+    
+    def __init__(self, db: Session):
+        super().__init__(IdempotencyKey, db)
+    
+    def get_by_key(self, user_id: int, key: str) -> Optional[IdempotencyKey]:
+        """Get the stored request for a user's key"""
+        return self._query().filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key
+        ).first()
+    
+    def reclaim(self, record: IdempotencyKey, now: datetime, expires_at: datetime) -> bool:
+        """Take over an unfinished record still reserved at the time this request read
+        
+        Only one of several concurrent retries matches the old reservation.
+        """
+        claimed = self._query().filter(
+            IdempotencyKey.id == record.id,
+            IdempotencyKey.status_code.is_(None),
+            IdempotencyKey.created_at == record.created_at
+        ).update({"created_at": now, "expires_at": expires_at}, synchronize_session="evaluate")
+        return claimed == 1
+    
+    def delete_expired(self, now: datetime) -> int:
+        """Delete every record past its expiry"""
+        return self._query().filter(IdempotencyKey.expires_at < now).delete(synchronize_session=False)
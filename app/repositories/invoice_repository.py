@@ -1,51 +1,75 @@
 from typing import Optional
 from datetime import date
 from sqlalchemy.orm import Session
-from sqlalchemy import extract
+from sqlalchemy import bindparam, extract, select
 from app.models.invoice import Invoice
-from app.repositories.base import BaseRepository
+from app.repositories.base import BaseRepository, tenant_variants
+from app.core.tenancy import TenantScope, UNSCOPED
+
+
+def _invoice_lookup(*criteria, order_by=None):
+    statement = select(Invoice).where(*criteria)
+    if order_by is not None:
+        statement = statement.order_by(order_by)
+    return tenant_variants(Invoice, "company_id", statement)
+
+
+_IN_MONTH = (
+    extract('month', Invoice.due_date) == bindparam("month"),
+    extract('year', Invoice.due_date) == bindparam("year")
+)
+_OF_COMPANY = Invoice.company_id == bindparam("company_id")
+_ON_DATE = Invoice.due_date == bindparam("due_date")
+
+BY_IDS = _invoice_lookup(Invoice.id.in_(bindparam("ids", expanding=True)))
+BY_COMPANY = _invoice_lookup(_OF_COMPANY)
+BY_MONTH = _invoice_lookup(*_IN_MONTH)
+BY_MONTH_AND_COMPANY = _invoice_lookup(*_IN_MONTH, _OF_COMPANY)
+BY_DATE = _invoice_lookup(_ON_DATE, order_by=Invoice.amount.desc())
+BY_DATE_AND_COMPANY = _invoice_lookup(_ON_DATE, _OF_COMPANY, order_by=Invoice.amount.desc())
 
 
 class InvoiceRepository(BaseRepository[Invoice]):
     """Repository for Invoice model"""
     
-    def __init__(self, db: Session):
-        super().__init__(Invoice, db)
+    tenant_column = "company_id"
+    
+    def __init__(self, db: Session, scope: TenantScope = UNSCOPED):
+        super().__init__(Invoice, db, scope)
+    
+    def get_many(self, ids: list[int]) -> list[Invoice]:
+        """Get the invoices with these IDs in one query"""
+        return self._all(BY_IDS, ids=list(ids)) if ids else []
     
     def get_by_company(self, company_id: int) -> list[Invoice]:
         """Get all invoices for a specific company"""
-        return self.db.query(Invoice).filter(Invoice.company_id == company_id).all()
+        return self._all(BY_COMPANY, company_id=company_id)
     
     def get_paid_invoices(self) -> list[Invoice]:
         """Get all paid invoices"""
-        return self.db.query(Invoice).filter(Invoice.is_paid == True).all()
+        return self._query().filter(Invoice.is_paid == True).all()
     
     def get_unpaid_invoices(self) -> list[Invoice]:
         """Get all unpaid invoices"""
-        return self.db.query(Invoice).filter(Invoice.is_paid == False).all()
+        return self._query().filter(Invoice.is_paid == False).all()
     
     def get_overdue_invoices(self, current_date: date = None) -> list[Invoice]:
         """Get all overdue unpaid invoices"""
         if current_date is None:
             current_date = date.today()
-        return self.db.query(Invoice).filter(
+        return self._query().filter(
             Invoice.is_paid == False,
             Invoice.due_date < current_date
         ).all()
     
     def get_by_month_year(self, month: int, year: int, company_id: Optional[int] = None) -> list[Invoice]:
         """Get invoices for a specific month and year"""
-        query = self.db.query(Invoice).filter(
-            extract('month', Invoice.due_date) == month,
-            extract('year', Invoice.due_date) == year
-        )
         if company_id:
-            query = query.filter(Invoice.company_id == company_id)
-        return query.all()
+            return self._all(BY_MONTH_AND_COMPANY, month=month, year=year, company_id=company_id)
+        return self._all(BY_MONTH, month=month, year=year)
     
     def get_by_date(self, target_date: date, company_id: Optional[int] = None) -> list[Invoice]:
         """Get invoices for a specific date"""
-        query = self.db.query(Invoice).filter(Invoice.due_date == target_date)
         if company_id:
-            query = query.filter(Invoice.company_id == company_id)
-        return query.order_by(Invoice.amount.desc()).all()
+            return self._all(BY_DATE_AND_COMPANY, due_date=target_date, company_id=company_id)
+        return self._all(BY_DATE, due_date=target_date)
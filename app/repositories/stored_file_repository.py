@@ -0,0 +1,25 @@
+from typing import Optional
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+from app.models.stored_file import StoredFile
+from app.repositories.base import BaseRepository, tenant_variants
+
+BY_SHA256 = tenant_variants(StoredFile, None, select(StoredFile).where(StoredFile.sha256 == bindparam("sha256")))
+BY_SHA256S = tenant_variants(
+    StoredFile, None, select(StoredFile).where(StoredFile.sha256.in_(bindparam("hashes", expanding=True)))
+)
+
+
+class StoredFileRepository(BaseRepository[StoredFile]):
+    """Repository for StoredFile model"""
+    
+    def __init__(self, db: Session):
+        super().__init__(StoredFile, db)
+    
+    def get_by_sha256(self, sha256: str) -> Optional[StoredFile]:
+        """Get the stored file with the given contents hash"""
+        return self._first(BY_SHA256, sha256=sha256)
+    
+    def get_by_sha256s(self, hashes: list[str]) -> list[StoredFile]:
+        """Get the stored files with any of these contents hashes in one query"""
+        return self._all(BY_SHA256S, hashes=list(hashes)) if hashes else []
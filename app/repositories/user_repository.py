@@ -1,27 +1,33 @@
 from typing import Optional
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from app.models.user import User, RoleEnum
-from app.repositories.base import BaseRepository
+from app.repositories.base import BaseRepository, tenant_variants
+from app.core.tenancy import TenantScope, UNSCOPED
+
+BY_EMAIL = tenant_variants(User, "company_id", select(User).where(User.email == bindparam("email")))
 
 
 class UserRepository(BaseRepository[User]):
     """Repository for User model"""
     
-    def __init__(self, db: Session):
-        super().__init__(User, db)
+    tenant_column = "company_id"
+    
+    def __init__(self, db: Session, scope: TenantScope = UNSCOPED):
+        super().__init__(User, db, scope)
     
     def get_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
-        return self.db.query(User).filter(User.email == email).first()
+        return self._first(BY_EMAIL, email=email)
     
     def get_by_role(self, role: RoleEnum) -> list[User]:
         """Get all users with specific role"""
-        return self.db.query(User).filter(User.role == role).all()
+        return self._query().filter(User.role == role).all()
     
     def get_active_users(self) -> list[User]:
         """Get all active users"""
-        return self.db.query(User).filter(User.is_active == True).all()
+        return self._query().filter(User.is_active == True).all()
     
     def get_by_company(self, company_id: int) -> list[User]:
         """Get all users from a specific company"""
-        return self.db.query(User).filter(User.company_id == company_id).all()
+        return self._query().filter(User.company_id == company_id).all()
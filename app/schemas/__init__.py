@@ -2,10 +2,12 @@ from app.schemas.token import Token, TokenData
 from app.schemas.user import UserCreate, UserUpdate, UserOut
 from app.schemas.company import CompanyCreate, CompanyUpdate, CompanyOut
 from app.schemas.invoice import InvoiceCreate, InvoiceUpdate, InvoiceOut, InvoiceWithCompany
+from app.schemas.api_key import ApiKeyCreate, ApiKeyOut, ApiKeyCreated
 
 __all__ = [
     "Token", "TokenData",
     "UserCreate", "UserUpdate", "UserOut",
     "CompanyCreate", "CompanyUpdate", "CompanyOut",
-    "InvoiceCreate", "InvoiceUpdate", "InvoiceOut", "InvoiceWithCompany"
+    "InvoiceCreate", "InvoiceUpdate", "InvoiceOut", "InvoiceWithCompany",
+    "ApiKeyCreate", "ApiKeyOut", "ApiKeyCreated"
 ]
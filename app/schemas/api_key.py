@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from app.models.user import RoleEnum
+
+
+class ApiKeyCreate(BaseModel):
+    name: str
+    role: RoleEnum = RoleEnum.user
+    company_id: Optional[int] = None
+    user_id: Optional[int] = None
+
+
+class ApiKeyOut(BaseModel):
+    id: int
+    name: str
+    prefix: str
+    user_id: int
+    company_id: Optional[int]
+    role: RoleEnum
+    is_active: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ApiKeyCreated(ApiKeyOut):
+    key: str
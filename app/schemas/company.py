@@ -33,6 +33,7 @@ class CompanyOut(BaseModel):
     address: Optional[str]
     is_active: bool
     created_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
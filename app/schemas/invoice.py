@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import date, datetime
 
@@ -36,6 +36,7 @@ class InvoiceOut(BaseModel):
     notes: Optional[str]
     created_by: int
     created_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
@@ -43,3 +44,18 @@ class InvoiceOut(BaseModel):
 
 class InvoiceWithCompany(InvoiceOut):
     company_name: Optional[str] = None
+    download_url: Optional[str] = None
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-f]{64}$")
+
+
+class UploadSessionOut(BaseModel):
+    id: str
+    invoice_id: int
+    offset: int
+    size: int
+    expires_at: datetime
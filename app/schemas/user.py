@@ -21,6 +21,7 @@ class UserUpdate(BaseModel):
     role: Optional[RoleEnum] = None
     company_id: Optional[int] = None
     is_active: Optional[bool] = None
+    password: Optional[str] = None
 
 
 class UserOut(BaseModel):
@@ -31,6 +32,7 @@ class UserOut(BaseModel):
     company_id: Optional[int]
     is_active: bool
     created_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
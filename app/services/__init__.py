@@ -2,5 +2,11 @@ from app.services.auth_service import AuthService
 from app.services.user_service import UserService
 from app.services.company_service import CompanyService
 from app.services.invoice_service import InvoiceService
+from app.services.api_key_service import ApiKeyService
+from app.services.idempotency_service import IdempotencyService
+from app.services.stored_file_service import StoredFileService
 
-__all__ = ["AuthService", "UserService", "CompanyService", "InvoiceService"]
+__all__ = [
+    "AuthService", "UserService", "CompanyService", "InvoiceService", "ApiKeyService",
+    "IdempotencyService", "StoredFileService"
+]
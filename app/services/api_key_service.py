@@ -0,0 +1,125 @@
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from app.models.api_key import ApiKey
+from app.models.user import User, RoleEnum
+from app.schemas.api_key import ApiKeyCreate
+from app.core.security import (
+    generate_api_key,
+    get_api_key_hash,
+    get_api_key_prefix,
+    verify_api_key
+)
+from app.repositories.api_key_repository import ApiKeyRepository
+from app.repositories.company_repository import CompanyRepository
+from app.repositories.user_repository import UserRepository
+
+ROLE_RANK = {RoleEnum.user: 0, RoleEnum.admin: 1, RoleEnum.superadmin: 2}
+
+
+class ApiKeyService:
+    """Service for API key management and authentication"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.api_key_repo = ApiKeyRepository(db)
+
+    def get_all_api_keys(self) -> list[ApiKey]:
+        """Get all API keys"""
+        return self.api_key_repo.get_all()
+
+    def create_api_key(self, key_data: ApiKeyCreate, current_user: User) -> tuple[ApiKey, str]:
+        """Create a new API key, returning the record and the plain key"""
+        owner = current_user
+        if key_data.user_id is not None and key_data.user_id != current_user.id:
+            owner = UserRepository(self.db).get(key_data.user_id)
+            if not owner:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Usuário não encontrado"
+                )
+
+        # A key can never grant more than its owner has
+        if ROLE_RANK[key_data.role] > ROLE_RANK[owner.role]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Perfil da chave excede o perfil do usuário"
+            )
+
+        if key_data.role == RoleEnum.user and not key_data.company_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Chaves com perfil user exigem uma empresa"
+            )
+
+        # Only company users are scoped by tenant; an admin key tied to a
+        # company would still reach every company
+        if key_data.role != RoleEnum.user and key_data.company_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Apenas chaves com perfil user podem ser limitadas a uma empresa"
+            )
+
+        if key_data.company_id and not CompanyRepository(self.db).get(key_data.company_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Empresa não encontrada"
+            )
+
+        plain_key, prefix = generate_api_key()
+        api_key = ApiKey(
+            name=key_data.name,
+            prefix=prefix,
+            hashed_key=get_api_key_hash(plain_key),
+            user_id=owner.id,
+            company_id=key_data.company_id,
+            role=key_data.role
+        )
+        self.api_key_repo.create(api_key)
+        self.db.commit()
+        return api_key, plain_key
+
+    def delete_api_key(self, api_key_id: int) -> bool:
+        """Revoke an API key"""
+        if not self.api_key_repo.delete(api_key_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chave de API não encontrada"
+            )
+        self.db.commit()
+        return True
+
+    def authenticate_api_key(self, plain_key: str) -> User:
+        """Resolve an API key into a principal scoped to the key's company and role"""
+        prefix = get_api_key_prefix(plain_key)
+        api_key = self.api_key_repo.get_by_prefix(prefix) if prefix else None
+        if not api_key or not api_key.is_active or not verify_api_key(plain_key, api_key.hashed_key):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Chave de API inválida"
+            )
+
+        owner = api_key.user
+        if not owner.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Usuário inativo"
+            )
+
+        # The owner may have been demoted or moved since the key was issued:
+        # the key acts with at most the owner's current role, and a company
+        # user's key only ever reaches the owner's current company
+        role = api_key.role if ROLE_RANK[api_key.role] <= ROLE_RANK[owner.role] else owner.role
+        company_id = owner.company_id if owner.role == RoleEnum.user else api_key.company_id
+
+        # Transient principal: never added to the session, so the key's scope
+        # cannot leak back into the owner's row
+        return User(
+            id=owner.id,
+            email=owner.email,
+            name=api_key.name,
+            role=role,
+            company_id=company_id,
+            is_active=True,
+            created_at=owner.created_at,
+            version=owner.version
+        )
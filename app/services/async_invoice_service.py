@@ -0,0 +1,83 @@
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import Optional
+from app.models.invoice import Invoice
+from app.schemas.invoice import InvoiceWithCompany
+from app.repositories.async_invoice_repository import AsyncInvoiceRepository
+from app.core.tenancy import TenantScope, UNSCOPED
+from app.services.invoice_service import (
+    invoice_to_dict,
+    filter_by_paid_status,
+    build_calendar_data,
+    build_dashboard_stats
+)
+
+
+class AsyncInvoiceService:
+    """Async service for invoice read operations"""
+    
+    def __init__(self, db: AsyncSession, scope: TenantScope = UNSCOPED):
+        self.db = db
+        self.scope = scope
+        self.invoice_repo = AsyncInvoiceRepository(db, scope)
+    
+    async def get_all_invoices(
+        self,
+        company_id: Optional[int] = None,
+        month: Optional[int] = None,
+        year: Optional[int] = None,
+        is_paid: Optional[bool] = None
+    ) -> list[InvoiceWithCompany]:
+        """Get all invoices with optional filters"""
+        company_id = self.scope.default_company(company_id)
+        if month and year:
+            invoices = await self.invoice_repo.get_by_month_year(month, year, company_id)
+        elif company_id:
+            invoices = await self.invoice_repo.get_by_company(company_id)
+        else:
+            invoices = await self.invoice_repo.get_all()
+        
+        invoices = filter_by_paid_status(invoices, is_paid)
+        return [InvoiceWithCompany(**invoice_to_dict(invoice)) for invoice in invoices]
+    
+    async def get_invoice_by_id(self, invoice_id: int) -> Invoice:
+        """Get invoice by ID"""
+        invoice = await self.invoice_repo.get(invoice_id)
+        if not invoice:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Fatura não encontrada"
+            )
+        return invoice
+    
+    async def get_calendar_data(
+        self,
+        month: int,
+        year: int,
+        company_id: Optional[int] = None
+    ) -> dict:
+        """Get calendar data for a specific month"""
+        company_id = self.scope.default_company(company_id)
+        invoices = await self.invoice_repo.get_by_month_year(month, year, company_id)
+        return build_calendar_data(invoices, month, year)
+    
+    async def get_invoices_by_date(
+        self,
+        target_date: date,
+        company_id: Optional[int] = None
+    ) -> list[dict]:
+        """Get invoices for a specific date"""
+        company_id = self.scope.default_company(company_id)
+        invoices = await self.invoice_repo.get_by_date(target_date, company_id)
+        return [invoice_to_dict(invoice) for invoice in invoices]
+    
+    async def get_dashboard_stats(self, company_id: Optional[int] = None) -> dict:
+        """Get dashboard statistics"""
+        company_id = self.scope.default_company(company_id)
+        if company_id:
+            invoices = await self.invoice_repo.get_by_company(company_id)
+        else:
+            invoices = await self.invoice_repo.get_all()
+        
+        return build_dashboard_stats(invoices)
@@ -5,14 +5,17 @@ from app.models.user import User
 from app.models.invoice import Invoice
 from app.schemas.company import CompanyCreate, CompanyUpdate
 from app.repositories.company_repository import CompanyRepository
+from typing import Optional
+from app.core.tenancy import TenantScope, UNSCOPED
+from app.core.concurrency import check_version
 
 
 class CompanyService:
     """Service for company management operations"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, scope: TenantScope = UNSCOPED):
         self.db = db
-        self.company_repo = CompanyRepository(db)
+        self.company_repo = CompanyRepository(db, scope)
     
     def get_all_companies(self) -> list[Company]:
         """Get all companies"""
@@ -38,11 +41,19 @@ class CompanyService:
             )
         
         company = Company(**company_data.model_dump())
-        return self.company_repo.create(company)
+        self.company_repo.create(company)
+        self.db.commit()
+        return company
     
-    def update_company(self, company_id: int, company_data: CompanyUpdate) -> Company:
+    def update_company(
+        self,
+        company_id: int,
+        company_data: CompanyUpdate,
+        expected_version: Optional[int] = None
+    ) -> Company:
         """Update an existing company"""
         company = self.get_company_by_id(company_id)
+        check_version(company, expected_version)
         
         # Check if CNPJ is being changed and already exists
         if company_data.cnpj and company_data.cnpj != company.cnpj:
@@ -54,7 +65,9 @@ class CompanyService:
                 )
         
         update_data = company_data.model_dump(exclude_unset=True)
-        return self.company_repo.update(company, update_data)
+        self.company_repo.update(company, update_data)
+        self.db.commit()
+        return company
     
     def delete_company(self, company_id: int) -> bool:
         """Delete a company"""
@@ -76,4 +89,6 @@ class CompanyService:
                 detail=f"Não é possível excluir. A empresa possui {invoices_count} fatura(s) vinculada(s)."
             )
         
-        return self.company_repo.delete(company.id)
+        deleted = self.company_repo.delete(company.id)
+        self.db.commit()
+        return deleted
@@ -0,0 +1,136 @@
+import hashlib
+import json
+from http import HTTPStatus
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.idempotency_key import IdempotencyKey
+from app.repositories.idempotency_key_repository import IdempotencyKeyRepository
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Hash what identifies a request, so a key cannot be reused for another one"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IdempotencyService:
+    """Service for Idempotency-Key handling
+    
+    begin() reserves the key in its own short transaction before the write
+    runs, so a retry that arrives while the first attempt is still running
+    is told to wait instead of repeating the write. A reservation older than
+    IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS belongs to an attempt that died
+    before completing, and the next retry takes it over. complete() stores
+    the response for replay; release() frees the key when the write failed.
+    
+    Every method writes, so endpoints run them as write jobs (writer.run);
+    records handed from one job to the next are detached and looked up again
+    by ID. Expired records are deleted by the periodic sweeper, and one
+    still found here is simply replaced.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.idempotency_repo = IdempotencyKeyRepository(db)
+    
+    def _check(self, record: IdempotencyKey, fingerprint: str, now: datetime) -> IdempotencyKey:
+        if record.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key já usada para outra requisição"
+            )
+        if not record.is_complete and not self._reclaim(record, now):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Requisição com esta Idempotency-Key ainda em processamento"
+            )
+        return record
+    
+    def _reclaim(self, record: IdempotencyKey, now: datetime) -> bool:
+        stale_before = now - timedelta(seconds=settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS)
+        if record.created_at > stale_before:
+            return False
+        expires_at = now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        if not self.idempotency_repo.reclaim(record, now, expires_at):
+            self.db.rollback()
+            return False
+        self.db.commit()
+        return True
+    
+    def begin(self, key: str, user_id: int, fingerprint: str) -> IdempotencyKey:
+        """Return the stored response for a key, or reserve the key for this request"""
+        now = datetime.utcnow()
+        record = self.idempotency_repo.get_by_key(user_id, key)
+        if record and record.expires_at <= now:
+            # Expired but not swept yet: the key is free again
+            self.idempotency_repo.delete(record.id)
+            record = None
+        if record:
+            self.db.commit()
+            return self._check(record, fingerprint, now)
+        
+        record = IdempotencyKey(
+            key=key,
+            user_id=user_id,
+            fingerprint=fingerprint,
+            created_at=now,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        )
+        try:
+            self.idempotency_repo.create(record)
+            self.db.commit()
+        except IntegrityError:
+            # Another attempt with the same key reserved it first
+            self.db.rollback()
+            return self._check(self.idempotency_repo.get_by_key(user_id, key), fingerprint, now)
+        return record
+    
+    def complete(
+        self,
+        record: IdempotencyKey,
+        status_code: int,
+        body: Any,
+        headers: Optional[dict[str, str]] = None
+    ) -> None:
+        """Store the response (and headers such as its ETag) that retries will receive"""
+        record = self.idempotency_repo.get(record.id)
+        if record is None:
+            return
+        self.idempotency_repo.update(record, {
+            "status_code": status_code,
+            "response_body": json.dumps(body, separators=(",", ":")),
+            "response_headers": json.dumps(headers, separators=(",", ":")) if headers else None
+        })
+        self.db.commit()
+    
+    def release(self, record: IdempotencyKey) -> None:
+        """Free the key after a failed write so the client can retry"""
+        self.idempotency_repo.delete(record.id)
+        self.db.commit()
+    
+    def delete_expired(self, now: Optional[datetime] = None) -> int:
+        """Delete every record past its expiry; run by the periodic sweeper"""
+        deleted = self.idempotency_repo.delete_expired(now or datetime.utcnow())
+        self.db.commit()
+        return deleted
+    
+    @staticmethod
+    def replay(record: IdempotencyKey) -> JSONResponse:
+        """Answer a retry with the stored response"""
+        headers = json.loads(record.response_headers) if record.response_headers else {}
+        return JSONResponse(
+            status_code=record.status_code,
+            content=json.loads(record.response_body),
+            headers={**headers, REPLAYED_HEADER: "true"}
+        )
@@ -1,19 +1,103 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import Optional
 from app.models.invoice import Invoice
 from app.models.company import Company
 from app.schemas.invoice import InvoiceCreate, InvoiceUpdate, InvoiceWithCompany
 from app.repositories.invoice_repository import InvoiceRepository
+from app.services.stored_file_service import StoredFileService
+from app.utils.file_handler import content_url, signed_download_url
+from app.utils.invoice_archive import ArchivedInvoice
+from app.core.tenancy import TenantScope, UNSCOPED
+from app.core.concurrency import check_version
+
+
+def invoice_to_dict(invoice: Invoice) -> dict:
+    """Serialize an invoice with its company name"""
+    return {
+        "id": invoice.id,
+        "company_id": invoice.company_id,
+        "description": invoice.description,
+        "amount": float(invoice.amount),
+        "due_date": invoice.due_date,
+        "file_url": invoice.file_url,
+        "download_url": signed_download_url(invoice.file_url),
+        "is_paid": invoice.is_paid,
+        "paid_at": invoice.paid_at,
+        "notes": invoice.notes,
+        "created_by": invoice.created_by,
+        "created_at": invoice.created_at,
+        "version": invoice.version,
+        "company_name": invoice.company.name if invoice.company else None
+    }
+
+
+def filter_by_paid_status(invoices: list[Invoice], is_paid: Optional[bool]) -> list[Invoice]:
+    """Filter invoices by paid status if specified"""
+    if is_paid is None:
+        return invoices
+    return [inv for inv in invoices if inv.is_paid == is_paid]
+
+
+def build_calendar_data(invoices: list[Invoice], month: int, year: int) -> dict:
+    """Group invoices by day of the month"""
+    days = {}
+    for inv in invoices:
+        day = inv.due_date.day
+        if day not in days:
+            days[day] = {"total": 0, "paid": 0, "pending": 0, "amount": 0}
+        days[day]["total"] += 1
+        days[day]["amount"] += float(inv.amount)
+        if inv.is_paid:
+            days[day]["paid"] += 1
+        else:
+            days[day]["pending"] += 1
+    
+    return {"month": month, "year": year, "days": days}
+
+
+def build_dashboard_stats(invoices: list[Invoice]) -> dict:
+    """Compute dashboard statistics from a list of invoices"""
+    total = len(invoices)
+    paid = len([inv for inv in invoices if inv.is_paid])
+    pending = len([inv for inv in invoices if not inv.is_paid])
+    
+    # Overdue unpaid
+    today = date.today()
+    overdue = len([inv for inv in invoices if not inv.is_paid and inv.due_date < today])
+    
+    # Pending amount
+    pending_amount = sum(float(inv.amount) for inv in invoices if not inv.is_paid)
+    
+    # Upcoming (next 7 days)
+    upcoming_date = today + timedelta(days=7)
+    upcoming = len([
+        inv for inv in invoices
+        if not inv.is_paid and today <= inv.due_date <= upcoming_date
+    ])
+    
+    return {
+        "total": total,
+        "paid": paid,
+        "pending": pending,
+        "overdue": overdue,
+        "upcoming": upcoming,
+        "pending_amount": pending_amount
+    }
 
 
 class InvoiceService:
-    """Service for invoice management operations"""
+    """Service for invoice management operations
+    
+    Every lookup is restricted to the tenant scope, so invoices of other
+    companies behave as if they did not exist.
+    """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, scope: TenantScope = UNSCOPED):
         self.db = db
-        self.invoice_repo = InvoiceRepository(db)
+        self.scope = scope
+        self.invoice_repo = InvoiceRepository(db, scope)
     
     def get_all_invoices(
         self,
@@ -23,6 +107,7 @@ class InvoiceService:
         is_paid: Optional[bool] = None
     ) -> list[InvoiceWithCompany]:
         """Get all invoices with optional filters"""
+        company_id = self.scope.default_company(company_id)
         if month and year:
             invoices = self.invoice_repo.get_by_month_year(month, year, company_id)
         elif company_id:
@@ -31,29 +116,10 @@ class InvoiceService:
             invoices = self.invoice_repo.get_all()
         
         # Filter by paid status if specified
-        if is_paid is not None:
-            invoices = [inv for inv in invoices if inv.is_paid == is_paid]
+        invoices = filter_by_paid_status(invoices, is_paid)
         
         # Add company name to each invoice
-        result = []
-        for invoice in invoices:
-            invoice_dict = {
-                "id": invoice.id,
-                "company_id": invoice.company_id,
-                "description": invoice.description,
-                "amount": float(invoice.amount),
-                "due_date": invoice.due_date,
-                "file_url": invoice.file_url,
-                "is_paid": invoice.is_paid,
-                "paid_at": invoice.paid_at,
-                "notes": invoice.notes,
-                "created_by": invoice.created_by,
-                "created_at": invoice.created_at,
-                "company_name": invoice.company.name if invoice.company else None
-            }
-            result.append(InvoiceWithCompany(**invoice_dict))
-        
-        return result
+        return [InvoiceWithCompany(**invoice_to_dict(invoice)) for invoice in invoices]
     
     def get_invoice_by_id(self, invoice_id: int) -> Invoice:
         """Get invoice by ID"""
@@ -71,14 +137,28 @@ class InvoiceService:
             **invoice_data.model_dump(),
             created_by=created_by
         )
-        return self.invoice_repo.create(invoice)
+        self.invoice_repo.create(invoice)
+        self.db.commit()
+        return invoice
     
-    def update_invoice(self, invoice_id: int, invoice_data: InvoiceUpdate) -> Invoice:
+    def update_invoice(
+        self,
+        invoice_id: int,
+        invoice_data: InvoiceUpdate,
+        expected_version: Optional[int] = None
+    ) -> Invoice:
         """Update an existing invoice"""
         invoice = self.get_invoice_by_id(invoice_id)
+        check_version(invoice, expected_version)
         
         update_data = invoice_data.model_dump(exclude_unset=True)
         
+        # A file URL set by hand no longer points at the stored file
+        new_file_url = update_data.get("file_url", invoice.file_url)
+        if invoice.stored_file_id is not None and new_file_url != invoice.file_url:
+            StoredFileService(self.db).release(invoice.stored_file_id)
+            update_data["stored_file_id"] = None
+        
         # Handle paid_at timestamp
         if "is_paid" in update_data:
             if update_data["is_paid"] and not invoice.is_paid:
@@ -86,23 +166,80 @@ class InvoiceService:
             elif not update_data["is_paid"]:
                 update_data["paid_at"] = None
         
-        return self.invoice_repo.update(invoice, update_data)
+        self.invoice_repo.update(invoice, update_data)
+        self.db.commit()
+        return invoice
+    
+    def get_invoices_by_ids(self, invoice_ids: list[int]) -> list[Invoice]:
+        """Get the invoices with these IDs that exist, in one query"""
+        return self.invoice_repo.get_many(invoice_ids)
+    
+    def attach_file(self, invoice_id: int, sha256: str, size: int) -> Invoice:
+        """Point an invoice at the stored file with these contents
+        
+        The previous file stays on disk; the upload sweeper removes it once
+        nothing references it.
+        """
+        invoice = self.get_invoice_by_id(invoice_id)
+        self._point_at_file(invoice, sha256, size)
+        self.db.commit()
+        return invoice
+    
+    def attach_files(self, files: list[tuple[int, str, int]]) -> list[Invoice]:
+        """Point several invoices at their stored files in one transaction
+        
+        files holds (invoice_id, sha256, size) entries. The invoices are
+        loaded in one query and all changes are committed together. Entries
+        whose invoice no longer exists are skipped; the invoices that were
+        attached are returned.
+        """
+        invoices = {invoice.id: invoice for invoice in self.invoice_repo.get_many([entry[0] for entry in files])}
+        attached = []
+        for invoice_id, sha256, size in files:
+            if invoice_id in invoices:
+                self._point_at_file(invoices[invoice_id], sha256, size)
+                attached.append(invoices[invoice_id])
+        self.db.commit()
+        return attached
+    
+    def _point_at_file(self, invoice: Invoice, sha256: str, size: int) -> None:
+        stored_files = StoredFileService(self.db)
+        stored = stored_files.acquire(sha256, size)
+        previous_id = invoice.stored_file_id
+        
+        self.invoice_repo.update(invoice, {"file_url": content_url(sha256), "stored_file_id": stored.id})
+        if previous_id is not None:
+            stored_files.release(previous_id)
     
-    def toggle_paid_status(self, invoice_id: int) -> Invoice:
-        """Toggle the paid status of an invoice"""
+    def toggle_paid_status(self, invoice_id: int, expected_version: Optional[int] = None) -> Invoice:
+        """Toggle the paid status of an invoice
+        
+        The UPDATE matches on the version that was read, so two concurrent
+        toggles cannot both apply; the loser gets a conflict instead of
+        silently undoing the other.
+        """
         invoice = self.get_invoice_by_id(invoice_id)
+        check_version(invoice, expected_version)
         
         update_data = {
             "is_paid": not invoice.is_paid,
             "paid_at": datetime.utcnow() if not invoice.is_paid else None
         }
         
-        return self.invoice_repo.update(invoice, update_data)
+        self.invoice_repo.update(invoice, update_data)
+        self.db.commit()
+        return invoice
     
-    def delete_invoice(self, invoice_id: int) -> bool:
+    def delete_invoice(self, invoice_id: int, expected_version: Optional[int] = None) -> bool:
         """Delete an invoice"""
         invoice = self.get_invoice_by_id(invoice_id)
-        return self.invoice_repo.delete(invoice.id)
+        check_version(invoice, expected_version)
+        stored_file_id = invoice.stored_file_id
+        deleted = self.invoice_repo.delete(invoice.id)
+        if stored_file_id is not None:
+            StoredFileService(self.db).release(stored_file_id)
+        self.db.commit()
+        return deleted
     
     def get_calendar_data(
         self,
@@ -111,22 +248,9 @@ class InvoiceService:
         company_id: Optional[int] = None
     ) -> dict:
         """Get calendar data for a specific month"""
+        company_id = self.scope.default_company(company_id)
         invoices = self.invoice_repo.get_by_month_year(month, year, company_id)
-        
-        # Group by day
-        days = {}
-        for inv in invoices:
-            day = inv.due_date.day
-            if day not in days:
-                days[day] = {"total": 0, "paid": 0, "pending": 0, "amount": 0}
-            days[day]["total"] += 1
-            days[day]["amount"] += float(inv.amount)
-            if inv.is_paid:
-                days[day]["paid"] += 1
-            else:
-                days[day]["pending"] += 1
-        
-        return {"month": month, "year": year, "days": days}
+        return build_calendar_data(invoices, month, year)
     
     def get_invoices_by_date(
         self,
@@ -134,59 +258,41 @@ class InvoiceService:
         company_id: Optional[int] = None
     ) -> list[dict]:
         """Get invoices for a specific date"""
+        company_id = self.scope.default_company(company_id)
         invoices = self.invoice_repo.get_by_date(target_date, company_id)
+        return [invoice_to_dict(invoice) for invoice in invoices]
+    
+    def get_month_archive(
+        self,
+        month: int,
+        year: int,
+        company_id: Optional[int] = None
+    ) -> list[ArchivedInvoice]:
+        """Invoices of a month to archive, read up front
         
-        result = []
-        for invoice in invoices:
-            invoice_dict = {
-                "id": invoice.id,
-                "company_id": invoice.company_id,
-                "description": invoice.description,
-                "amount": float(invoice.amount),
-                "due_date": invoice.due_date,
-                "file_url": invoice.file_url,
-                "is_paid": invoice.is_paid,
-                "paid_at": invoice.paid_at,
-                "notes": invoice.notes,
-                "created_by": invoice.created_by,
-                "created_at": invoice.created_at,
-                "company_name": invoice.company.name if invoice.company else None
-            }
-            result.append(invoice_dict)
-        
-        return result
+        The archive is streamed after the session is released, so only plain
+        values leave here.
+        """
+        company_id = self.scope.default_company(company_id)
+        invoices = self.invoice_repo.get_by_month_year(month, year, company_id)
+        return [
+            ArchivedInvoice(
+                id=invoice.id,
+                description=invoice.description,
+                amount=invoice.amount,
+                due_date=invoice.due_date,
+                is_paid=bool(invoice.is_paid),
+                file_url=invoice.file_url
+            )
+            for invoice in sorted(invoices, key=lambda invoice: (invoice.due_date, invoice.id))
+        ]
     
     def get_dashboard_stats(self, company_id: Optional[int] = None) -> dict:
         """Get dashboard statistics"""
+        company_id = self.scope.default_company(company_id)
         if company_id:
             invoices = self.invoice_repo.get_by_company(company_id)
         else:
             invoices = self.invoice_repo.get_all()
         
-        total = len(invoices)
-        paid = len([inv for inv in invoices if inv.is_paid])
-        pending = len([inv for inv in invoices if not inv.is_paid])
-        
-        # Overdue unpaid
-        today = date.today()
-        overdue = len([inv for inv in invoices if not inv.is_paid and inv.due_date < today])
-        
-        # Pending amount
-        pending_amount = sum(float(inv.amount) for inv in invoices if not inv.is_paid)
-        
-        # Upcoming (next 7 days)
-        from datetime import timedelta
-        upcoming_date = today + timedelta(days=7)
-        upcoming = len([
-            inv for inv in invoices
-            if not inv.is_paid and today <= inv.due_date <= upcoming_date
-        ])
-        
-        return {
-            "total": total,
-            "paid": paid,
-            "pending": pending,
-            "overdue": overdue,
-            "upcoming": upcoming,
-            "pending_amount": pending_amount
-        }
+        return build_dashboard_stats(invoices)
@@ -0,0 +1,46 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models.stored_file import StoredFile
+from app.repositories.stored_file_repository import StoredFileRepository
+
+
+class StoredFileService:
+    """Reference counting of content-addressed files
+    
+    Only flushes; the caller's unit of work commits together with the
+    invoice change that added or dropped the reference.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.stored_file_repo = StoredFileRepository(db)
+    
+    def get_by_sha256(self, sha256: str) -> Optional[StoredFile]:
+        """Get the stored file with the given contents hash"""
+        return self.stored_file_repo.get_by_sha256(sha256)
+    
+    def get_by_sha256s(self, hashes: list[str]) -> list[StoredFile]:
+        """Get the stored files with any of these contents hashes"""
+        return self.stored_file_repo.get_by_sha256s(hashes)
+    
+    def acquire(self, sha256: str, size: int) -> StoredFile:
+        """Add a reference to the file with these contents, recording it if new"""
+        stored = self.stored_file_repo.get_by_sha256(sha256)
+        if stored is None:
+            stored = self.stored_file_repo.create(StoredFile(sha256=sha256, size=size, ref_count=1))
+        else:
+            # Incremented in SQL, not from the value read
+            self.stored_file_repo.update(stored, {"ref_count": StoredFile.ref_count + 1})
+        return stored
+    
+    def release(self, stored_file_id: int) -> None:
+        """Drop a reference, forgetting the file once nothing references it
+        
+        The file itself is left to the upload sweeper.
+        """
+        stored = self.stored_file_repo.get(stored_file_id)
+        if stored is None:
+            return
+        self.stored_file_repo.update(stored, {"ref_count": StoredFile.ref_count - 1})
+        if stored.ref_count <= 0:
+            self.stored_file_repo.delete(stored.id)
@@ -1,9 +1,10 @@
+from typing import Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash
 from app.repositories.user_repository import UserRepository
+from app.core.concurrency import check_version
 
 
 class UserService:
@@ -27,8 +28,12 @@ class UserService:
             )
         return user
     
-    def create_user(self, user_data: UserCreate) -> User:
-        """Create a new user"""
+    def create_user(self, user_data: UserCreate, hashed_password: str) -> User:
+        """Create a new user
+        
+        The password is hashed by the caller: bcrypt takes a noticeable
+        fraction of a second and must not run inside a write job.
+        """
         # Check if email already exists
         if self.user_repo.get_by_email(user_data.email):
             raise HTTPException(
@@ -39,16 +44,25 @@ class UserService:
         # Create user
         user = User(
             email=user_data.email,
-            hashed_password=get_password_hash(user_data.password),
+            hashed_password=hashed_password,
             name=user_data.name,
             role=user_data.role,
             company_id=user_data.company_id
         )
-        return self.user_repo.create(user)
+        self.user_repo.create(user)
+        self.db.commit()
+        return user
     
-    def update_user(self, user_id: int, user_data: UserUpdate) -> User:
-        """Update an existing user"""
+    def update_user(
+        self,
+        user_id: int,
+        user_data: UserUpdate,
+        expected_version: Optional[int] = None,
+        hashed_password: Optional[str] = None
+    ) -> User:
+        """Update an existing user; a new password arrives already hashed"""
         user = self.get_user_by_id(user_id)
+        check_version(user, expected_version)
         
         # Check if email is being changed and already exists
         if user_data.email and user_data.email != user.email:
@@ -59,10 +73,16 @@ class UserService:
                     detail="Email já cadastrado"
                 )
         
-        update_data = user_data.model_dump(exclude_unset=True)
-        return self.user_repo.update(user, update_data)
+        update_data = user_data.model_dump(exclude_unset=True, exclude={"password"})
+        if hashed_password is not None:
+            update_data["hashed_password"] = hashed_password
+        self.user_repo.update(user, update_data)
+        self.db.commit()
+        return user
     
     def delete_user(self, user_id: int) -> bool:
         """Delete a user"""
         user = self.get_user_by_id(user_id)
-        return self.user_repo.delete(user.id)
+        deleted = self.user_repo.delete(user.id)
+        self.db.commit()
+        return deleted
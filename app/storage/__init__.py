@@ -0,0 +1,24 @@
+from app.storage.base import StorageBackend, StoredObject, shard_path
+from app.storage.local import LocalStorage
+from app.storage.s3 import S3Storage, build_s3_client
+
+
+def build_storage(config, root: str) -> StorageBackend:
+    """Storage backend selected by STORAGE_BACKEND; root is the local store"""
+    if config.STORAGE_BACKEND == "local":
+        return LocalStorage(root)
+    if config.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            build_s3_client(config),
+            config.S3_BUCKET,
+            prefix=config.S3_PREFIX,
+            part_size=config.S3_PART_SIZE,
+            presign_ttl=config.DOWNLOAD_URL_TTL_SECONDS
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {config.STORAGE_BACKEND}")
+
+
+__all__ = [
+    "StorageBackend", "StoredObject", "LocalStorage", "S3Storage",
+    "build_storage", "build_s3_client", "shard_path"
+]
@@ -0,0 +1,96 @@
+"""
+Storage backend interface for invoice PDFs.
+
+Files are addressed by a key: the path of the file under the store, e.g.
+``ab/cd/<sha256>.pdf`` (``/uploads/<key>`` is the invoice's file_url).
+Backends only move bytes; validation, hashing and reference counting stay
+in FileHandler and the services.
+"""
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, Optional
+from starlette.responses import Response
+
+PDF_MEDIA_TYPE = "application/pdf"
+
+
+def shard_path(name: str) -> str:
+    """Two-level fan-out of a file name: <name> -> ab/cd/<name>
+    
+    Stored names are hex (SHA-256, or uuid4 for older uploads), so the first
+    four characters spread the files evenly over 65536 directories instead
+    of one huge flat one.
+    """
+    if len(os.path.splitext(name)[0]) < 4:
+        return name
+    return f"{name[0:2]}/{name[2:4]}/{name}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an entity tag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    """An object as listed by its store"""
+    key: str
+    size: int
+    modified: float  # seconds since the epoch
+
+
+class StorageBackend(ABC):
+    """Where uploaded PDFs live"""
+    
+    @abstractmethod
+    async def save(self, key: str, chunks: AsyncIterator[bytes]) -> None:
+        """Store the streamed chunks under a key, replacing any object there"""
+    
+    @abstractmethod
+    def delete(self, key: str, unmodified_since: Optional[float] = None) -> bool:
+        """Remove an object; False when there was nothing to remove
+        
+        With unmodified_since, an object written at or after that time is
+        kept (and False returned): it was stored again since it was listed.
+        """
+    
+    @abstractmethod
+    def touch(self, key: str) -> bool:
+        """Mark an object as just stored; False when it is missing
+        
+        A sweep that listed the object earlier then keeps it, as if it had
+        been stored again (see delete's unmodified_since).
+        """
+    
+    @abstractmethod
+    def read(self, key: str, chunk_size: int) -> Optional[Iterator[bytes]]:
+        """The object's bytes in chunks, or None when it is missing
+        
+        Blocking; iterate it from a worker thread.
+        """
+    
+    @abstractmethod
+    def list_objects(self) -> Iterator[StoredObject]:
+        """Every object in the store, in no particular order, listed lazily"""
+    
+    @abstractmethod
+    def response(
+        self,
+        key: str,
+        headers: dict,
+        if_none_match: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Optional[Response]:
+        """Response that sends the object's bytes to the client
+        
+        None when the object is known to be missing.
+        """
+    
+    @abstractmethod
+    def download_url(self, key: str, now: Optional[float] = None) -> str:
+        """Short-lived link to the object that needs no authentication"""
@@ -0,0 +1,154 @@
+import os
+import tempfile
+from typing import AsyncIterator, Iterator, Optional
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from app.core.config import settings
+from app.core.security import download_expiry, sign_download
+from app.storage.base import PDF_MEDIA_TYPE, StorageBackend, StoredObject, etag_matches, shard_path
+
+SIGNED_URL_PREFIX = "/files/"
+
+
+class LocalStorage(StorageBackend):
+    """Files in a directory of this node
+    
+    Writes go to a temporary file in the store, off the event loop, and are
+    renamed into place. Downloads are sent by FileResponse or, with
+    UPLOAD_ACCEL_REDIRECT_PREFIX set, by the front proxy.
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+    
+    def path(self, key: str) -> Optional[str]:
+        """Path on disk of a key; None for anything outside the store"""
+        parts = key.split("/")
+        if any(part in ("", ".", "..") for part in parts):
+            return None
+        return os.path.join(self.root, *parts)
+    
+    def candidate_paths(self, key: str) -> list[str]:
+        """Where a key's file may be: flat keys are also looked up in their shard"""
+        path = self.path(key)
+        if path is None:
+            return []
+        if "/" not in key and shard_path(key) != key:
+            return [path, self.path(shard_path(key))]
+        return [path]
+    
+    @staticmethod
+    def move(source: str, destination: str) -> None:
+        """Rename a file into place, creating its shard directories"""
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(source, destination)
+    
+    @staticmethod
+    def _discard(temp) -> None:
+        temp.close()
+        if os.path.exists(temp.name):
+            os.remove(temp.name)
+    
+    async def save(self, key: str, chunks: AsyncIterator[bytes]) -> None:
+        destination = self.path(key)
+        if destination is None:
+            raise ValueError(f"Invalid storage key: {key}")
+        temp = await run_in_threadpool(
+            tempfile.NamedTemporaryFile, dir=self.root, suffix=".part", delete=False
+        )
+        try:
+            async for chunk in chunks:
+                await run_in_threadpool(temp.write, chunk)
+            await run_in_threadpool(temp.close)
+            await run_in_threadpool(self.move, temp.name, destination)
+        except BaseException:
+            await run_in_threadpool(self._discard, temp)
+            raise
+    
+    def delete(self, key: str, unmodified_since: Optional[float] = None) -> bool:
+        # The removal itself tells whether the file was there, without a
+        # stat call first unless the modification time must be checked
+        for candidate in self.candidate_paths(key):
+            try:
+                if unmodified_since is not None and os.stat(candidate).st_mtime >= unmodified_since:
+                    return False
+                os.remove(candidate)
+                return True
+            except OSError:
+                continue
+        return False
+    
+    def touch(self, key: str) -> bool:
+        for candidate in self.candidate_paths(key):
+            try:
+                os.utime(candidate)
+                return True
+            except OSError:
+                continue
+        return False
+    
+    def read(self, key: str, chunk_size: int) -> Optional[Iterator[bytes]]:
+        for candidate in self.candidate_paths(key):
+            try:
+                source = open(candidate, "rb")
+            except OSError:
+                continue
+            return self._chunks(source, chunk_size)
+        return None
+    
+    @staticmethod
+    def _chunks(source, chunk_size: int) -> Iterator[bytes]:
+        with source:
+            while chunk := source.read(chunk_size):
+                yield chunk
+    
+    def list_objects(self) -> Iterator[StoredObject]:
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat_result = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                yield StoredObject(key, stat_result.st_size, stat_result.st_mtime)
+    
+    def response(
+        self,
+        key: str,
+        headers: dict,
+        if_none_match: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Optional[Response]:
+        """FileResponse (Range, If-Range) or the proxy's X-Accel-Redirect"""
+        if settings.UPLOAD_ACCEL_REDIRECT_PREFIX:
+            headers["X-Accel-Redirect"] = settings.UPLOAD_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + key
+            if filename:
+                headers["Content-Disposition"] = f'inline; filename="{filename}"'
+            return Response(headers=headers, media_type=PDF_MEDIA_TYPE)
+        
+        for candidate in self.candidate_paths(key):
+            try:
+                stat_result = os.stat(candidate)
+            except FileNotFoundError:
+                continue
+            response = FileResponse(
+                candidate,
+                headers=headers,
+                media_type=PDF_MEDIA_TYPE,
+                filename=filename,
+                stat_result=stat_result,
+                content_disposition_type="inline"
+            )
+            # Files without a content hash revalidate against the stat-based tag
+            if "ETag" not in headers and etag_matches(if_none_match, response.headers["etag"]):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
+    
+    def download_url(self, key: str, now: Optional[float] = None) -> str:
+        """Link to the /files mount, signed with an HMAC of the key"""
+        expires = download_expiry(now)
+        return f"{SIGNED_URL_PREFIX}{key}?expires={expires}&signature={sign_download(key, expires)}"
@@ -0,0 +1,170 @@
+from typing import AsyncIterator, Iterator, Optional
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import RedirectResponse, Response
+from app.storage.base import PDF_MEDIA_TYPE, StorageBackend, StoredObject
+
+# S3 refuses multipart parts below 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def build_s3_client(config):
+    """boto3 S3 client from the settings; boto3 is only needed for this backend"""
+    try:
+        import boto3
+    except ImportError:
+        raise RuntimeError("STORAGE_BACKEND=s3 requer o pacote boto3 (pip install boto3)")
+    return boto3.client(
+        "s3",
+        endpoint_url=config.S3_ENDPOINT_URL or None,
+        region_name=config.S3_REGION or None
+    )
+
+
+class S3Storage(StorageBackend):
+    """Objects in an S3-compatible bucket, shared by every API node
+    
+    Uploads are streamed as multipart parts of part_size bytes, so a node
+    never holds more than one part; files smaller than a part are a single
+    PUT. Downloads and listing links are presigned GETs, so the bytes go
+    from the bucket to the client without passing through the API.
+    
+    The client is any object with boto3's S3 client methods; calls block,
+    so they run in the thread pool.
+    """
+    
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        prefix: str = "",
+        part_size: int = 8 * 1024 * 1024,
+        presign_ttl: int = 300
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.presign_ttl = presign_ttl
+    
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+    
+    async def save(self, key: str, chunks: AsyncIterator[bytes]) -> None:
+        object_key = self.object_key(key)
+        buffer, parts, upload_id = bytearray(), [], None
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                if len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        created = await run_in_threadpool(
+                            self.client.create_multipart_upload,
+                            Bucket=self.bucket, Key=object_key, ContentType=PDF_MEDIA_TYPE
+                        )
+                        upload_id = created["UploadId"]
+                    parts.append(await self._upload_part(object_key, upload_id, len(parts) + 1, buffer))
+                    buffer = bytearray()
+            
+            if upload_id is None:
+                await run_in_threadpool(
+                    self.client.put_object,
+                    Bucket=self.bucket, Key=object_key, Body=bytes(buffer), ContentType=PDF_MEDIA_TYPE
+                )
+                return
+            if buffer:
+                parts.append(await self._upload_part(object_key, upload_id, len(parts) + 1, buffer))
+            await run_in_threadpool(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            # Uploaded parts are billed until the upload is aborted
+            if upload_id is not None:
+                await run_in_threadpool(
+                    self.client.abort_multipart_upload,
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id
+                )
+            raise
+    
+    async def _upload_part(self, object_key: str, upload_id: str, number: int, body: bytearray) -> dict:
+        uploaded = await run_in_threadpool(
+            self.client.upload_part,
+            Bucket=self.bucket, Key=object_key, UploadId=upload_id, PartNumber=number, Body=bytes(body)
+        )
+        return {"PartNumber": number, "ETag": uploaded["ETag"]}
+    
+    def delete(self, key: str, unmodified_since: Optional[float] = None) -> bool:
+        object_key = self.object_key(key)
+        if unmodified_since is not None:
+            try:
+                head = self.client.head_object(Bucket=self.bucket, Key=object_key)
+            except self.client.exceptions.ClientError:
+                return False
+            if head["LastModified"].timestamp() >= unmodified_since:
+                return False
+        # DELETE succeeds whether or not the object existed
+        self.client.delete_object(Bucket=self.bucket, Key=object_key)
+        return True
+    
+    def touch(self, key: str) -> bool:
+        # Objects are immutable: copying one onto itself renews LastModified
+        object_key = self.object_key(key)
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=object_key,
+                CopySource={"Bucket": self.bucket, "Key": object_key},
+                MetadataDirective="REPLACE",
+                ContentType=PDF_MEDIA_TYPE
+            )
+        except self.client.exceptions.ClientError:
+            return False
+        return True
+    
+    def read(self, key: str, chunk_size: int) -> Optional[Iterator[bytes]]:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))["Body"]
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return self._chunks(body, chunk_size)
+    
+    @staticmethod
+    def _chunks(body, chunk_size: int) -> Iterator[bytes]:
+        # The body holds a pooled HTTP connection until it is closed
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+    
+    def list_objects(self) -> Iterator[StoredObject]:
+        params = {"Bucket": self.bucket, "Prefix": self.prefix}
+        while True:
+            page = self.client.list_objects_v2(**params)
+            for item in page.get("Contents", []):
+                yield StoredObject(
+                    item["Key"][len(self.prefix):], item["Size"], item["LastModified"].timestamp()
+                )
+            if not page.get("IsTruncated"):
+                return
+            params["ContinuationToken"] = page["NextContinuationToken"]
+    
+    def presigned_url(self, key: str, filename: Optional[str] = None) -> str:
+        params = {"Bucket": self.bucket, "Key": self.object_key(key), "ResponseContentType": PDF_MEDIA_TYPE}
+        if filename:
+            params["ResponseContentDisposition"] = f'inline; filename="{filename}"'
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.presign_ttl)
+    
+    def response(
+        self,
+        key: str,
+        headers: dict,
+        if_none_match: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Optional[Response]:
+        """Redirect to a presigned GET; the bucket serves Range and conditionals"""
+        # The redirect target expires, so the redirect itself must not be cached
+        headers["Cache-Control"] = "private, no-store"
+        return RedirectResponse(self.presigned_url(key, filename), status_code=307, headers=headers)
+    
+    def download_url(self, key: str, now: Optional[float] = None) -> str:
+        return self.presigned_url(key)
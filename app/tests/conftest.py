@@ -1,11 +1,33 @@
 import pytest
+from datetime import date
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
 from app.main import app
-from app.db.database import get_db
-from app.models import Base, User, Company, RoleEnum
+from app.core.config import settings
+from app.db import database
+from app.db.database import (
+    get_db,
+    get_read_db,
+    get_principal_db,
+    get_writer,
+    get_async_db,
+    get_async_database_url
+)
+from app.db.migrations import upgrade
+from app.db.write_queue import InlineWriter, RequestWriter
+from app.models import Base, User, Company, Invoice, RoleEnum
 from app.core.security import get_password_hash
+from app.storage import LocalStorage
+from app.utils import file_handler
+from app.utils.resumable_upload import resumable_uploads
+
+# Tests build their schema with create_all; skip the startup migration check
+settings.DB_SCHEMA_CHECK = False
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -15,7 +37,14 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False}
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Async engine on the same database; NullPool keeps connections off other event loops
+async_engine = create_async_engine(
+    get_async_database_url(SQLALCHEMY_DATABASE_URL),
+    poolclass=NullPool
+)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 @pytest.fixture(scope="function")
@@ -30,6 +59,43 @@ def db():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="function")
+def statements(db):
+    """Record the SQL statements executed on the test database"""
+    executed = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture(autouse=True)
+def upload_store(tmp_path, monkeypatch):
+    """Keep every test's uploads in a temporary local store
+    
+    Redirects the storage backend, the resumable upload sessions and the
+    /uploads and /files mounts, so no test writes into the repository.
+    """
+    store = LocalStorage(str(tmp_path / "uploads"))
+    monkeypatch.setattr(file_handler, "storage", store)
+    monkeypatch.setattr(resumable_uploads, "root", str(tmp_path / "upload-sessions"))
+    for route in app.routes:
+        if isinstance(route, Mount) and isinstance(route.app, StaticFiles):
+            monkeypatch.setattr(route.app, "directory", store.root)
+            monkeypatch.setattr(route.app, "all_directories", [store.root])
+    return store
+
+
+@pytest.fixture(scope="function")
+async def async_db(db):
+    """Create an async session on the test database"""
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+
+
 @pytest.fixture(scope="function")
 def client(db):
     """Create a test client with database dependency override"""
@@ -39,12 +105,90 @@ def client(db):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_principal_db] = override_get_db
+    app.dependency_overrides[get_writer] = lambda: RequestWriter(InlineWriter(db))
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def live_db(tmp_path, monkeypatch):
+    """Point the app's real session factories and writer at a migrated file database
+    
+    Unlike `client`, nothing is overridden: requests go through LazySession,
+    the read-only sessions, statement budgets and the single writer.
+    """
+    url = f"sqlite:///{tmp_path / 'live.db'}"
+    live_engine = database.build_engine(url)
+    upgrade(live_engine)
+    writer = database.build_write_queue(url)
+    for factory in (database.SessionLocal, database.ReadSessionLocal):
+        monkeypatch.setitem(factory.kw, "bind", live_engine)
+    monkeypatch.setattr(database, "write_queue", writer)
+    monkeypatch.setattr(settings, "UPLOAD_GC_INTERVAL_SECONDS", 0)
+    yield live_engine
+    writer.stop()
+    writer.engine.dispose()
+    live_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def live_client(live_db):
+    """Test client on the live database, with an admin and a company user"""
+    session = sessionmaker(bind=live_db, expire_on_commit=False)()
+    company = Company(name="Live Company", cnpj="98.765.432/0001-10")
+    session.add(company)
+    session.flush()
+    session.add_all([
+        User(
+            email="admin@live.com",
+            hashed_password=get_password_hash("admin123"),
+            name="Live Admin",
+            role=RoleEnum.admin
+        ),
+        User(
+            email="user@live.com",
+            hashed_password=get_password_hash("user123"),
+            name="Live User",
+            role=RoleEnum.user,
+            company_id=company.id
+        )
+    ])
+    session.commit()
+    session.close()
+    with TestClient(app) as test_client:
+        test_client.company_id = company.id
+        yield test_client
+
+
+@pytest.fixture
+def live_admin_headers(live_client):
+    """Authorization headers for the live admin"""
+    response = live_client.post(
+        "/api/v1/auth/login",
+        data={"username": "admin@live.com", "password": "admin123"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def live_user_headers(live_client):
+    """Authorization headers for the live company user"""
+    response = live_client.post(
+        "/api/v1/auth/login",
+        data={"username": "user@live.com", "password": "user123"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
 @pytest.fixture
 def test_company(db):
     """Create a test company"""
@@ -61,6 +205,28 @@ def test_company(db):
     return company
 
 
+@pytest.fixture
+def make_invoice(db, test_company, admin_user):
+    """Factory for committed invoices of the test company, created by the admin
+    
+    Keyword arguments override the invoice's columns.
+    """
+    def make(**columns):
+        invoice = Invoice(**{
+            "company_id": test_company.id,
+            "description": "Boleto",
+            "amount": 10,
+            "due_date": date.today(),
+            "created_by": admin_user.id,
+            **columns
+        })
+        db.add(invoice)
+        db.commit()
+        return invoice
+    
+    return make
+
+
 @pytest.fixture
 def superadmin_user(db):
     """Create a superadmin user"""
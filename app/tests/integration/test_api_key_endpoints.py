@@ -0,0 +1,201 @@
+import pytest
+from datetime import date
+
+
+class TestApiKeyEndpoints:
+    """Test API key management and authentication"""
+    
+    def _create_key(self, client, headers, **payload):
+        response = client.post("/api/v1/api-keys/", json=payload, headers=headers)
+        assert response.status_code == 201
+        return response.json()
+    
+    def test_create_api_key(self, client, auth_headers_superadmin, test_company):
+        """Test creating an API key scoped to a company"""
+        data = self._create_key(
+            client, auth_headers_superadmin,
+            name="ERP", role="user", company_id=test_company.id
+        )
+        
+        assert data["key"].startswith(f"dk_{data['prefix']}_")
+        assert data["company_id"] == test_company.id
+        assert data["role"] == "user"
+    
+    def test_list_api_keys_hides_key(self, client, auth_headers_superadmin, test_company):
+        """Test that listing keys never exposes the plain key"""
+        self._create_key(
+            client, auth_headers_superadmin,
+            name="ERP", role="user", company_id=test_company.id
+        )
+        
+        response = client.get("/api/v1/api-keys/", headers=auth_headers_superadmin)
+        
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+        assert "key" not in response.json()[0]
+    
+    def test_create_api_key_as_admin_forbidden(self, client, auth_headers_admin):
+        """Test that only superadmins manage API keys"""
+        response = client.post(
+            "/api/v1/api-keys/",
+            json={"name": "ERP", "role": "admin"},
+            headers=auth_headers_admin
+        )
+        
+        assert response.status_code == 403
+    
+    def test_create_user_key_requires_company(self, client, auth_headers_superadmin):
+        """Test that user-scoped keys must be bound to a company"""
+        response = client.post(
+            "/api/v1/api-keys/",
+            json={"name": "ERP", "role": "user"},
+            headers=auth_headers_superadmin
+        )
+        
+        assert response.status_code == 400
+    
+    def test_create_admin_key_with_company_refused(self, client, auth_headers_superadmin, test_company):
+        """Test that admin keys cannot claim a company scope they would not enforce"""
+        response = client.post(
+            "/api/v1/api-keys/",
+            json={"name": "ERP", "role": "admin", "company_id": test_company.id},
+            headers=auth_headers_superadmin
+        )
+        
+        assert response.status_code == 400
+    
+    def test_create_key_unknown_company(self, client, auth_headers_superadmin):
+        """Test creating a key for a nonexistent company"""
+        response = client.post(
+            "/api/v1/api-keys/",
+            json={"name": "ERP", "role": "user", "company_id": 9999},
+            headers=auth_headers_superadmin
+        )
+        
+        assert response.status_code == 404
+    
+    def test_create_key_cannot_exceed_owner_role(self, client, auth_headers_superadmin, admin_user):
+        """Test that a key cannot grant more than its owner's role"""
+        response = client.post(
+            "/api/v1/api-keys/",
+            json={"name": "ERP", "role": "superadmin", "user_id": admin_user.id},
+            headers=auth_headers_superadmin
+        )
+        
+        assert response.status_code == 400
+    
+    def test_create_key_unknown_owner(self, client, auth_headers_superadmin):
+        """Test creating a key for a nonexistent owner"""
+        response = client.post(
+            "/api/v1/api-keys/",
+            json={"name": "ERP", "role": "admin", "user_id": 9999},
+            headers=auth_headers_superadmin
+        )
+        
+        assert response.status_code == 404
+    
+    def test_authenticate_with_api_key(self, client, auth_headers_superadmin, db, test_company, superadmin_user):
+        """Test that an API key authenticates with the key's scope"""
+        from app.models import Company, Invoice
+        
+        other = Company(name="Other", cnpj="00.000.000/0001-00")
+        db.add(other)
+        db.commit()
+        db.add_all([
+            Invoice(company_id=test_company.id, description="Mine", amount=10,
+                    due_date=date.today(), created_by=superadmin_user.id),
+            Invoice(company_id=other.id, description="Other", amount=20,
+                    due_date=date.today(), created_by=superadmin_user.id)
+        ])
+        db.commit()
+        
+        data = self._create_key(
+            client, auth_headers_superadmin,
+            name="ERP", role="user", company_id=test_company.id
+        )
+        headers = {"X-API-Key": data["key"]}
+        
+        me = client.get("/api/v1/auth/me", headers=headers)
+        invoices = client.get("/api/v1/invoices/", headers=headers)
+        users = client.get("/api/v1/users/", headers=headers)
+        
+        assert me.status_code == 200
+        assert me.json()["role"] == "user"
+        assert me.json()["company_id"] == test_company.id
+        assert [inv["description"] for inv in invoices.json()] == ["Mine"]
+        assert users.status_code == 403
+    
+    def test_authenticate_with_invalid_api_key(self, client, auth_headers_superadmin, test_company):
+        """Test authenticating with tampered or malformed keys"""
+        data = self._create_key(
+            client, auth_headers_superadmin,
+            name="ERP", role="user", company_id=test_company.id
+        )
+        
+        tampered = client.get("/api/v1/auth/me", headers={"X-API-Key": data["key"] + "x"})
+        malformed = client.get("/api/v1/auth/me", headers={"X-API-Key": "garbage"})
+        
+        assert tampered.status_code == 401
+        assert malformed.status_code == 401
+    
+    def test_revoked_api_key_rejected(self, client, auth_headers_superadmin, test_company):
+        """Test that a revoked key no longer authenticates"""
+        data = self._create_key(
+            client, auth_headers_superadmin,
+            name="ERP", role="user", company_id=test_company.id
+        )
+        
+        response = client.delete(f"/api/v1/api-keys/{data['id']}", headers=auth_headers_superadmin)
+        me = client.get("/api/v1/auth/me", headers={"X-API-Key": data["key"]})
+        
+        assert response.status_code == 204
+        assert me.status_code == 401
+    
+    def test_delete_api_key_not_found(self, client, auth_headers_superadmin):
+        """Test revoking a nonexistent key"""
+        response = client.delete("/api/v1/api-keys/9999", headers=auth_headers_superadmin)
+        
+        assert response.status_code == 404
+    
+    def test_api_key_of_inactive_owner_rejected(self, client, auth_headers_superadmin, db, admin_user):
+        """Test that keys stop working when the owner is deactivated"""
+        data = self._create_key(
+            client, auth_headers_superadmin,
+            name="ERP", role="admin", user_id=admin_user.id
+        )
+        admin_user.is_active = False
+        db.commit()
+        
+        response = client.get("/api/v1/auth/me", headers={"X-API-Key": data["key"]})
+        
+        assert response.status_code == 403
+    
+    def test_api_key_capped_after_owner_demoted(
+        self, client, auth_headers_superadmin, db, test_company, admin_user, superadmin_user
+    ):
+        """Test that a key loses what its owner lost after it was issued"""
+        from app.models import Company, Invoice, RoleEnum
+        
+        other = Company(name="Other", cnpj="00.000.000/0001-00")
+        db.add(other)
+        db.commit()
+        foreign = Invoice(company_id=other.id, description="Other", amount=20,
+                          due_date=date.today(), created_by=superadmin_user.id)
+        db.add(foreign)
+        db.commit()
+        data = self._create_key(
+            client, auth_headers_superadmin,
+            name="ERP", role="admin", user_id=admin_user.id
+        )
+        admin_user.role = RoleEnum.user
+        admin_user.company_id = test_company.id
+        db.commit()
+        headers = {"X-API-Key": data["key"]}
+        
+        me = client.get("/api/v1/auth/me", headers=headers)
+        invoices = client.get(f"/api/v1/invoices/?company_id={other.id}", headers=headers)
+        deleted = client.delete(f"/api/v1/invoices/{foreign.id}", headers=headers)
+        
+        assert (me.json()["role"], me.json()["company_id"]) == ("user", test_company.id)
+        assert invoices.json() == []
+        assert deleted.status_code == 403
@@ -0,0 +1,137 @@
+import pytest
+from datetime import date
+
+
+@pytest.fixture
+def invoices(db, test_company, admin_user):
+    """Create invoices for two companies"""
+    from app.models import Company, Invoice
+    
+    other = Company(name="Other Company", cnpj="98.765.432/0001-10")
+    db.add(other)
+    db.commit()
+    
+    rows = [
+        Invoice(company_id=test_company.id, description="Paid", amount=100,
+                due_date=date(2030, 5, 10), is_paid=True, created_by=admin_user.id),
+        Invoice(company_id=test_company.id, description="Pending", amount=300,
+                due_date=date(2030, 5, 10), created_by=admin_user.id),
+        Invoice(company_id=other.id, description="Other", amount=200,
+                due_date=date(2030, 5, 20), created_by=admin_user.id),
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+class TestAsyncInvoiceEndpoints:
+    """Test invoice read endpoints on the async database stack"""
+    
+    def test_list_matches_sync_endpoint(self, client, auth_headers_admin, invoices):
+        """Test that async listing returns the same payload as the sync endpoint"""
+        sync_response = client.get("/api/v1/invoices/", headers=auth_headers_admin)
+        async_response = client.get("/api/v1/async/invoices/", headers=auth_headers_admin)
+        
+        assert async_response.status_code == 200
+        assert async_response.json() == sync_response.json()
+    
+    def test_list_filters(self, client, auth_headers_admin, invoices, test_company):
+        """Test async listing with month, company and paid filters"""
+        response = client.get(
+            f"/api/v1/async/invoices/?month=5&year=2030&company_id={test_company.id}&is_paid=false",
+            headers=auth_headers_admin
+        )
+        by_company = client.get(
+            f"/api/v1/async/invoices/?company_id={test_company.id}",
+            headers=auth_headers_admin
+        )
+        
+        assert [inv["description"] for inv in response.json()] == ["Pending"]
+        assert response.json()[0]["company_name"] == "Test Company"
+        assert len(by_company.json()) == 2
+    
+    def test_list_as_user_sees_own_company(self, client, auth_headers_user, invoices, regular_user):
+        """Test that users only see their company's invoices"""
+        response = client.get("/api/v1/async/invoices/", headers=auth_headers_user)
+        
+        assert response.status_code == 200
+        assert {inv["company_id"] for inv in response.json()} == {regular_user.company_id}
+    
+    def test_calendar(self, client, auth_headers_user, invoices):
+        """Test async calendar data"""
+        response = client.get(
+            "/api/v1/async/invoices/calendar?month=5&year=2030",
+            headers=auth_headers_user
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["days"] == {
+            "10": {"total": 2, "paid": 1, "pending": 1, "amount": 400.0}
+        }
+    
+    def test_by_date(self, client, auth_headers_user, invoices):
+        """Test async invoices by date ordered by amount"""
+        response = client.get(
+            "/api/v1/async/invoices/by-date?date=2030-05-10",
+            headers=auth_headers_user
+        )
+        
+        assert response.status_code == 200
+        assert [inv["amount"] for inv in response.json()] == [300.0, 100.0]
+    
+    def test_by_date_invalid(self, client, auth_headers_admin):
+        """Test async by-date with an invalid date"""
+        response = client.get(
+            "/api/v1/async/invoices/by-date?date=10/05/2030",
+            headers=auth_headers_admin
+        )
+        
+        assert response.status_code == 400
+    
+    def test_get_invoice(self, client, auth_headers_user, invoices):
+        """Test getting invoices by ID across tenants"""
+        own = client.get(f"/api/v1/async/invoices/{invoices[0].id}", headers=auth_headers_user)
+        other = client.get(f"/api/v1/async/invoices/{invoices[2].id}", headers=auth_headers_user)
+        missing = client.get("/api/v1/async/invoices/9999", headers=auth_headers_user)
+        
+        assert own.status_code == 200
+        assert other.status_code == 404
+        assert missing.status_code == 404
+    
+    def test_requires_authentication(self, client):
+        """Test that async endpoints require authentication"""
+        response = client.get("/api/v1/async/invoices/")
+        
+        assert response.status_code == 401
+    
+    def test_api_key_authentication(self, client, auth_headers_superadmin, invoices, test_company):
+        """Test that API keys work on the async stack"""
+        key = client.post(
+            "/api/v1/api-keys/",
+            json={"name": "ERP", "role": "user", "company_id": test_company.id},
+            headers=auth_headers_superadmin
+        ).json()["key"]
+        
+        response = client.get("/api/v1/async/invoices/", headers={"X-API-Key": key})
+        
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+
+
+class TestAsyncDashboardEndpoints:
+    """Test dashboard endpoint on the async database stack"""
+    
+    def test_stats_match_sync_endpoint(self, client, auth_headers_admin, invoices):
+        """Test that async stats match the sync endpoint"""
+        sync_response = client.get("/api/v1/dashboard/stats", headers=auth_headers_admin)
+        async_response = client.get("/api/v1/async/dashboard/stats", headers=auth_headers_admin)
+        
+        assert async_response.status_code == 200
+        assert async_response.json() == sync_response.json()
+    
+    def test_stats_as_user(self, client, auth_headers_user, invoices):
+        """Test that user stats are limited to their company"""
+        response = client.get("/api/v1/async/dashboard/stats", headers=auth_headers_user)
+        
+        assert response.json()["total"] == 2
+        assert response.json()["pending_amount"] == 300.0
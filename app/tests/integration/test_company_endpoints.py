@@ -44,7 +44,7 @@ class TestCompanyEndpoints:
         assert response.status_code == 200
     
     def test_get_company_as_user_other_company(self, client, auth_headers_user, db):
-        """Test user getting another company (should be forbidden)"""
+        """Test user getting another company (hidden as not found)"""
         from app.models import Company
         
         # Create another company
@@ -58,7 +58,7 @@ class TestCompanyEndpoints:
             headers=auth_headers_user
         )
         
-        assert response.status_code == 403
+        assert response.status_code == 404
     
     def test_get_company_not_found(self, client, auth_headers_admin):
         """Test getting nonexistent company"""
@@ -169,3 +169,40 @@ class TestCompanyEndpoints:
         
         # Admin should be able to delete based on the endpoint code
         assert response.status_code == 204
+    
+    def test_delete_company_reads_company_once(self, client, auth_headers_admin, db, statements):
+        """Test that deleting a company does not fetch it a second time"""
+        from app.models import Company
+        
+        company = Company(name="To Delete", cnpj="99.888.777/0001-66")
+        db.add(company)
+        db.commit()
+        db.expunge_all()
+        statements.clear()
+        
+        response = client.delete(
+            f"/api/v1/companies/{company.id}",
+            headers=auth_headers_admin
+        )
+        
+        assert response.status_code == 204
+        assert len([s for s in statements if s.startswith("SELECT companies.")]) == 1
+    
+    def test_update_company_if_match(self, client, auth_headers_admin, test_company):
+        """Test conditional company updates"""
+        current = client.get(f"/api/v1/companies/{test_company.id}", headers=auth_headers_admin)
+        
+        updated = client.put(
+            f"/api/v1/companies/{test_company.id}",
+            json={"name": "Renamed"},
+            headers={**auth_headers_admin, "If-Match": current.headers["ETag"]}
+        )
+        stale = client.put(
+            f"/api/v1/companies/{test_company.id}",
+            json={"name": "Stale"},
+            headers={**auth_headers_admin, "If-Match": current.headers["ETag"]}
+        )
+        
+        assert updated.status_code == 200
+        assert updated.headers["ETag"] == '"2"'
+        assert stale.status_code == 412
@@ -114,3 +114,25 @@ class TestDashboardEndpoints:
         response = client.get("/api/v1/dashboard/stats")
         
         assert response.status_code == 401
+    
+    def test_get_stats_timeout(self, client, auth_headers_admin, monkeypatch):
+        """Test that a query past its budget returns 503 and is counted"""
+        from app.core import metrics
+        from app.db.statement_timeout import StatementTimeoutError
+        from app.services.invoice_service import InvoiceService
+        
+        def too_slow(self):
+            raise StatementTimeoutError(3000)
+        
+        monkeypatch.setattr(InvoiceService, "get_dashboard_stats", too_slow)
+        before = metrics.statement_timeouts.value(route="get_stats")
+        
+        response = client.get("/api/v1/dashboard/stats", headers=auth_headers_admin)
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert metrics.statement_timeouts.value(route="get_stats") == before + 1
+        
+        exposed = client.get("/metrics")
+        assert exposed.status_code == 200
+        assert 'db_statement_timeouts_total{route="get_stats"}' in exposed.text
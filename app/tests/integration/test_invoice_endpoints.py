@@ -134,7 +134,7 @@ class TestInvoiceEndpoints:
         assert response.status_code == 200
     
     def test_get_invoice_as_user_other_company(self, client, auth_headers_user, db, admin_user):
-        """Test user getting invoice from another company (should be forbidden)"""
+        """Test user getting invoice from another company (hidden as not found)"""
         from app.models import Company, Invoice
         
         # Create another company and invoice
@@ -159,7 +159,7 @@ class TestInvoiceEndpoints:
             headers=auth_headers_user
         )
         
-        assert response.status_code == 403
+        assert response.status_code == 404
     
     def test_create_invoice(self, client, auth_headers_admin, test_company):
         """Test creating a new invoice"""
@@ -368,7 +368,7 @@ class TestInvoiceEndpoints:
         assert response.status_code == 200
         invoices = response.json()
         assert isinstance(invoices, list)
-
+    
     def test_upload_invoice_file(self, client, auth_headers_admin, db, test_company, admin_user):
         """Test uploading PDF file to invoice"""
         from app.models import Invoice
@@ -451,3 +451,986 @@ class TestInvoiceEndpoints:
         )
         
         assert response.status_code == 403
+    
+    def test_toggle_paid_reads_invoice_once(self, client, auth_headers_user, db, test_company, admin_user, statements):
+        """Test that the tenant check and the toggle share one invoice load"""
+        from app.models import Invoice
+        
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Test",
+            amount=1000,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        db.expunge_all()
+        statements.clear()
+        
+        response = client.patch(
+            f"/api/v1/invoices/{invoice.id}/toggle-paid",
+            headers=auth_headers_user
+        )
+        
+        assert response.status_code == 200
+        assert len([s for s in statements if s.startswith("SELECT") and "FROM invoices" in s]) == 1
+    
+    def test_upload_reads_invoice_once(self, client, auth_headers_admin, db, test_company, admin_user, statements):
+        """Test that uploading a file loads the invoice a single time"""
+        from app.models import Invoice
+        
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Test",
+            amount=1000,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        db.expunge_all()
+        statements.clear()
+        
+        files = {"file": ("test.pdf", BytesIO(b"%PDF-1.4 test content"), "application/pdf")}
+        response = client.post(
+            f"/api/v1/invoices/{invoice.id}/upload",
+            files=files,
+            headers=auth_headers_admin
+        )
+        
+        assert response.status_code == 200
+        assert len([s for s in statements if s.startswith("SELECT") and "FROM invoices" in s]) == 1
+    
+    def test_upload_queries_off_event_loop(self, client, auth_headers_admin, make_invoice, monkeypatch):
+        """Test that the upload's session lookups run in the threadpool"""
+        import asyncio
+        from app.services.invoice_service import InvoiceService
+        from app.services.stored_file_service import StoredFileService
+        
+        on_loop = []
+        
+        def tracked(method):
+            def run(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop.append(method.__name__)
+                except RuntimeError:
+                    pass
+                return method(*args, **kwargs)
+            return run
+        
+        for service, name in ((StoredFileService, "get_by_sha256"), (InvoiceService, "get_invoice_by_id")):
+            monkeypatch.setattr(service, name, tracked(getattr(service, name)))
+        invoice = make_invoice()
+        
+        response = client.post(
+            f"/api/v1/invoices/{invoice.id}/upload",
+            files={"file": ("test.pdf", BytesIO(b"%PDF-1.4 off loop"), "application/pdf")},
+            headers=auth_headers_admin
+        )
+        
+        assert response.status_code == 200
+        assert on_loop == []
+    
+    def test_toggle_paid_other_company_is_single_miss(self, client, auth_headers_user, db, admin_user, statements):
+        """Test that a cross-tenant toggle is one scoped lookup that finds nothing"""
+        from app.models import Company, Invoice
+        
+        other_company = Company(name="Other", cnpj="98.765.432/0001-10")
+        db.add(other_company)
+        db.commit()
+        invoice = Invoice(
+            company_id=other_company.id,
+            description="Other",
+            amount=1000,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        db.expunge_all()
+        statements.clear()
+        
+        response = client.patch(
+            f"/api/v1/invoices/{invoice.id}/toggle-paid",
+            headers=auth_headers_user
+        )
+        
+        lookups = [s for s in statements if "FROM invoices" in s]
+        assert response.status_code == 404
+        assert len(lookups) == 1
+        assert "invoices.company_id = ?" in lookups[0]
+        assert not any(s.startswith("UPDATE") for s in statements)
+
+
+class TestInvoiceConcurrency:
+    """Test optimistic concurrency on invoice writes"""
+    
+    @pytest.fixture
+    def invoice(self, db, test_company, admin_user):
+        from app.models import Invoice
+        
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Versioned",
+            amount=1000,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        return invoice
+    
+    def test_etag_tracks_version(self, client, auth_headers_admin, invoice):
+        """Test that reads and writes return the row version as ETag"""
+        response = client.get(f"/api/v1/invoices/{invoice.id}", headers=auth_headers_admin)
+        
+        assert response.headers["ETag"] == '"1"'
+        assert response.json()["version"] == 1
+        
+        response = client.put(
+            f"/api/v1/invoices/{invoice.id}",
+            json={"description": "Changed"},
+            headers={**auth_headers_admin, "If-Match": '"1"'}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["ETag"] == '"2"'
+        assert response.json()["version"] == 2
+    
+    def test_stale_if_match_is_rejected(self, client, auth_headers_admin, invoice):
+        """Test that writes against an old version fail with 412"""
+        client.patch(f"/api/v1/invoices/{invoice.id}/toggle-paid", headers=auth_headers_admin)
+        
+        toggle = client.patch(
+            f"/api/v1/invoices/{invoice.id}/toggle-paid",
+            headers={**auth_headers_admin, "If-Match": 'W/"1"'}
+        )
+        delete = client.delete(
+            f"/api/v1/invoices/{invoice.id}",
+            headers={**auth_headers_admin, "If-Match": '"1"'}
+        )
+        
+        assert toggle.status_code == 412
+        assert delete.status_code == 412
+        assert client.get(f"/api/v1/invoices/{invoice.id}", headers=auth_headers_admin).json()["is_paid"] is True
+    
+    def test_any_version_and_invalid_header(self, client, auth_headers_admin, invoice):
+        """Test If-Match: * and malformed headers"""
+        any_version = client.patch(
+            f"/api/v1/invoices/{invoice.id}/toggle-paid",
+            headers={**auth_headers_admin, "If-Match": "*"}
+        )
+        invalid = client.patch(
+            f"/api/v1/invoices/{invoice.id}/toggle-paid",
+            headers={**auth_headers_admin, "If-Match": "abc"}
+        )
+        
+        assert any_version.status_code == 200
+        assert invalid.status_code == 400
+    
+    def test_concurrent_write_conflicts(self, client, auth_headers_admin, db, invoice):
+        """Test that a write racing another one is not silently lost"""
+        from sqlalchemy import text
+        
+        invoice_id = invoice.id
+        # Another request commits a change after this one read the row
+        db.execute(text("UPDATE invoices SET is_paid = 1, version = version + 1 WHERE id = :id"), {"id": invoice_id})
+        db.commit()
+        
+        response = client.patch(
+            f"/api/v1/invoices/{invoice_id}/toggle-paid",
+            headers=auth_headers_admin
+        )
+        
+        assert response.status_code == 409
+        db.rollback()
+        db.expunge_all()
+        current = client.get(f"/api/v1/invoices/{invoice_id}", headers=auth_headers_admin).json()
+        assert current["version"] == 2
+        assert current["is_paid"] is True
+
+
+class TestIdempotencyKeys:
+    """Test Idempotency-Key handling on invoice creation and uploads"""
+    
+    def _payload(self, company_id):
+        return {
+            "company_id": company_id,
+            "description": "Idempotent",
+            "amount": 100.0,
+            "due_date": date.today().isoformat()
+        }
+    
+    def test_retry_replays_response(self, client, auth_headers_admin, db, test_company):
+        """Test that a retried creation returns the first response without a second row"""
+        from app.models import Invoice
+        
+        headers = {**auth_headers_admin, "Idempotency-Key": "create-1"}
+        first = client.post("/api/v1/invoices/", json=self._payload(test_company.id), headers=headers)
+        retry = client.post("/api/v1/invoices/", json=self._payload(test_company.id), headers=headers)
+        
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert db.query(Invoice).count() == 1
+    
+    def test_key_reused_for_other_request(self, client, auth_headers_admin, test_company):
+        """Test that a key cannot be replayed for a different body"""
+        headers = {**auth_headers_admin, "Idempotency-Key": "create-2"}
+        client.post("/api/v1/invoices/", json=self._payload(test_company.id), headers=headers)
+        
+        other = {**self._payload(test_company.id), "amount": 999.0}
+        response = client.post("/api/v1/invoices/", json=other, headers=headers)
+        
+        assert response.status_code == 422
+    
+    def test_key_in_progress_stale_and_expired(self, client, auth_headers_admin, db, test_company, admin_user):
+        """Test that running keys conflict while stale and expired ones are taken over"""
+        from datetime import datetime
+        from app.models import IdempotencyKey
+        from app.schemas.invoice import InvoiceCreate
+        from app.services.idempotency_service import request_fingerprint
+        
+        payload = self._payload(test_company.id)
+        fingerprint = request_fingerprint("POST /invoices", InvoiceCreate(**payload).model_dump_json())
+        now = datetime.utcnow()
+        db.add_all([
+            IdempotencyKey(key="running", user_id=admin_user.id, fingerprint=fingerprint,
+                           created_at=now, expires_at=now + timedelta(hours=1)),
+            IdempotencyKey(key="stale", user_id=admin_user.id, fingerprint=fingerprint,
+                           created_at=now - timedelta(minutes=10), expires_at=now + timedelta(hours=1)),
+            IdempotencyKey(key="expired", user_id=admin_user.id, fingerprint="stale",
+                           created_at=now - timedelta(days=2), expires_at=now - timedelta(days=1)),
+        ])
+        db.commit()
+        
+        running = client.post("/api/v1/invoices/", json=payload,
+                              headers={**auth_headers_admin, "Idempotency-Key": "running"})
+        expired = client.post("/api/v1/invoices/", json=payload,
+                              headers={**auth_headers_admin, "Idempotency-Key": "expired"})
+        stale = client.post("/api/v1/invoices/", json=payload,
+                            headers={**auth_headers_admin, "Idempotency-Key": "stale"})
+        stale_retry = client.post("/api/v1/invoices/", json=payload,
+                                  headers={**auth_headers_admin, "Idempotency-Key": "stale"})
+        
+        assert running.status_code == 409
+        assert expired.status_code == 201
+        assert stale.status_code == 201
+        assert stale_retry.json() == stale.json()
+        assert stale_retry.headers["Idempotent-Replayed"] == "true"
+    
+    def test_upload_retry_stores_one_file(self, client, auth_headers_admin, db, test_company, admin_user):
+        """Test that a retried upload does not store the PDF twice"""
+        from app.models import Invoice
+        
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Upload",
+            amount=10,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        headers = {**auth_headers_admin, "Idempotency-Key": "upload-1"}
+        
+        def upload(name="test.pdf"):
+            files = {"file": (name, BytesIO(b"%PDF-1.4 idempotent"), "application/pdf")}
+            return client.post(f"/api/v1/invoices/{invoice.id}/upload", files=files, headers=headers)
+        
+        first = upload()
+        retry = upload()
+        
+        assert first.status_code == retry.status_code == 200
+        assert retry.json()["file_url"] == first.json()["file_url"]
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert retry.headers["ETag"] == first.headers["ETag"]
+    
+    def test_failed_upload_releases_key(self, client, auth_headers_admin, db, test_company, admin_user):
+        """Test that a rejected upload can be retried with the same key"""
+        from app.models import Invoice
+        
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Upload",
+            amount=10,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        headers = {**auth_headers_admin, "Idempotency-Key": "upload-2"}
+        
+        rejected = client.post(
+            f"/api/v1/invoices/{invoice.id}/upload",
+            files={"file": ("test.jpg", BytesIO(b"image"), "image/jpeg")},
+            headers=headers
+        )
+        accepted = client.post(
+            f"/api/v1/invoices/{invoice.id}/upload",
+            files={"file": ("test.pdf", BytesIO(b"%PDF-1.4"), "application/pdf")},
+            headers=headers
+        )
+        
+        assert rejected.status_code == 400
+        assert accepted.status_code == 200
+
+
+class TestContentAddressedUploads:
+    """Test that uploads are stored once per contents hash"""
+    
+    def upload(self, client, headers, invoice_id, content):
+        files = {"file": ("boleto.pdf", BytesIO(content), "application/pdf")}
+        return client.post(f"/api/v1/invoices/{invoice_id}/upload", files=files, headers=headers)
+    
+    def test_identical_upload_not_written_again(
+        self, client, auth_headers_admin, db, make_invoice, monkeypatch
+    ):
+        """Test that the same PDF on two invoices is one stored file, written once"""
+        import hashlib
+        from app.models import StoredFile
+        from app.utils.file_handler import FileHandler
+        
+        first_invoice, second_invoice = make_invoice(), make_invoice()
+        content = b"%PDF-1.4 shared boleto"
+        sha256 = hashlib.sha256(content).hexdigest()
+        saves = []
+        original_save = FileHandler.save_file
+        
+        async def counting_save(file, sha256=None):
+            saves.append(file.filename)
+            return await original_save(file, sha256)
+        
+        monkeypatch.setattr(FileHandler, "save_file", counting_save)
+        first = self.upload(client, auth_headers_admin, first_invoice.id, content)
+        second = self.upload(client, auth_headers_admin, second_invoice.id, content)
+        
+        assert first.status_code == second.status_code == 200
+        assert first.json()["file_url"] == second.json()["file_url"] == f"/uploads/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+        assert second.json()["size"] == len(content)
+        assert second.headers["ETag"] == f'"{sha256}"'
+        assert len(saves) == 1
+        stored = db.query(StoredFile).filter(StoredFile.sha256 == sha256).one()
+        assert stored.ref_count == 2
+    
+    def test_replaced_file_released(
+        self, client, auth_headers_admin, db, make_invoice, upload_store
+    ):
+        """Test that a replaced file is left for the sweeper, which removes it"""
+        import os
+        import time
+        from app.db.sweep_uploads import sweep_uploads
+        from app.models import StoredFile
+        from app.utils.file_handler import FileHandler
+        
+        invoice = make_invoice()
+        old_url = self.upload(client, auth_headers_admin, invoice.id, b"%PDF-1.4 old").json()["file_url"]
+        new_url = self.upload(client, auth_headers_admin, invoice.id, b"%PDF-1.4 new").json()["file_url"]
+        
+        assert os.path.exists(FileHandler.local_path(old_url))
+        assert [stored.ref_count for stored in db.query(StoredFile).all()] == [1]
+        
+        report = sweep_uploads(db.get_bind(), upload_store, grace_seconds=0, now=time.time() + 1)
+        
+        assert report.deleted == 1
+        assert not os.path.exists(FileHandler.local_path(old_url))
+        assert os.path.exists(FileHandler.local_path(new_url))
+    
+    @pytest.mark.parametrize("swept", [False, True])
+    def test_file_released_before_attach_kept(
+        self, client, auth_headers_admin, db, make_invoice, upload_store, monkeypatch, swept
+    ):
+        """Test that a known file released before the attach job is touched, or stored again if swept"""
+        import os
+        from app.models import StoredFile
+        from app.services.invoice_service import InvoiceService
+        from app.services.stored_file_service import StoredFileService
+        from app.utils.file_handler import FileHandler
+        
+        first, second = make_invoice(), make_invoice()
+        content = b"%PDF-1.4 released boleto"
+        file_url = self.upload(client, auth_headers_admin, first.id, content).json()["file_url"]
+        path = FileHandler.local_path(file_url)
+        os.utime(path, (0, 0))
+        original_get = StoredFileService.get_by_sha256
+        
+        def release_once_seen(service, sha256):
+            stored = original_get(service, sha256)
+            if stored is not None:
+                InvoiceService(service.db).delete_invoice(first.id)
+                if swept:
+                    os.remove(path)
+            return stored
+        
+        monkeypatch.setattr(StoredFileService, "get_by_sha256", release_once_seen)
+        response = self.upload(client, auth_headers_admin, second.id, content)
+        
+        assert response.status_code == 200
+        with open(path, "rb") as f:
+            assert f.read() == content
+        assert os.stat(path).st_mtime > 0
+        assert [stored.ref_count for stored in db.query(StoredFile).all()] == [1]
+    
+    def test_delete_invoice_drops_reference(self, client, auth_headers_admin, db, make_invoice):
+        """Test that deleting an invoice decrements its file's reference count"""
+        from app.models import StoredFile
+        
+        first_invoice, second_invoice = make_invoice(), make_invoice()
+        for invoice in (first_invoice, second_invoice):
+            self.upload(client, auth_headers_admin, invoice.id, b"%PDF-1.4 deleted")
+        
+        client.delete(f"/api/v1/invoices/{first_invoice.id}", headers=auth_headers_admin)
+        db.expire_all()
+        assert db.query(StoredFile).one().ref_count == 1
+        
+        client.delete(f"/api/v1/invoices/{second_invoice.id}", headers=auth_headers_admin)
+        assert db.query(StoredFile).count() == 0
+    
+    def test_uploads_served_with_hash_etag(self, client, auth_headers_admin, make_invoice):
+        """Test that /uploads answers conditional requests with the contents hash"""
+        invoice = make_invoice()
+        uploaded = self.upload(client, auth_headers_admin, invoice.id, b"%PDF-1.4 served")
+        etag = uploaded.headers["ETag"]
+        
+        served = client.get(uploaded.json()["file_url"])
+        revalidated = client.get(uploaded.json()["file_url"], headers={"If-None-Match": etag})
+        
+        assert served.status_code == 200
+        assert served.headers["etag"] == etag
+        assert revalidated.status_code == 304
+
+
+class TestInvoiceFileDownload:
+    """Test the authenticated PDF download"""
+    
+    CONTENT = b"%PDF-1.4 download body"
+    
+    def uploaded_invoice(self, client, headers, db, company, user, content=CONTENT):
+        from app.models import Invoice
+        
+        invoice = Invoice(
+            company_id=company.id,
+            description="Download",
+            amount=10,
+            due_date=date.today(),
+            created_by=user.id
+        )
+        db.add(invoice)
+        db.commit()
+        files = {"file": ("boleto.pdf", BytesIO(content), "application/pdf")}
+        uploaded = client.post(f"/api/v1/invoices/{invoice.id}/upload", files=files, headers=headers)
+        return invoice, uploaded.headers["ETag"]
+    
+    def test_download_immutable_file(self, client, auth_headers_admin, db, test_company, admin_user):
+        """Test that a content-addressed file is served with its hash and cached for good"""
+        invoice, etag = self.uploaded_invoice(client, auth_headers_admin, db, test_company, admin_user)
+        
+        response = client.get(f"/api/v1/invoices/{invoice.id}/file", headers=auth_headers_admin)
+        
+        assert response.status_code == 200
+        assert response.content == self.CONTENT
+        assert response.headers["content-type"] == "application/pdf"
+        assert response.headers["etag"] == etag
+        assert "immutable" in response.headers["cache-control"]
+        assert response.headers["content-disposition"] == f'inline; filename="fatura-{invoice.id}.pdf"'
+    
+    def test_conditional_and_range_requests(self, client, auth_headers_admin, db, test_company, admin_user):
+        """Test If-None-Match revalidation and byte ranges"""
+        invoice, etag = self.uploaded_invoice(client, auth_headers_admin, db, test_company, admin_user)
+        url = f"/api/v1/invoices/{invoice.id}/file"
+        
+        cached = client.get(url, headers={**auth_headers_admin, "If-None-Match": etag})
+        partial = client.get(url, headers={**auth_headers_admin, "Range": "bytes=0-3"})
+        
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert partial.status_code == 206
+        assert partial.content == b"%PDF"
+        assert partial.headers["content-range"] == f"bytes 0-3/{len(self.CONTENT)}"
+    
+    def test_download_other_tenant_not_found(self, client, auth_headers_admin, auth_headers_user, db, admin_user):
+        """Test that another company's file is not served"""
+        from app.models import Company
+        
+        other_company = Company(name="Other", cnpj="98.765.432/0001-10")
+        db.add(other_company)
+        db.commit()
+        invoice, _ = self.uploaded_invoice(client, auth_headers_admin, db, other_company, admin_user)
+        
+        response = client.get(f"/api/v1/invoices/{invoice.id}/file", headers=auth_headers_user)
+        
+        assert response.status_code == 404
+    
+    def test_download_without_file(self, client, auth_headers_admin, db, test_company, admin_user):
+        """Test that an invoice without a PDF answers 404"""
+        from app.models import Invoice
+        
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="No file",
+            amount=10,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        
+        response = client.get(f"/api/v1/invoices/{invoice.id}/file", headers=auth_headers_admin)
+        
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Arquivo não encontrado"
+    
+    def test_legacy_file_revalidated(self, client, auth_headers_admin, db, test_company, admin_user, upload_store):
+        """Test that a file from before content addressing uses its stat ETag"""
+        from app.models import Invoice
+        
+        name = "0123456789abcdef0123456789abcdef.pdf"
+        with open(upload_store.path(name), "wb") as legacy:
+            legacy.write(self.CONTENT)
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Legacy",
+            amount=10,
+            due_date=date.today(),
+            created_by=admin_user.id,
+            file_url=f"/uploads/{name}"
+        )
+        db.add(invoice)
+        db.commit()
+        url = f"/api/v1/invoices/{invoice.id}/file"
+        
+        first = client.get(url, headers=auth_headers_admin)
+        again = client.get(url, headers={**auth_headers_admin, "If-None-Match": first.headers["etag"]})
+        
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == "private, no-cache"
+        assert again.status_code == 304
+    
+    def test_accel_redirect(self, client, auth_headers_admin, db, test_company, admin_user, monkeypatch):
+        """Test that the front proxy is told to send the file when configured"""
+        from app.core.config import settings
+        
+        invoice, etag = self.uploaded_invoice(client, auth_headers_admin, db, test_company, admin_user)
+        monkeypatch.setattr(settings, "UPLOAD_ACCEL_REDIRECT_PREFIX", "/protected/")
+        sha256 = etag.strip('"')
+        
+        response = client.get(f"/api/v1/invoices/{invoice.id}/file", headers=auth_headers_admin)
+        
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["X-Accel-Redirect"] == f"/protected/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+        assert response.headers["etag"] == etag
+
+
+class TestSignedDownloadLinks:
+    """Test the signed links embedded in invoice listings"""
+    
+    def test_listing_link_served_without_auth(self, client, auth_headers_admin, db, test_company, admin_user):
+        """Test that a listed download_url fetches the PDF with no credentials"""
+        from app.models import Invoice
+        
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Signed",
+            amount=10,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        files = {"file": ("boleto.pdf", BytesIO(b"%PDF-1.4 signed"), "application/pdf")}
+        client.post(f"/api/v1/invoices/{invoice.id}/upload", files=files, headers=auth_headers_admin)
+        
+        listed = client.get("/api/v1/invoices/", headers=auth_headers_admin).json()
+        download_url = listed[0]["download_url"]
+        
+        assert download_url.startswith("/files/")
+        served = client.get(download_url)
+        assert served.status_code == 200
+        assert served.content == b"%PDF-1.4 signed"
+        
+        tampered = client.get(download_url.replace("signature=", "signature=x"))
+        unsigned = client.get(download_url.split("?")[0])
+        assert tampered.status_code == unsigned.status_code == 403
+    
+    def test_expired_link_refused(self, client):
+        """Test that a link past its expiry is refused"""
+        import time
+        from app.utils.file_handler import signed_download_url
+        
+        expired = signed_download_url("/uploads/ab/cd/file.pdf", now=time.time() - 3600)
+        
+        assert client.get(expired).status_code == 403
+        assert signed_download_url(None) is None
+
+
+class TestInvoiceArchive:
+    """Test the streamed ZIP of a month's PDFs"""
+    
+    def upload(self, client, headers, invoice, content):
+        files = {"file": ("boleto.pdf", BytesIO(content), "application/pdf")}
+        client.post(f"/api/v1/invoices/{invoice.id}/upload", files=files, headers=headers)
+    
+    def open_archive(self, content: bytes):
+        import zipfile
+        
+        return zipfile.ZipFile(BytesIO(content))
+    
+    def manifest(self, archive):
+        import csv
+        
+        return list(csv.DictReader(archive.read("manifesto.csv").decode("utf-8-sig").splitlines()))
+    
+    def test_month_archive(self, client, auth_headers_admin, test_company, make_invoice):
+        """Test that the month's PDFs are stored uncompressed, with a manifest of every invoice"""
+        import hashlib
+        import zipfile
+        
+        first = make_invoice(due_date=date(2026, 3, 5), description="Água, março")
+        second = make_invoice(due_date=date(2026, 3, 20))
+        without_file = make_invoice(due_date=date(2026, 3, 10))
+        other_month = make_invoice(due_date=date(2026, 4, 5))
+        self.upload(client, auth_headers_admin, first, b"%PDF-1.4 first")
+        self.upload(client, auth_headers_admin, second, b"%PDF-1.4 second")
+        self.upload(client, auth_headers_admin, other_month, b"%PDF-1.4 april")
+        
+        response = client.get(
+            f"/api/v1/invoices/archive?company_id={test_company.id}&month=3&year=2026",
+            headers=auth_headers_admin
+        )
+        archive = self.open_archive(response.content)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        assert response.headers["content-disposition"] == (
+            f'attachment; filename="faturas-{test_company.id}-2026-03.zip"'
+        )
+        assert archive.namelist() == [
+            f"2026-03-05_fatura-{first.id}.pdf", f"2026-03-20_fatura-{second.id}.pdf", "manifesto.csv"
+        ]
+        assert archive.read(f"2026-03-05_fatura-{first.id}.pdf") == b"%PDF-1.4 first"
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+        # Written without seeking: sizes and CRCs follow the data
+        assert all(info.flag_bits & 0x08 for info in archive.infolist())
+        manifest = self.manifest(archive)
+        assert [row["fatura_id"] for row in manifest] == [str(first.id), str(without_file.id), str(second.id)]
+        assert manifest[0]["descricao"] == "Água, março"
+        assert manifest[0]["sha256"] == hashlib.sha256(b"%PDF-1.4 first").hexdigest()
+        assert manifest[0]["tamanho"] == str(len(b"%PDF-1.4 first"))
+        assert (manifest[1]["arquivo"], manifest[1]["tamanho"]) == ("", "")
+    
+    def test_archive_streamed_in_chunks(
+        self, client, auth_headers_admin, db, make_invoice, monkeypatch
+    ):
+        """Test that a PDF is sent a chunk at a time, never read whole"""
+        from app.core.config import settings
+        from app.services.invoice_service import InvoiceService
+        from app.utils.invoice_archive import stream_invoice_archive
+        
+        content = b"%PDF-1.4 " + bytes(range(256)) * 64
+        invoice = make_invoice(due_date=date(2026, 3, 5))
+        self.upload(client, auth_headers_admin, invoice, content)
+        monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 1024)
+        
+        chunks = list(stream_invoice_archive(InvoiceService(db).get_month_archive(3, 2026)))
+        
+        assert len(chunks) > len(content) // 1024
+        assert max(len(chunk) for chunk in chunks[:-1]) < 1024 + 128
+        archive = self.open_archive(b"".join(chunks))
+        assert archive.read(f"2026-03-05_fatura-{invoice.id}.pdf") == content
+    
+    def test_archive_scoped_to_tenant(
+        self, client, auth_headers_admin, auth_headers_user, db, make_invoice
+    ):
+        """Test that a company user only gets their own company's invoices"""
+        from app.models import Company
+        
+        other = Company(name="Other", cnpj="98.765.432/0001-10")
+        db.add(other)
+        db.commit()
+        own = make_invoice(due_date=date(2026, 3, 5))
+        make_invoice(company_id=other.id, due_date=date(2026, 3, 5))
+        
+        response = client.get(
+            f"/api/v1/invoices/archive?company_id={other.id}&month=3&year=2026", headers=auth_headers_user
+        )
+        
+        assert response.status_code == 200
+        assert [row["fatura_id"] for row in self.manifest(self.open_archive(response.content))] == []
+        mine = client.get("/api/v1/invoices/archive?month=3&year=2026", headers=auth_headers_user)
+        assert [row["fatura_id"] for row in self.manifest(self.open_archive(mine.content))] == [str(own.id)]
+        invalid = client.get("/api/v1/invoices/archive?month=13&year=2026", headers=auth_headers_admin)
+        assert invalid.status_code == 422
+
+
+class TestResumableUploads:
+    """Test uploads sent over several requests"""
+    
+    CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 4
+    
+    def start(self, client, headers, invoice, **declared):
+        body = {"filename": "scan.pdf", "size": len(self.CONTENT), **declared}
+        return client.post(f"/api/v1/invoices/{invoice.id}/uploads", json=body, headers=headers)
+    
+    def send(self, client, headers, url, offset, data):
+        return client.patch(url, content=data, headers={**headers, "Upload-Offset": str(offset)})
+    
+    def test_upload_resumed_and_completed(self, client, auth_headers_admin, db, make_invoice):
+        """Test that a file sent in pieces, resumed from the server's offset, is attached"""
+        import hashlib
+        from app.models import StoredFile
+        
+        invoice = make_invoice()
+        sha256 = hashlib.sha256(self.CONTENT).hexdigest()
+        started = self.start(client, auth_headers_admin, invoice, sha256=sha256)
+        url = started.headers["Location"]
+        
+        first = self.send(client, auth_headers_admin, url, 0, self.CONTENT[:300])
+        resumed_at = int(client.get(url, headers=auth_headers_admin).headers["Upload-Offset"])
+        second = self.send(client, auth_headers_admin, url, resumed_at, self.CONTENT[resumed_at:])
+        completed = client.post(f"{url}/complete", headers=auth_headers_admin)
+        db.expire_all()
+        
+        assert started.status_code == 201
+        assert started.json()["offset"] == 0
+        assert url.endswith(f"/api/v1/invoices/{invoice.id}/uploads/{started.json()['id']}")
+        assert (first.json()["offset"], resumed_at) == (300, 300)
+        assert second.headers["Upload-Offset"] == str(len(self.CONTENT))
+        assert completed.status_code == 200
+        assert completed.json()["sha256"] == sha256
+        assert completed.headers["ETag"] == f'"{sha256}"'
+        assert invoice.file_url == completed.json()["file_url"]
+        assert db.query(StoredFile).one().size == len(self.CONTENT)
+        assert client.get(f"/api/v1/invoices/{invoice.id}/file", headers=auth_headers_admin).content == self.CONTENT
+        # The session is gone once the file is attached
+        assert client.get(url, headers=auth_headers_admin).status_code == 404
+    
+    def test_wrong_offset_and_overflow_refused(self, client, auth_headers_admin, make_invoice):
+        """Test that bytes are only accepted at the current offset and up to the declared size"""
+        invoice = make_invoice()
+        url = self.start(client, auth_headers_admin, invoice).headers["Location"]
+        self.send(client, auth_headers_admin, url, 0, self.CONTENT[:100])
+        
+        stale = self.send(client, auth_headers_admin, url, 0, self.CONTENT[:100])
+        overflow = self.send(client, auth_headers_admin, url, 100, self.CONTENT[100:] + b"extra")
+        early = client.post(f"{url}/complete", headers=auth_headers_admin)
+        
+        assert stale.status_code == 409
+        assert stale.headers["Upload-Offset"] == "100"
+        assert overflow.status_code == 413
+        assert early.status_code == 409
+        assert client.get(url, headers=auth_headers_admin).json()["offset"] == 100
+    
+    def test_invalid_sessions_refused(
+        self, client, auth_headers_admin, auth_headers_superadmin, make_invoice
+    ):
+        """Test declared limits, other users' sessions and content that is not what was declared"""
+        invoice = make_invoice()
+        
+        too_big = self.start(client, auth_headers_admin, invoice, size=10 * 1024 * 1024 * 1024)
+        not_pdf = self.start(client, auth_headers_admin, invoice, filename="scan.png")
+        missing = client.post(
+            "/api/v1/invoices/999999/uploads", json={"filename": "a.pdf", "size": 1}, headers=auth_headers_admin
+        )
+        url = self.start(client, auth_headers_admin, invoice, sha256="0" * 64).headers["Location"]
+        foreign = client.get(url, headers=auth_headers_superadmin)
+        bad_magic = self.send(client, auth_headers_admin, url, 0, b"GIF89a")
+        self.send(client, auth_headers_admin, url, 0, self.CONTENT)
+        mismatch = client.post(f"{url}/complete", headers=auth_headers_admin)
+        
+        assert too_big.status_code == 413
+        assert not_pdf.status_code == 400
+        assert missing.status_code == 404
+        assert foreign.status_code == 404
+        assert bad_magic.status_code == 400
+        assert mismatch.status_code == 400
+        assert client.get(url, headers=auth_headers_admin).status_code == 404
+    
+    def test_stale_sessions_expire(self, client, auth_headers_admin, make_invoice):
+        """Test that sessions no bytes arrived for are dropped, and cancelled ones at once"""
+        import os
+        import time
+        from app.core.config import settings
+        from app.utils.resumable_upload import resumable_uploads
+        
+        invoice = make_invoice()
+        stale_url = self.start(client, auth_headers_admin, invoice).headers["Location"]
+        cancelled_url = self.start(client, auth_headers_admin, invoice).headers["Location"]
+        live_url = self.start(client, auth_headers_admin, invoice).headers["Location"]
+        stale_part = os.path.join(resumable_uploads.root, stale_url.rsplit("/", 1)[-1] + ".part")
+        old = time.time() - settings.UPLOAD_SESSION_TTL_SECONDS - 1
+        os.utime(stale_part, (old, old))
+        
+        assert client.delete(cancelled_url, headers=auth_headers_admin).status_code == 204
+        assert resumable_uploads.expire() == 1
+        assert not os.path.exists(stale_part)
+        assert client.get(stale_url, headers=auth_headers_admin).status_code == 404
+        assert client.get(cancelled_url, headers=auth_headers_admin).status_code == 404
+        assert client.get(live_url, headers=auth_headers_admin).status_code == 200
+        assert sorted(os.listdir(resumable_uploads.root)) == sorted(
+            live_url.rsplit("/", 1)[-1] + suffix for suffix in (".json", ".part")
+        )
+
+
+class TestBulkUpload:
+    """Test attaching many PDFs in one request"""
+    
+    def test_files_mapped_and_attached_together(
+        self, client, auth_headers_admin, db, make_invoice, statements
+    ):
+        """Test that files named by field or file name are attached in one commit, failures reported apart"""
+        from app.models import StoredFile
+        
+        by_field, by_name, shared, bad = [make_invoice() for _ in range(4)]
+        files = [
+            (str(by_field.id), ("scan.pdf", BytesIO(b"%PDF-1.4 field"), "application/pdf")),
+            ("files", (f"fatura-{by_name.id}.pdf", BytesIO(b"%PDF-1.4 shared"), "application/pdf")),
+            ("files", (f"{shared.id}.pdf", BytesIO(b"%PDF-1.4 shared"), "application/pdf")),
+            ("files", (f"{bad.id}.pdf", BytesIO(b"not a pdf"), "application/pdf")),
+            ("files", ("unnamed.pdf", BytesIO(b"%PDF-1.4 x"), "application/pdf")),
+            ("files", ("999999.pdf", BytesIO(b"%PDF-1.4 x"), "application/pdf")),
+            ("files", (f"again-{by_name.id}.pdf", BytesIO(b"%PDF-1.4 x"), "application/pdf")),
+        ]
+        statements.clear()
+        
+        response = client.post("/api/v1/invoices/bulk-upload", files=files, headers=auth_headers_admin)
+        body = response.json()
+        executed = list(statements)
+        db.expire_all()
+        
+        assert response.status_code == 200
+        assert (body["attached"], body["failed"]) == (3, 4)
+        assert [result["status"] for result in body["results"]] == [200, 200, 200, 400, 400, 404, 409]
+        assert [result["invoice_id"] for result in body["results"]] == [
+            by_field.id, by_name.id, shared.id, bad.id, None, 999999, by_name.id
+        ]
+        assert by_field.file_url == body["results"][0]["file_url"]
+        assert by_name.file_url == shared.file_url == body["results"][1]["file_url"]
+        assert bad.file_url is None
+        assert sorted(stored.ref_count for stored in db.query(StoredFile).all()) == [1, 2]
+        # One invoice lookup per session for the whole batch
+        assert len([sql for sql in executed if sql.startswith("SELECT") and "FROM invoices" in sql]) == 2
+        assert len([sql for sql in executed if sql.startswith("UPDATE invoices")]) == 3
+    
+    def test_invalid_file_leaves_invoice_to_next(self, client, auth_headers_admin, db, make_invoice):
+        """Test that a file failing inspection does not claim its invoice"""
+        invoice = make_invoice()
+        files = [
+            ("files", (f"{invoice.id}.pdf", BytesIO(b"not a pdf"), "application/pdf")),
+            ("files", (f"fatura-{invoice.id}.pdf", BytesIO(b"%PDF-1.4 retry"), "application/pdf")),
+        ]
+        
+        response = client.post("/api/v1/invoices/bulk-upload", files=files, headers=auth_headers_admin)
+        body = response.json()
+        db.expire_all()
+        
+        assert (body["attached"], body["failed"]) == (1, 1)
+        assert [result["status"] for result in body["results"]] == [400, 200]
+        assert invoice.file_url == body["results"][1]["file_url"]
+    
+    def test_invoice_deleted_before_write_reported(
+        self, client, auth_headers_admin, db, make_invoice, monkeypatch
+    ):
+        """Test that an invoice deleted while files are stored fails alone"""
+        from app.models import Invoice
+        from app.utils.file_handler import FileHandler
+        
+        kept, deleted = make_invoice(), make_invoice()
+        deleted_id = deleted.id
+        original_save = FileHandler.save_file
+        
+        async def save_then_delete(file, sha256=None):
+            if db.get(Invoice, deleted_id) is not None:
+                db.delete(deleted)
+                db.commit()
+            return await original_save(file, sha256)
+        
+        monkeypatch.setattr(FileHandler, "save_file", save_then_delete)
+        files = [
+            ("files", (f"{kept.id}.pdf", BytesIO(b"%PDF-1.4 kept"), "application/pdf")),
+            ("files", (f"{deleted_id}.pdf", BytesIO(b"%PDF-1.4 deleted"), "application/pdf")),
+        ]
+        
+        response = client.post("/api/v1/invoices/bulk-upload", files=files, headers=auth_headers_admin)
+        body = response.json()
+        db.expire_all()
+        
+        assert response.status_code == 200
+        assert (body["attached"], body["failed"]) == (1, 1)
+        assert [result["status"] for result in body["results"]] == [200, 404]
+        assert "file_url" not in body["results"][1]
+        assert kept.file_url == body["results"][0]["file_url"]
+    
+    def test_file_released_and_swept_before_attach_stored_again(
+        self, client, auth_headers_admin, db, make_invoice, monkeypatch
+    ):
+        """Test that a known file released and swept before the attach job is stored again"""
+        import os
+        from app.services.invoice_service import InvoiceService
+        from app.services.stored_file_service import StoredFileService
+        from app.utils.file_handler import FileHandler
+        
+        first, second = make_invoice(), make_invoice()
+        content = b"%PDF-1.4 released"
+        files = [("files", (f"{first.id}.pdf", BytesIO(content), "application/pdf"))]
+        file_url = client.post(
+            "/api/v1/invoices/bulk-upload", files=files, headers=auth_headers_admin
+        ).json()["results"][0]["file_url"]
+        original_get = StoredFileService.get_by_sha256s
+        
+        def release_and_sweep_once_seen(service, hashes):
+            stored = original_get(service, hashes)
+            if stored:
+                InvoiceService(service.db).delete_invoice(first.id)
+                FileHandler.delete_file(file_url)
+            return stored
+        
+        monkeypatch.setattr(StoredFileService, "get_by_sha256s", release_and_sweep_once_seen)
+        files = [("files", (f"{second.id}.pdf", BytesIO(content), "application/pdf"))]
+        response = client.post("/api/v1/invoices/bulk-upload", files=files, headers=auth_headers_admin)
+        
+        assert response.json()["attached"] == 1
+        with open(FileHandler.local_path(file_url), "rb") as f:
+            assert f.read() == content
+    
+    def test_only_admins(self, client, auth_headers_user):
+        """Test that company users cannot bulk upload"""
+        files = [("1", ("1.pdf", BytesIO(b"%PDF-1.4"), "application/pdf"))]
+        
+        response = client.post("/api/v1/invoices/bulk-upload", files=files, headers=auth_headers_user)
+        
+        assert response.status_code == 403
+    
+    def test_too_many_files_refused(self, client, auth_headers_admin, monkeypatch):
+        """Test that a batch over the file limit is refused before anything is stored"""
+        from app.core.config import settings
+        
+        monkeypatch.setattr(settings, "BULK_UPLOAD_MAX_FILES", 2)
+        files = [("files", (f"{n}.pdf", BytesIO(b"%PDF-1.4"), "application/pdf")) for n in range(3)]
+        
+        response = client.post("/api/v1/invoices/bulk-upload", files=files, headers=auth_headers_admin)
+        
+        assert response.status_code == 400
+    
+    def test_oversized_body_refused_before_parsing(self, client, auth_headers_admin, monkeypatch):
+        """Test that a body over the total limit, or of unknown length, is refused unparsed"""
+        from starlette.requests import Request
+        from app.core.config import settings
+        
+        monkeypatch.setattr(settings, "BULK_UPLOAD_MAX_BYTES", 1024)
+        parsed = []
+        monkeypatch.setattr(Request, "form", lambda *args, **kwargs: parsed.append(kwargs))
+        files = [("files", ("1.pdf", BytesIO(b"%PDF-1.4" + b"0" * 2048), "application/pdf"))]
+        
+        too_big = client.post("/api/v1/invoices/bulk-upload", files=files, headers=auth_headers_admin)
+        chunked = client.post(
+            "/api/v1/invoices/bulk-upload",
+            content=iter([b"--x--\r\n"]),
+            headers={**auth_headers_admin, "Content-Type": "multipart/form-data; boundary=x"}
+        )
+        
+        assert too_big.status_code == 413
+        assert chunked.status_code == 411
+        assert parsed == []
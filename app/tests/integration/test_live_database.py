@@ -0,0 +1,201 @@
+import pytest
+from sqlalchemy import create_engine, event
+from app.db import database
+from app.db.replication import ReplicaSet, copy_sqlite_database, install_write_tracking
+
+
+@pytest.fixture
+def peak_checkouts(live_db):
+    """Track the most pooled connections held at once on the live database"""
+    held = {"now": 0, "peak": 0}
+    
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        held["now"] += 1
+        held["peak"] = max(held["peak"], held["now"])
+    
+    def checkin(dbapi_connection, connection_record):
+        held["now"] -= 1
+    
+    event.listen(live_db, "checkout", checkout)
+    event.listen(live_db, "checkin", checkin)
+    yield held
+    event.remove(live_db, "checkout", checkout)
+    event.remove(live_db, "checkin", checkin)
+
+
+@pytest.fixture
+def live_replica(live_client, tmp_path, monkeypatch):
+    """A replica copied from the live database before the test writes anything"""
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    copy_sqlite_database(database.SessionLocal.kw["bind"], replica)
+    install_write_tracking(database.write_queue.session_factory)
+    monkeypatch.setattr(database, "replica_set", ReplicaSet([replica], max_wait_ms=30, poll_interval_ms=5))
+    yield replica
+    replica.dispose()
+
+
+class TestConnectionsPerRequest:
+    """Test that authenticated requests hold one pooled connection"""
+    
+    @pytest.mark.parametrize("path", [
+        "/api/v1/invoices/",
+        "/api/v1/invoices/calendar?month=1&year=2030",
+        "/api/v1/dashboard/stats",
+        "/api/v1/companies/",
+        "/api/v1/auth/me",
+    ])
+    def test_reads_hold_one_connection(self, live_client, live_user_headers, peak_checkouts, path):
+        """Test that the principal is loaded on the session the route reads with"""
+        peak_checkouts["peak"] = 0
+        
+        response = live_client.get(path, headers=live_user_headers)
+        
+        assert response.status_code == 200
+        assert peak_checkouts["peak"] == 1
+    
+    def test_write_holds_one_connection(self, live_client, live_admin_headers, peak_checkouts):
+        """Test that a write request authenticates on its own request session"""
+        peak_checkouts["peak"] = 0
+        
+        response = live_client.post(
+            "/api/v1/companies/",
+            json={"name": "Pool", "cnpj": "11.111.111/0001-11"},
+            headers=live_admin_headers
+        )
+        
+        assert response.status_code == 201
+        assert peak_checkouts["peak"] == 1
+    
+    def test_rejected_requests_take_no_connection(self, live_client, peak_checkouts):
+        """Test that requests refused before authentication never touch the pool"""
+        peak_checkouts["peak"] = 0
+        
+        missing = live_client.get("/api/v1/invoices/")
+        malformed = live_client.get("/api/v1/invoices/", headers={"Authorization": "Bearer nope"})
+        
+        assert missing.status_code == malformed.status_code == 401
+        assert peak_checkouts["peak"] == 0
+
+
+class TestLiveIdempotency:
+    """Test Idempotency-Key writes through the single writer"""
+    
+    def test_failed_completion_leaves_no_invoice_and_frees_key(
+        self, live_client, live_admin_headers, monkeypatch
+    ):
+        """Test that storing the response fails together with the write it belongs to"""
+        from fastapi import HTTPException
+        from app.services.idempotency_service import IdempotencyService
+        
+        payload = {
+            "company_id": live_client.company_id,
+            "description": "Once",
+            "amount": 10.0,
+            "due_date": "2030-01-10"
+        }
+        headers = {**live_admin_headers, "Idempotency-Key": "live-1"}
+        real_complete = IdempotencyService.complete
+        
+        def failing_complete(self, *args, **kwargs):
+            raise HTTPException(status_code=503, detail="Indisponível")
+        
+        monkeypatch.setattr(IdempotencyService, "complete", failing_complete)
+        failed = live_client.post("/api/v1/invoices/", json=payload, headers=headers)
+        monkeypatch.setattr(IdempotencyService, "complete", real_complete)
+        created = live_client.post("/api/v1/invoices/", json=payload, headers=headers)
+        replayed = live_client.post("/api/v1/invoices/", json=payload, headers=headers)
+        listed = live_client.get("/api/v1/invoices/", headers=live_admin_headers)
+        
+        assert failed.status_code == 503
+        assert created.status_code == 201
+        assert replayed.headers["Idempotent-Replayed"] == "true"
+        assert [invoice["id"] for invoice in listed.json()] == [created.json()["id"]]
+
+
+class TestLiveInvoiceFlow:
+    """Test an invoice's life through the real sessions, writer, replica routing and store"""
+    
+    def test_create_read_and_upload(
+        self, live_client, live_admin_headers, live_user_headers, live_replica, upload_store
+    ):
+        """Test that a new invoice is readable at once with its token and takes its PDF"""
+        import hashlib
+        from io import BytesIO
+        from app.db.replication import CONSISTENCY_HEADER
+        
+        content = b"%PDF-1.4 live flow"
+        sha256 = hashlib.sha256(content).hexdigest()
+        created = live_client.post(
+            "/api/v1/invoices/",
+            json={
+                "company_id": live_client.company_id,
+                "description": "Fluxo",
+                "amount": 42.0,
+                "due_date": "2030-02-10"
+            },
+            headers=live_admin_headers
+        )
+        invoice_url = f"/api/v1/invoices/{created.json()['id']}"
+        token = {CONSISTENCY_HEADER: created.headers[CONSISTENCY_HEADER]}
+        stale = live_client.get("/api/v1/invoices/", headers=live_user_headers)
+        read = live_client.get(invoice_url, headers={**live_user_headers, **token})
+        listed = live_client.get("/api/v1/invoices/", headers={**live_user_headers, **token})
+        uploaded = live_client.post(
+            f"{invoice_url}/upload",
+            files={"file": ("boleto.pdf", BytesIO(content), "application/pdf")},
+            headers=live_admin_headers
+        )
+        token = {CONSISTENCY_HEADER: uploaded.headers[CONSISTENCY_HEADER]}
+        attached = live_client.get(invoice_url, headers={**live_user_headers, **token})
+        downloaded = live_client.get(f"{invoice_url}/file", headers={**live_user_headers, **token})
+        
+        assert created.status_code == 201
+        # Without the token the listing reads the replica, which has not seen the write
+        assert stale.json() == []
+        assert read.status_code == 200
+        assert read.json()["description"] == "Fluxo"
+        assert [invoice["id"] for invoice in listed.json()] == [created.json()["id"]]
+        assert uploaded.status_code == 200
+        assert int(token[CONSISTENCY_HEADER]) > int(created.headers[CONSISTENCY_HEADER])
+        assert uploaded.headers["ETag"] == f'"{sha256}"'
+        assert attached.json()["file_url"] == uploaded.json()["file_url"]
+        assert downloaded.content == content
+        assert downloaded.headers["etag"] == f'"{sha256}"'
+        with open(upload_store.path(f"{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"), "rb") as stored:
+            assert stored.read() == content
+    
+    def test_upload_reads_invoice_once(self, live_client, live_admin_headers, live_db):
+        """Test that the upload and its write job load the invoice a single time between them"""
+        from io import BytesIO
+        from app.db import database
+        
+        created = live_client.post(
+            "/api/v1/invoices/",
+            json={
+                "company_id": live_client.company_id,
+                "description": "Uma leitura",
+                "amount": 10.0,
+                "due_date": "2030-02-10"
+            },
+            headers=live_admin_headers
+        )
+        executed = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement)
+        
+        engines = (live_db, database.write_queue.engine)
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", record)
+        try:
+            uploaded = live_client.post(
+                f"/api/v1/invoices/{created.json()['id']}/upload",
+                files={"file": ("boleto.pdf", BytesIO(b"%PDF-1.4 once"), "application/pdf")},
+                headers=live_admin_headers
+            )
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", record)
+        
+        assert uploaded.status_code == 200
+        assert len([sql for sql in executed if sql.startswith("SELECT") and "FROM invoices" in sql]) == 1
@@ -111,6 +111,35 @@ class TestUserEndpoints:
         user = response.json()
         assert user["name"] == "Updated Name"
     
+    def test_update_user_password(self, client, auth_headers_superadmin, admin_user, monkeypatch):
+        """Test that a new password is hashed before the write job runs"""
+        from app.api.v1.endpoints import users
+        from app.db import write_queue
+        
+        submitted = []
+        original_hash = users.get_password_hash
+        original_submit = write_queue.InlineWriter.submit
+        
+        def submit(self, job, **info):
+            submitted.append(job)
+            return original_submit(self, job, **info)
+        
+        def tracking_hash(password):
+            assert not submitted, "password hashed inside the write job"
+            return original_hash(password)
+        
+        monkeypatch.setattr(users, "get_password_hash", tracking_hash)
+        monkeypatch.setattr(write_queue.InlineWriter, "submit", submit)
+        response = client.put(
+            f"/api/v1/users/{admin_user.id}",
+            json={"password": "novasenha"},
+            headers=auth_headers_superadmin
+        )
+        login = client.post("/api/v1/auth/login", data={"username": admin_user.email, "password": "novasenha"})
+        
+        assert response.status_code == 200
+        assert login.status_code == 200
+    
     def test_update_user_not_found(self, client, auth_headers_superadmin):
         """Test updating nonexistent user"""
         response = client.put(
@@ -151,3 +180,22 @@ class TestUserEndpoints:
         )
         
         assert response.status_code == 404
+    
+    def test_update_user_if_match(self, client, auth_headers_superadmin, admin_user):
+        """Test conditional user updates"""
+        current = client.get(f"/api/v1/users/{admin_user.id}", headers=auth_headers_superadmin)
+        
+        stale = client.put(
+            f"/api/v1/users/{admin_user.id}",
+            json={"name": "Stale"},
+            headers={**auth_headers_superadmin, "If-Match": '"7"'}
+        )
+        updated = client.put(
+            f"/api/v1/users/{admin_user.id}",
+            json={"name": "Fresh"},
+            headers={**auth_headers_superadmin, "If-Match": current.headers["ETag"]}
+        )
+        
+        assert stale.status_code == 412
+        assert updated.status_code == 200
+        assert updated.json()["version"] == current.json()["version"] + 1
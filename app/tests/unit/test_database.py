@@ -0,0 +1,347 @@
+import pytest
+from sqlalchemy import create_engine, create_mock_engine, text
+from app.core.config import Settings
+from app.db.database import get_engine_options, install_sqlite_pragmas, get_async_database_url
+from app.db.sqlite_pragmas import resolve_pragmas, PRAGMA_PROFILES
+
+
+class TestEngineOptions:
+    """Test engine configuration from settings"""
+    
+    def test_file_database_gets_pool_sizing(self):
+        """Test that file databases get pool sizing options"""
+        config = Settings(DB_POOL_SIZE=7, DB_MAX_OVERFLOW=3, DB_POOL_PRE_PING=True)
+        
+        options = get_engine_options("sqlite:///./file.db", config)
+        
+        assert options["pool_size"] == 7
+        assert options["max_overflow"] == 3
+        assert options["pool_pre_ping"] is True
+    
+    def test_memory_database_skips_pool_sizing(self):
+        """Test that in-memory SQLite gets no pool sizing"""
+        options = get_engine_options("sqlite://", Settings())
+        
+        assert "pool_size" not in options
+        create_engine("sqlite://", **options).dispose()
+    
+    def test_async_database_url(self):
+        """Test mapping URLs onto async drivers"""
+        assert get_async_database_url("sqlite:///./dev.db") == "sqlite+aiosqlite:///./dev.db"
+        assert get_async_database_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+        assert get_async_database_url("mysql+aiomysql://h/db") == "mysql+aiomysql://h/db"
+
+
+class TestSqlitePragmas:
+    """Test SQLite pragma profiles"""
+    
+    def test_default_profile(self):
+        """Test that the default profile is balanced"""
+        assert resolve_pragmas(Settings()) == PRAGMA_PROFILES["balanced"]
+    
+    def test_overrides_win_over_profile(self):
+        """Test per-pragma overrides"""
+        config = Settings(SQLITE_PRAGMA_PROFILE="durable", SQLITE_BUSY_TIMEOUT=100)
+        
+        pragmas = resolve_pragmas(config)
+        
+        assert pragmas["synchronous"] == "FULL"
+        assert pragmas["busy_timeout"] == 100
+    
+    def test_unknown_profile(self):
+        """Test that an unknown profile is rejected"""
+        with pytest.raises(ValueError):
+            resolve_pragmas(Settings(SQLITE_PRAGMA_PROFILE="turbo"))
+    
+    def test_pragmas_applied_on_connect(self, tmp_path):
+        """Test that pragmas are applied to new connections"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+        install_sqlite_pragmas(engine, Settings())
+        
+        with engine.connect() as conn:
+            journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+            synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+            busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+        engine.dispose()
+        
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout == 5000
+    
+    def test_legacy_profile_leaves_defaults(self, tmp_path):
+        """Test that the legacy profile installs nothing"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        install_sqlite_pragmas(engine, Settings(SQLITE_PRAGMA_PROFILE="legacy"))
+        
+        with engine.connect() as conn:
+            journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+        engine.dispose()
+        
+        assert journal_mode == "delete"
+    
+    def test_non_sqlite_engine_ignored(self):
+        """Test that pragmas are only installed on SQLite engines"""
+        engine = create_mock_engine("postgresql://", executor=lambda *args, **kwargs: None)
+        
+        # Would raise if it tried to register a connect listener on the mock
+        install_sqlite_pragmas(engine, Settings())
+
+
+class TestLazySession:
+    """Test lazily materialized request sessions"""
+    
+    @pytest.fixture
+    def pooled(self, tmp_path, monkeypatch):
+        """Point SessionLocal at a pooled file database"""
+        from sqlalchemy.orm import sessionmaker
+        from app.db import database
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'lazy.db'}", pool_size=2)
+        monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+        yield engine
+        engine.dispose()
+    
+    def test_connection_only_on_first_query(self, pooled):
+        """Test that a connection is checked out on first use and returned on close"""
+        from sqlalchemy.orm import sessionmaker
+        from app.db.lazy_session import LazySession
+        
+        db = LazySession(sessionmaker(bind=pooled))
+        
+        assert not db.is_materialized
+        db.rollback()
+        db.close()
+        assert pooled.pool.checkedout() == 0
+        
+        assert db.execute(text("SELECT 1")).scalar() == 1
+        assert db.is_materialized
+        assert pooled.pool.checkedout() == 1
+        
+        db.close()
+        assert pooled.pool.checkedout() == 0
+    
+    def test_routes_release_sessions_before_streaming(self, pooled):
+        """Test that get_db never opens unused sessions and releases used ones early"""
+        from fastapi import APIRouter, Depends, FastAPI
+        from fastapi.responses import StreamingResponse
+        from fastapi.testclient import TestClient
+        from app.db.database import get_db, get_read_db
+        from app.db.lazy_session import SessionReleasingRoute
+        
+        router = APIRouter(route_class=SessionReleasingRoute)
+        seen = {}
+        
+        @router.get("/unused")
+        def unused(db=Depends(get_db), read_db=Depends(get_read_db)):
+            seen["unused"] = (db.is_materialized, read_db.is_materialized)
+            return {}
+        
+        @router.get("/stream")
+        def stream(db=Depends(get_db)):
+            db.execute(text("SELECT 1"))
+            seen["during"] = pooled.pool.checkedout()
+            
+            def body():
+                seen["streaming"] = pooled.pool.checkedout()
+                yield b"ok"
+            return StreamingResponse(body())
+        
+        app = FastAPI()
+        app.include_router(router)
+        with TestClient(app) as client:
+            client.get("/unused")
+            client.get("/stream")
+        
+        assert seen["unused"] == (False, False)
+        assert seen["during"] == 1
+        assert seen["streaming"] == 0
+    
+    def test_get_db_rolls_back_on_error(self, pooled):
+        """Test that a failing request rolls back its pending work"""
+        from fastapi import Response
+        from starlette.requests import Request
+        from app.db.database import get_db
+        
+        request = Request({"type": "http", "headers": [], "state": {}})
+        dependency = get_db(request, Response())
+        db = next(dependency)
+        db.execute(text("CREATE TABLE t (x INTEGER)"))
+        
+        with pytest.raises(RuntimeError):
+            dependency.throw(RuntimeError("boom"))
+        assert pooled.pool.checkedout() == 0
+
+
+class TestReadOnlySession:
+    """Test read-only sessions used by GET routes"""
+    
+    @pytest.fixture
+    def read_factory(self, tmp_path):
+        """Pooled file database with a read-only and a writable session factory"""
+        from sqlalchemy.orm import sessionmaker
+        from app.db.read_only import READ_ONLY_KEY, install_read_only_mode, install_query_only_reset
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'read.db'}", pool_size=1, max_overflow=0)
+        install_query_only_reset(engine)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        read_factory = sessionmaker(bind=engine, autoflush=False, info={READ_ONLY_KEY: True})
+        install_read_only_mode(read_factory)
+        yield read_factory, sessionmaker(bind=engine)
+        engine.dispose()
+    
+    def test_reads_allowed_and_writes_rejected(self, read_factory):
+        """Test that a read-only session queries but cannot write, even through raw SQL"""
+        from sqlalchemy.exc import InvalidRequestError, OperationalError
+        from app.models import Company
+        
+        read_only, _ = read_factory
+        db = read_only()
+        assert db.execute(text("SELECT count(*) FROM t")).scalar() == 0
+        assert db.execute(text("PRAGMA query_only")).scalar() == 1
+        
+        with pytest.raises(OperationalError):
+            db.execute(text("INSERT INTO t (x) VALUES (1)"))
+        db.rollback()
+        
+        db.add(Company(name="Nope", cnpj="00.000.000/0000-00"))
+        with pytest.raises(InvalidRequestError):
+            db.flush()
+        db.close()
+    
+    def test_pooled_connection_writable_after_read(self, read_factory):
+        """Test that query_only is cleared before a writer reuses the connection"""
+        read_only, writable = read_factory
+        db = read_only()
+        db.execute(text("SELECT 1"))
+        db.close()
+        
+        writer = writable()
+        assert writer.execute(text("PRAGMA query_only")).scalar() == 0
+        writer.execute(text("INSERT INTO t (x) VALUES (1)"))
+        writer.commit()
+        writer.close()
+    
+    def test_get_read_db_is_read_only(self):
+        """Test that the GET dependency hands out read-only sessions"""
+        from starlette.requests import Request
+        from app.db.database import get_read_db
+        from app.db.read_only import READ_ONLY_KEY
+        
+        dependency = get_read_db(Request({"type": "http", "headers": [], "state": {}}), None)
+        db = next(dependency)
+        
+        assert db.info[READ_ONLY_KEY] is True
+        assert db.autoflush is False
+        dependency.close()
+
+
+class TestStatementTimeout:
+    """Test per-statement time budgets on SQLite"""
+    
+    ENDLESS = text(
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+        "SELECT count(*) FROM c"
+    )
+    
+    @pytest.fixture
+    def budgeted(self, tmp_path):
+        """Pooled file database whose sessions honour statement budgets"""
+        from sqlalchemy.orm import sessionmaker
+        from app.db.statement_timeout import install_statement_budget, install_statement_timeout
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'timeout.db'}", pool_size=1, max_overflow=0)
+        install_statement_timeout(engine)
+        factory = sessionmaker(bind=engine)
+        install_statement_budget(factory)
+        yield factory
+        engine.dispose()
+    
+    def test_runaway_statement_cancelled(self, budgeted):
+        """Test that a statement past its budget is interrupted and the connection reusable"""
+        import time
+        from app.db.statement_timeout import TIMEOUT_KEY, StatementTimeoutError
+        
+        db = budgeted()
+        db.info[TIMEOUT_KEY] = 50
+        started = time.monotonic()
+        with pytest.raises(StatementTimeoutError) as exc_info:
+            db.execute(self.ENDLESS)
+        
+        assert exc_info.value.timeout_ms == 50
+        assert time.monotonic() - started < 2
+        db.rollback()
+        assert db.execute(text("SELECT 1")).scalar() == 1
+        db.close()
+    
+    def test_async_runaway_statement_cancelled(self, tmp_path):
+        """Test that async sessions get their budget on aiosqlite, and reuse the connection"""
+        import asyncio
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        from app.db.database import AsyncRequestSession
+        from app.db.statement_timeout import TIMEOUT_KEY, StatementTimeoutError, install_statement_timeout
+        
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'timeout.db'}", pool_size=1, max_overflow=0)
+        install_statement_timeout(engine.sync_engine)
+        factory = async_sessionmaker(engine, sync_session_class=AsyncRequestSession)
+        
+        async def run():
+            async with factory() as db:
+                db.info[TIMEOUT_KEY] = 50
+                with pytest.raises(StatementTimeoutError):
+                    await db.execute(self.ENDLESS)
+            async with factory() as db:
+                count = await db.execute(text(
+                    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 200000) "
+                    "SELECT count(*) FROM c"
+                ))
+                assert count.scalar() == 200000
+            await engine.dispose()
+        
+        asyncio.run(run())
+    
+    def test_no_budget_leaves_statements_alone(self, budgeted):
+        """Test that sessions without a budget install no handler on the shared connection"""
+        from app.db.statement_timeout import TIMEOUT_KEY
+        
+        limited = budgeted()
+        limited.info[TIMEOUT_KEY] = 50
+        limited.execute(text("SELECT 1"))
+        limited.close()
+        
+        db = budgeted()
+        assert db.execute(text(
+            "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 200000) "
+            "SELECT count(*) FROM c"
+        )).scalar() == 200000
+        db.close()
+    
+    def test_route_budget_overrides_default(self):
+        """Test that query_budget sets the budget get_db applies to its sessions"""
+        import asyncio
+        from starlette.requests import Request
+        from app.db.statement_timeout import query_budget, get_request_budget
+        
+        request = Request({"type": "http", "headers": [], "state": {}})
+        assert get_request_budget(request, 5000) == 5000
+        
+        asyncio.run(query_budget(200)(request))
+        assert get_request_budget(request, 5000) == 200
+    
+    def test_async_session_gets_route_budget(self):
+        """Test that get_async_db applies the route's budget to its sessions"""
+        import asyncio
+        from starlette.requests import Request
+        from app.db.database import get_async_db
+        from app.db.statement_timeout import TIMEOUT_KEY, query_budget
+        
+        request = Request({"type": "http", "headers": [], "state": {}})
+        
+        async def budget_of_session():
+            await query_budget(200)(request)
+            sessions = get_async_db(request)
+            db = await anext(sessions)
+            await sessions.aclose()
+            return db.info[TIMEOUT_KEY]
+        
+        assert asyncio.run(budget_of_session()) == 200
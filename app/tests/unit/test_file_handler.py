@@ -82,3 +82,117 @@ class TestFileHandler:
         result = FileHandler.delete_file(None)
         
         assert result is False
+    
+    @pytest.mark.asyncio
+    async def test_save_file_streams_in_chunks(self, monkeypatch, upload_store):
+        """Test that a file larger than one chunk is written in full"""
+        import os
+        from app.core.config import settings
+        
+        monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 16)
+        content = b"%PDF-1.4 " + bytes(range(256)) * 4
+        file = UploadFile(filename="big.pdf", file=BytesIO(content))
+        
+        file_url = await FileHandler.save_file(file)
+        
+        with open(FileHandler.local_path(file_url), "rb") as saved:
+            assert saved.read() == content
+        assert not [name for name in os.listdir(upload_store.root) if name.endswith(".part")]
+        FileHandler.delete_file(file_url)
+    
+    @pytest.mark.asyncio
+    async def test_save_file_rejects_missing_magic(self):
+        """Test that a .pdf without the %PDF header is rejected"""
+        file = UploadFile(filename="fake.pdf", file=BytesIO(b"MZ not a pdf"))
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await FileHandler.save_file(file)
+        
+        assert exc_info.value.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_save_file_too_large(self, monkeypatch, upload_store):
+        """Test that uploads past the size limit are refused and not kept"""
+        import os
+        from app.core.config import settings
+        
+        monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 8)
+        monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 32)
+        before = set(os.listdir(upload_store.root))
+        file = UploadFile(filename="big.pdf", file=BytesIO(b"%PDF-1.4 " + b"x" * 64))
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await FileHandler.save_file(file)
+        
+        assert exc_info.value.status_code == 413
+        assert set(os.listdir(upload_store.root)) == before
+        
+        declared = UploadFile(filename="big.pdf", file=BytesIO(b"%PDF"), size=1024)
+        with pytest.raises(HTTPException) as exc_info:
+            await FileHandler.save_file(declared)
+        assert exc_info.value.status_code == 413
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_uploads_bounded(self, monkeypatch):
+        """Test that the per-loop semaphore caps uploads in flight"""
+        import asyncio
+        import weakref
+        from app.core.config import settings
+        from app.storage import local
+        from app.utils import file_handler
+        
+        monkeypatch.setattr(settings, "UPLOAD_MAX_CONCURRENCY", 2)
+        monkeypatch.setattr(file_handler, "_upload_slots", weakref.WeakKeyDictionary())
+        in_flight, peak = 0, 0
+        original_threadpool = local.run_in_threadpool
+        
+        async def slow_threadpool(func, *args, **kwargs):
+            nonlocal in_flight, peak
+            if getattr(func, "__name__", "") == "write":
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+            return await original_threadpool(func, *args, **kwargs)
+        
+        monkeypatch.setattr(local, "run_in_threadpool", slow_threadpool)
+        files = [UploadFile(filename="c.pdf", file=BytesIO(b"%PDF-1.4 concurrent")) for _ in range(6)]
+        
+        urls = await asyncio.gather(*(FileHandler.save_file(file) for file in files))
+        
+        assert peak == 2
+        assert file_handler.upload_slot() is file_handler.upload_slot()
+        for url in urls:
+            FileHandler.delete_file(url)
+    
+    @pytest.mark.asyncio
+    async def test_inspect_hashes_without_writing(self, upload_store):
+        """Test that inspect validates and hashes an upload, then rewinds it"""
+        import hashlib
+        import os
+        
+        content = b"%PDF-1.4 inspected"
+        file = UploadFile(filename="test.pdf", file=BytesIO(content))
+        before = set(os.listdir(upload_store.root))
+        
+        sha256, size = await FileHandler.inspect(file)
+        
+        assert sha256 == hashlib.sha256(content).hexdigest()
+        assert size == len(content)
+        assert await file.read() == content
+        assert set(os.listdir(upload_store.root)) == before
+        with pytest.raises(HTTPException):
+            await FileHandler.inspect(UploadFile(filename="empty.pdf", file=BytesIO(b"")))
+    
+    @pytest.mark.asyncio
+    async def test_save_file_named_by_contents(self):
+        """Test that identical uploads are saved to the same content-addressed file"""
+        import hashlib
+        
+        content = b"%PDF-1.4 same bytes"
+        first = await FileHandler.save_file(UploadFile(filename="a.pdf", file=BytesIO(content)))
+        second = await FileHandler.save_file(UploadFile(filename="b.pdf", file=BytesIO(content)))
+        
+        sha256 = hashlib.sha256(content).hexdigest()
+        assert first == second == f"/uploads/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+        FileHandler.delete_file(first)
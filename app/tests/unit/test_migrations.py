@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from fastapi.testclient import TestClient
+from app.db import migrate
+from app.db.migrations import (
+    SchemaOutOfDateError,
+    load_migrations,
+    get_pending_migrations,
+    upgrade,
+    check_schema_version
+)
+from app.models import Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Create an empty SQLite database"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+class TestMigrations:
+    """Test the schema migration runner"""
+    
+    def test_migrations_are_ordered(self):
+        """Test that migrations load in version order"""
+        versions = [migration.version for migration in load_migrations()]
+        
+        assert versions == sorted(versions)
+        assert versions[0] == 1
+    
+    def test_upgrade_matches_models(self, engine):
+        """Test that migrating a fresh database yields the models' schema"""
+        upgrade(engine)
+        inspector = inspect(engine)
+        
+        for table in Base.metadata.sorted_tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            assert columns == set(table.columns.keys()), table.name
+            assert {index.name for index in table.indexes} <= indexes, table.name
+    
+    def test_upgrade_is_idempotent(self, engine):
+        """Test that a second upgrade applies nothing"""
+        upgrade(engine)
+        
+        assert upgrade(engine) == []
+        assert get_pending_migrations(engine) == []
+    
+    def test_upgrade_to_target(self, engine):
+        """Test upgrading to a specific version"""
+        applied = upgrade(engine, target=1)
+        
+        assert [migration.version for migration in applied] == [1]
+        assert len(get_pending_migrations(engine)) == len(load_migrations()) - 1
+    
+    def test_adopts_legacy_database(self, engine):
+        """Test that databases created by create_all keep their data"""
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE companies (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+                "cnpj VARCHAR(20) NOT NULL UNIQUE, email VARCHAR(255), phone VARCHAR(20), "
+                "address VARCHAR(500), is_active BOOLEAN, created_at DATETIME, updated_at DATETIME)"
+            ))
+            conn.execute(text("INSERT INTO companies (name, cnpj) VALUES ('Legacy', '1')"))
+        
+        upgrade(engine)
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT name FROM companies")).scalar() == "Legacy"
+        assert inspect(engine).has_table("api_keys")
+    
+    def test_check_schema_version(self, engine):
+        """Test the startup schema check"""
+        with pytest.raises(SchemaOutOfDateError):
+            check_schema_version(engine)
+        
+        upgrade(engine)
+        
+        assert check_schema_version(engine) == load_migrations()[-1].version
+    
+    def test_app_startup_refuses_outdated_schema(self, engine, monkeypatch):
+        """Test that the app does not start on an outdated schema"""
+        from app import main
+        from app.core.config import settings
+        
+        monkeypatch.setattr(main, "engine", engine)
+        monkeypatch.setattr(settings, "DB_SCHEMA_CHECK", True)
+        
+        with pytest.raises(SchemaOutOfDateError):
+            with TestClient(main.app):
+                pass
+    
+    def test_cli(self, engine, monkeypatch, capsys):
+        """Test the migrate command line"""
+        monkeypatch.setattr(migrate, "engine", engine)
+        
+        migrate.main(["pending"])
+        pending = capsys.readouterr().out
+        migrate.main(["upgrade", "--to", "1"])
+        migrate.main(["current"])
+        migrate.main(["upgrade"])
+        migrate.main([])
+        output = capsys.readouterr().out
+        
+        assert "0001 initial" in pending
+        assert "Applied 0001 initial" in output
+        assert "Database is up to date." in output
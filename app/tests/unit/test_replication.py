@@ -0,0 +1,185 @@
+import pytest
+from fastapi import Request, Response
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from app.db import database
+from app.db.replication import (
+    ReplicaSet,
+    RoutingSession,
+    CONSISTENCY_HEADER,
+    install_write_tracking,
+    parse_consistency_token,
+    copy_sqlite_database
+)
+from app.models import Base, Company
+
+
+def make_request():
+    """Bare HTTP request for calling dependencies directly"""
+    return Request({"type": "http", "headers": [], "state": {}})
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    """Create a primary and a replica SQLite database with write tracking"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=primary)
+    copy_sqlite_database(primary, replica)
+    
+    factory = sessionmaker(bind=primary, class_=RoutingSession, autoflush=False)
+    install_write_tracking(factory)
+    replicas = ReplicaSet([replica], max_wait_ms=30, poll_interval_ms=5)
+    yield primary, replica, factory, replicas
+    primary.dispose()
+    replica.dispose()
+
+
+def write_company(factory, cnpj: str) -> Response:
+    response = Response()
+    session = factory()
+    session.info["response"] = response
+    try:
+        session.add(Company(name=f"Company {cnpj}", cnpj=cnpj))
+        session.commit()
+    finally:
+        session.close()
+    return response
+
+
+class TestReplicaRouting:
+    """Test read-replica routing and consistency tokens"""
+    
+    def test_write_returns_consistency_token(self, cluster):
+        """Test that each committed write advances the token"""
+        primary, replica, factory, replicas = cluster
+        
+        first = write_company(factory, "1")
+        second = write_company(factory, "2")
+        
+        assert first.headers[CONSISTENCY_HEADER] == "1"
+        assert second.headers[CONSISTENCY_HEADER] == "2"
+        assert ReplicaSet.get_position(primary) == 2
+    
+    def test_read_only_commit_keeps_position(self, cluster):
+        """Test that commits without writes do not advance the position"""
+        primary, replica, factory, replicas = cluster
+        write_company(factory, "1")
+        
+        session = factory()
+        session.info["response"] = response = Response()
+        session.query(Company).all()
+        session.commit()
+        session.close()
+        
+        assert CONSISTENCY_HEADER not in response.headers
+        assert ReplicaSet.get_position(primary) == 1
+    
+    def test_rollback_discards_position(self, cluster):
+        """Test that rolled back writes do not publish a token"""
+        primary, replica, factory, replicas = cluster
+        session = factory()
+        session.add(Company(name="Rolled back", cnpj="9"))
+        session.flush()
+        session.rollback()
+        session.commit()
+        session.close()
+        
+        assert ReplicaSet.get_position(primary) == 0
+    
+    def test_bulk_statements_advance_position(self, cluster):
+        """Test that update()/delete() statements count as writes"""
+        primary, replica, factory, replicas = cluster
+        write_company(factory, "1")
+        
+        session = factory()
+        session.info["response"] = updated = Response()
+        session.info["replica"] = replica
+        session.execute(update(Company).where(Company.cnpj == "1").values(name="Renamed"))
+        session.commit()
+        session.info["response"] = deleted = Response()
+        session.query(Company).filter(Company.cnpj == "1").delete(synchronize_session=False)
+        session.commit()
+        session.close()
+        
+        assert updated.headers[CONSISTENCY_HEADER] == "2"
+        assert deleted.headers[CONSISTENCY_HEADER] == "3"
+        assert ReplicaSet.get_position(replica) == 0
+    
+    def test_stale_replica_falls_back_to_primary(self, cluster):
+        """Test that a token ahead of every replica routes to the primary"""
+        primary, replica, factory, replicas = cluster
+        token = write_company(factory, "1").headers[CONSISTENCY_HEADER]
+        
+        assert replicas.choose(parse_consistency_token(token)) is None
+        assert replicas.choose(0) is replica
+    
+    def test_caught_up_replica_serves_reads(self, cluster):
+        """Test that reads go to a replica once it has caught up"""
+        primary, replica, factory, replicas = cluster
+        token = write_company(factory, "1").headers[CONSISTENCY_HEADER]
+        copy_sqlite_database(primary, replica)
+        write_company(factory, "2")
+        
+        session = factory()
+        session.info["replica"] = replicas.choose(parse_consistency_token(token))
+        cnpjs = [company.cnpj for company in session.query(Company).all()]
+        session.close()
+        
+        # The replica has the first write but not the second
+        assert cnpjs == ["1"]
+    
+    def test_flush_on_read_session_goes_to_primary(self, cluster):
+        """Test that writes from a replica-routed session still hit the primary"""
+        primary, replica, factory, replicas = cluster
+        session = factory()
+        session.info["replica"] = replica
+        session.add(Company(name="Write", cnpj="3"))
+        session.commit()
+        session.close()
+        
+        assert ReplicaSet.get_position(primary) == 1
+        assert ReplicaSet.get_position(replica) == 0
+    
+    def test_empty_replica_set(self):
+        """Test that no replicas means always the primary"""
+        replicas = ReplicaSet([])
+        
+        assert not replicas
+        assert replicas.choose(5) is None
+    
+    def test_position_of_database_without_table(self, tmp_path):
+        """Test reading the position of an uninitialized database"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+        
+        assert ReplicaSet.get_position(engine) == 0
+    
+    def test_parse_consistency_token(self):
+        """Test parsing consistency tokens"""
+        assert parse_consistency_token(None) == 0
+        assert parse_consistency_token("7") == 7
+        assert parse_consistency_token("-3") == 0
+        assert parse_consistency_token("garbage") == 0
+    
+    def test_get_read_db_routes_by_token(self, cluster, monkeypatch):
+        """Test that the read dependency picks a replica from the request token"""
+        primary, replica, factory, replicas = cluster
+        monkeypatch.setattr(database, "replica_set", replicas)
+        
+        fresh = database.get_read_db(make_request(), "0")
+        behind = database.get_read_db(make_request(), "5")
+        
+        assert next(fresh).info["replica"] is replica
+        assert next(behind).info["replica"] is None
+        fresh.close()
+        behind.close()
+    
+    def test_get_db_exposes_response(self):
+        """Test that the write dependency keeps the response for the token"""
+        response = Response()
+        dependency = database.get_db(make_request(), response)
+        
+        session = next(dependency)
+        
+        assert session.info["response"] is response
+        dependency.close()
@@ -5,6 +5,7 @@ from app.repositories.company_repository import CompanyRepository
 from app.repositories.invoice_repository import InvoiceRepository
 from app.models import User, Company, Invoice, RoleEnum
 from app.core.security import get_password_hash
+from app.core.tenancy import TenantScope
 
 
 class TestUserRepository:
@@ -231,3 +232,145 @@ class TestInvoiceRepository:
         invoices = repo.get_by_month_year(today.month, today.year)
         
         assert len(invoices) >= 1
+
+
+class TestTenantScope:
+    """Test tenant scoping applied by repositories"""
+    
+    def _invoices(self, db, superadmin_user):
+        own = Company(name="Own", cnpj="11.111.111/0001-11")
+        other = Company(name="Other", cnpj="22.222.222/0001-22")
+        db.add_all([own, other])
+        db.flush()
+        invoices = [
+            Invoice(company_id=company.id, description=company.name, amount=10,
+                    due_date=date.today(), created_by=superadmin_user.id)
+            for company in (own, other)
+        ]
+        db.add_all(invoices)
+        db.commit()
+        return own, invoices
+    
+    def test_for_user(self, admin_user, regular_user):
+        """Test building scopes from principals"""
+        assert TenantScope.for_user(admin_user).restricted is False
+        assert TenantScope.for_user(regular_user) == TenantScope(company_id=regular_user.company_id, restricted=True)
+    
+    def test_scoped_queries(self, db, superadmin_user):
+        """Test that scoped lists and lookups only see the tenant's rows"""
+        own, (own_invoice, other_invoice) = self._invoices(db, superadmin_user)
+        db.expunge_all()
+        repo = InvoiceRepository(db, TenantScope(company_id=own.id, restricted=True))
+        
+        assert [i.id for i in repo.get_all()] == [own_invoice.id]
+        assert repo.get_by_company(other_invoice.company_id) == []
+        assert repo.get(own_invoice.id).id == own_invoice.id
+        assert repo.get(other_invoice.id) is None
+    
+    def test_scoped_get_uses_identity_map(self, db, superadmin_user, statements):
+        """Test that loaded rows are checked against the scope without a query"""
+        own, (own_invoice, other_invoice) = self._invoices(db, superadmin_user)
+        statements.clear()
+        repo = InvoiceRepository(db, TenantScope(company_id=own.id, restricted=True))
+        
+        assert repo.get(own_invoice.id) is own_invoice
+        assert repo.get(other_invoice.id) is None
+        assert statements == []
+    
+    def test_scope_without_company_matches_nothing(self, db, superadmin_user):
+        """Test that a restricted principal without a company sees no rows"""
+        own, (own_invoice, _) = self._invoices(db, superadmin_user)
+        db.expunge_all()
+        repo = CompanyRepository(db, TenantScope(restricted=True))
+        
+        assert repo.get_all() == []
+        assert repo.get(own.id) is None
+        assert repo.get_by_cnpj(own.cnpj) is None
+    
+    def test_prebuilt_lookups_respect_scope(self, db, superadmin_user):
+        """Test that the prebuilt lookups bind the tenant as a parameter"""
+        own, (own_invoice, other_invoice) = self._invoices(db, superadmin_user)
+        db.expunge_all()
+        scope = TenantScope(company_id=own.id, restricted=True)
+        today = date.today()
+        
+        assert CompanyRepository(db, scope).get_by_cnpj(own.cnpj).id == own.id
+        assert CompanyRepository(db, scope).get_by_cnpj("22.222.222/0001-22") is None
+        assert [i.id for i in InvoiceRepository(db, scope).get_by_month_year(today.month, today.year)] == [own_invoice.id]
+        assert InvoiceRepository(db, scope).get_by_date(today, other_invoice.company_id) == []
+        assert len(InvoiceRepository(db).get_by_date(today)) == 2
+    
+    def test_prebuilt_lookups_compile_once(self, db, superadmin_user):
+        """Test that repeated lookups reuse the compiled statement"""
+        from sqlalchemy import event
+        from sqlalchemy.engine.default import CACHE_HIT
+        own, _ = self._invoices(db, superadmin_user)
+        repo = CompanyRepository(db)
+        repo.get_by_cnpj(own.cnpj)
+        
+        cache_hits = []
+        
+        def record(conn, clauseelement, multiparams, params, execution_options, result):
+            cache_hits.append(result.context.cache_hit)
+        
+        event.listen(db.get_bind(), "after_execute", record)
+        try:
+            repo.get_by_cnpj("other")
+            repo.get_by_cnpj(own.cnpj)
+        finally:
+            event.remove(db.get_bind(), "after_execute", record)
+        
+        assert cache_hits and all(hit == CACHE_HIT for hit in cache_hits)
+
+
+class TestAsyncRepositories:
+    """Test async repositories"""
+    
+    async def test_async_crud(self, async_db, test_company, admin_user):
+        """Test create, get, update and delete through the async base repository"""
+        from app.repositories.async_invoice_repository import AsyncInvoiceRepository
+        
+        repo = AsyncInvoiceRepository(async_db)
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Async",
+            amount=10,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        
+        created = await repo.create(invoice)
+        updated = await repo.update(created, {"description": "Async updated"})
+        found = await repo.get(created.id)
+        
+        assert created.id is not None
+        assert found.description == "Async updated"
+        assert updated is created
+        assert await repo.delete(created.id) is True
+        assert await repo.delete(created.id) is False
+    
+    async def test_async_get_all(self, async_db, test_company):
+        """Test get_all on the generic async base repository"""
+        from app.repositories.async_base import AsyncBaseRepository
+        
+        repo = AsyncBaseRepository(Company, async_db)
+        
+        companies = await repo.get_all()
+        
+        assert [c.id for c in companies] == [test_company.id]
+    
+    async def test_async_scoped_get(self, async_db, db, test_company, admin_user):
+        """Test that async lookups honour the tenant scope"""
+        from app.repositories.async_invoice_repository import AsyncInvoiceRepository
+        
+        invoice = Invoice(company_id=test_company.id, description="Scoped", amount=10,
+                          due_date=date.today(), created_by=admin_user.id)
+        db.add(invoice)
+        db.commit()
+        
+        own = AsyncInvoiceRepository(async_db, TenantScope(company_id=test_company.id, restricted=True))
+        other = AsyncInvoiceRepository(async_db, TenantScope(company_id=test_company.id + 1, restricted=True))
+        
+        assert await other.get(invoice.id) is None
+        assert (await own.get(invoice.id)).id == invoice.id
+        assert await other.get(invoice.id) is None
@@ -3,7 +3,14 @@ from app.core.security import (
     get_password_hash,
     verify_password,
     create_access_token,
-    decode_access_token
+    decode_access_token,
+    generate_api_key,
+    get_api_key_prefix,
+    get_api_key_hash,
+    verify_api_key,
+    sign_download,
+    verify_download,
+    download_expiry
 )
 
 
@@ -91,3 +98,53 @@ class TestJWTToken:
         
         assert "exp" in decoded
         assert isinstance(decoded["exp"], int)
+
+
+class TestApiKeys:
+    """Test API key helpers"""
+    
+    def test_generate_api_key_embeds_prefix(self):
+        """Test that the generated key carries its lookup prefix"""
+        key, prefix = generate_api_key()
+        
+        assert key.startswith(f"dk_{prefix}_")
+        assert get_api_key_prefix(key) == prefix
+    
+    def test_get_api_key_prefix_malformed(self):
+        """Test extracting prefix from malformed keys"""
+        assert get_api_key_prefix("not-a-key") is None
+        assert get_api_key_prefix("xx_abc_secret") is None
+        assert get_api_key_prefix("dk__secret") is None
+    
+    def test_verify_api_key(self):
+        """Test API key verification"""
+        key, _ = generate_api_key()
+        hashed = get_api_key_hash(key)
+        
+        assert len(hashed) == 64
+        assert verify_api_key(key, hashed) is True
+        assert verify_api_key(key + "x", hashed) is False
+
+
+class TestSignedDownloads:
+    """Test HMAC-signed download links"""
+    
+    def test_signature_verifies_until_expiry(self):
+        """Test that a link is valid for its path until it expires"""
+        signature = sign_download("ab/cd/file.pdf", 1000)
+        
+        assert verify_download("ab/cd/file.pdf", "1000", signature, now=999) is True
+        assert verify_download("ab/cd/file.pdf", "1000", signature, now=1001) is False
+        assert verify_download("ab/cd/other.pdf", "1000", signature, now=999) is False
+        assert verify_download("ab/cd/file.pdf", "2000", signature, now=999) is False
+        assert verify_download("ab/cd/file.pdf", "soon", signature, now=999) is False
+        assert verify_download("ab/cd/file.pdf", "1000", None, now=999) is False
+    
+    def test_expiry_stable_within_window(self, monkeypatch):
+        """Test that links issued in one TTL window share an expiry of one to two TTLs"""
+        from app.core.config import settings
+        
+        monkeypatch.setattr(settings, "DOWNLOAD_URL_TTL_SECONDS", 300)
+        
+        assert download_expiry(now=600) == download_expiry(now=899) == 1200
+        assert download_expiry(now=900) == 1500
@@ -8,7 +8,7 @@ from app.services.invoice_service import InvoiceService
 from app.schemas.user import UserCreate, UserUpdate
 from app.schemas.company import CompanyCreate, CompanyUpdate
 from app.schemas.invoice import InvoiceCreate, InvoiceUpdate
-from app.models import RoleEnum, Invoice
+from app.models import RoleEnum, Invoice, StoredFile
 
 
 class TestAuthService:
@@ -91,11 +91,12 @@ class TestUserService:
             role=RoleEnum.user
         )
         
-        user = service.create_user(user_data)
+        user = service.create_user(user_data, "hashed-by-caller")
         
         assert user.id is not None
         assert user.email == "newuser@test.com"
         assert user.name == "New User"
+        assert user.hashed_password == "hashed-by-caller"
     
     def test_create_user_duplicate_email(self, db, superadmin_user):
         """Test creating user with duplicate email"""
@@ -107,7 +108,7 @@ class TestUserService:
         )
         
         with pytest.raises(HTTPException) as exc_info:
-            service.create_user(user_data)
+            service.create_user(user_data, "hashed-by-caller")
         
         assert exc_info.value.status_code == 400
     
@@ -120,6 +121,14 @@ class TestUserService:
         
         assert updated.name == "Updated Name"
     
+    def test_update_user_password_arrives_hashed(self, db, superadmin_user):
+        """Test that the service stores the given hash and never the plain password"""
+        service = UserService(db)
+        
+        updated = service.update_user(superadmin_user.id, UserUpdate(password="plain"), hashed_password="hashed")
+        
+        assert updated.hashed_password == "hashed"
+    
     def test_delete_user(self, db, admin_user):
         """Test deleting a user"""
         service = UserService(db)
@@ -312,3 +321,79 @@ class TestInvoiceService:
         assert stats["paid"] >= 1
         assert stats["pending"] >= 1
         assert "pending_amount" in stats
+    
+    def test_attach_files_skips_missing_invoices(self, db, test_company, superadmin_user):
+        """Test that attaching several files skips a missing invoice and commits the rest"""
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Bulk",
+            amount=1000,
+            due_date=date.today(),
+            created_by=superadmin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        
+        service = InvoiceService(db)
+        attached = service.attach_files([(invoice.id + 1, "b" * 64, 10), (invoice.id, "a" * 64, 10)])
+        db.rollback()
+        
+        assert attached == [invoice]
+        assert invoice.file_url.endswith("a" * 64 + ".pdf")
+        assert invoice.version == 2
+        assert [stored.sha256 for stored in db.query(StoredFile).all()] == ["a" * 64]
+
+
+class TestUnitOfWork:
+    """Test that service writes commit once without reloading rows"""
+    
+    def test_create_uses_returning(self, db, test_company, superadmin_user, statements):
+        """Test that creating an invoice is a single INSERT ... RETURNING"""
+        service = InvoiceService(db)
+        invoice_data = InvoiceCreate(
+            company_id=test_company.id,
+            description="Returning",
+            amount=100,
+            due_date=date.today()
+        )
+        
+        invoice = service.create_invoice(invoice_data, superadmin_user.id)
+        
+        assert invoice.created_at is not None
+        assert len(statements) == 1
+        assert statements[0].startswith("INSERT INTO invoices")
+        assert "RETURNING" in statements[0]
+    
+    def test_update_does_not_reload(self, db, test_company, superadmin_user, statements):
+        """Test that updating an already loaded invoice is a single UPDATE"""
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="Test",
+            amount=1000,
+            due_date=date.today(),
+            created_by=superadmin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        statements.clear()
+        
+        service = InvoiceService(db)
+        updated = service.update_invoice(invoice.id, InvoiceUpdate(description="Updated"))
+        
+        assert updated.updated_at is not None
+        assert updated.description == "Updated"
+        assert [s.split()[0] for s in statements] == ["UPDATE"]
+        assert "RETURNING" in statements[0]
+    
+    def test_failed_validation_writes_nothing(self, db, test_company, statements):
+        """Test that a rejected write issues no INSERT"""
+        service = CompanyService(db)
+        
+        with pytest.raises(HTTPException):
+            service.create_company(CompanyCreate(
+                name="Duplicate",
+                cnpj=test_company.cnpj,
+                email="dup@company.com"
+            ))
+        
+        assert not any(s.startswith("INSERT") for s in statements)
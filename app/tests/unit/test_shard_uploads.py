@@ -0,0 +1,102 @@
+import os
+import pytest
+from pathlib import Path
+from app.db.shard_uploads import shard_uploads
+from app.storage import LocalStorage
+from app.utils import file_handler
+from app.utils.file_handler import FileHandler, shard_path, sharded_url
+
+HASH_NAME = "ab" * 32 + ".pdf"
+
+
+@pytest.fixture
+def upload_dir(upload_store):
+    """Directory of the temporary upload store"""
+    return Path(upload_store.root)
+
+
+class TestShardedLayout:
+    """Test the two-level fan-out of the upload store"""
+    
+    def test_shard_path(self):
+        """Test that names fan out by their first four characters"""
+        assert shard_path("0123abcd.pdf") == "01/23/0123abcd.pdf"
+        assert shard_path("a.pdf") == "a.pdf"
+        assert sharded_url("/uploads/0123abcd.pdf") == "/uploads/01/23/0123abcd.pdf"
+    
+    def test_local_path_stays_in_store(self, upload_dir):
+        """Test that only URLs inside the store map to a path"""
+        assert FileHandler.local_path("/uploads/01/23/x.pdf") == os.path.join(str(upload_dir), "01", "23", "x.pdf")
+        assert FileHandler.local_path("/uploads/../secret.pdf") is None
+        assert FileHandler.local_path("/uploads//x.pdf") is None
+        assert FileHandler.local_path("/static/x.pdf") is None
+    
+    def test_delete_flat_url_of_moved_file(self, upload_dir):
+        """Test that a flat URL still deletes a file already moved to its shard"""
+        shard = upload_dir / "ab" / "ab"
+        shard.mkdir(parents=True)
+        (shard / HASH_NAME).write_bytes(b"%PDF-1.4")
+        
+        assert FileHandler.delete_file(f"/uploads/{HASH_NAME}") is True
+        assert not (shard / HASH_NAME).exists()
+    
+    def test_mount_resolves_flat_url(self, client):
+        """Test that /uploads serves a moved file under its old flat URL"""
+        path = FileHandler.local_path(sharded_url(f"/uploads/{HASH_NAME}"))
+        LocalStorage.move(self.write_temp(b"%PDF-1.4 moved"), path)
+        try:
+            flat = client.get(f"/uploads/{HASH_NAME}")
+            sharded = client.get(sharded_url(f"/uploads/{HASH_NAME}"))
+        finally:
+            os.remove(path)
+        
+        assert flat.status_code == sharded.status_code == 200
+        assert flat.content == b"%PDF-1.4 moved"
+        assert flat.headers["etag"] == f'"{"ab" * 32}"'
+        assert client.get("/uploads/missing.pdf").status_code == 404
+    
+    @staticmethod
+    def write_temp(content: bytes) -> str:
+        path = os.path.join(file_handler.storage.root, "moved.tmp")
+        with open(path, "wb") as temp:
+            temp.write(content)
+        return path
+
+
+class TestShardUploadsTool:
+    """Test the migration of the flat store to the sharded layout"""
+    
+    def test_moves_files_and_rewrites_urls(self, upload_dir, db, make_invoice):
+        """Test that files move to their shards and invoices follow them"""
+        (upload_dir / HASH_NAME).write_bytes(b"%PDF-1.4 a")
+        (upload_dir / "0123abcd.pdf").write_bytes(b"%PDF-1.4 b")
+        (upload_dir / "upload.part").write_bytes(b"partial")
+        shared = [make_invoice(file_url=f"/uploads/{HASH_NAME}") for _ in range(2)]
+        other = make_invoice(file_url="/uploads/0123abcd.pdf")
+        
+        report = shard_uploads(db.get_bind(), batch_size=1)
+        db.expire_all()
+        
+        assert (report.files_moved, report.urls_rewritten) == (2, 2)
+        assert (upload_dir / "ab" / "ab" / HASH_NAME).read_bytes() == b"%PDF-1.4 a"
+        assert (upload_dir / "01" / "23" / "0123abcd.pdf").exists()
+        assert (upload_dir / "upload.part").exists()
+        assert {invoice.file_url for invoice in shared} == {sharded_url(f"/uploads/{HASH_NAME}")}
+        assert other.file_url == "/uploads/01/23/0123abcd.pdf"
+        assert other.version == 1
+        
+        # Nothing left to do on a second run
+        again = shard_uploads(db.get_bind())
+        assert (again.files_moved, again.urls_rewritten) == (0, 0)
+    
+    def test_dry_run_changes_nothing(self, upload_dir, db, make_invoice):
+        """Test that a dry run only reports"""
+        (upload_dir / HASH_NAME).write_bytes(b"%PDF-1.4 a")
+        invoice = make_invoice(file_url=f"/uploads/{HASH_NAME}")
+        
+        report = shard_uploads(db.get_bind(), dry_run=True)
+        db.expire_all()
+        
+        assert (report.files_moved, report.urls_rewritten) == (1, 1)
+        assert (upload_dir / HASH_NAME).exists()
+        assert invoice.file_url == f"/uploads/{HASH_NAME}"
@@ -0,0 +1,247 @@
+import hashlib
+import types
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+from fastapi import HTTPException
+from app.core.config import Settings
+from app.storage import LocalStorage, S3Storage, build_storage, s3
+from app.utils import file_handler
+
+
+class FakeS3Client:
+    """In-memory stand-in for boto3's S3 client"""
+    
+    exceptions = types.SimpleNamespace(ClientError=KeyError, NoSuchKey=KeyError)
+    page_size = 2
+    
+    def __init__(self):
+        self.objects = {}
+        self.modified = {}
+        self.uploads = {}
+        self.aborted = []
+    
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[(Bucket, Key)] = Body
+        self.modified[(Bucket, Key)] = datetime.now(timezone.utc)
+    
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        upload_id = f"upload-{len(self.uploads) + len(self.aborted) + 1}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+    
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+    
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[(Bucket, Key)] = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+        self.modified[(Bucket, Key)] = datetime.now(timezone.utc)
+    
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(UploadId)
+    
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective, ContentType):
+        self.objects[(Bucket, Key)] = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+        self.modified[(Bucket, Key)] = datetime.now(timezone.utc)
+    
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+    
+    def get_object(self, Bucket, Key):
+        body = BytesIO(self.objects[(Bucket, Key)])
+        body.iter_chunks = lambda chunk_size: iter(lambda: body.read(chunk_size), b"")
+        return {"Body": body}
+    
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.objects[(Bucket, Key)]), "LastModified": self.modified[(Bucket, Key)]}
+    
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        result = {
+            "Contents": [
+                {"Key": key, "Size": len(self.objects[(Bucket, key)]), "LastModified": self.modified[(Bucket, key)]}
+                for key in page
+            ],
+            "IsTruncated": start + self.page_size < len(keys)
+        }
+        if result["IsTruncated"]:
+            result["NextContinuationToken"] = str(start + self.page_size)
+        return result
+    
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?X-Amz-Expires={ExpiresIn}"
+
+
+async def chunks_of(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """S3 storage on a fake client, with 16-byte multipart parts"""
+    monkeypatch.setattr(s3, "MIN_PART_SIZE", 16)
+    return S3Storage(FakeS3Client(), "invoices", prefix="pdf/", part_size=16, presign_ttl=60)
+
+
+class TestS3Storage:
+    """Test the S3-compatible backend against a local stand-in"""
+    
+    @pytest.mark.asyncio
+    async def test_small_file_single_put(self, bucket):
+        """Test that a file below one part is a single PUT"""
+        await bucket.save("ab/cd/small.pdf", chunks_of(b"%PDF", b"-1.4"))
+        
+        assert bucket.client.objects == {("invoices", "pdf/ab/cd/small.pdf"): b"%PDF-1.4"}
+        assert bucket.client.uploads == {}
+    
+    @pytest.mark.asyncio
+    async def test_large_file_multipart(self, bucket):
+        """Test that a large file is streamed in parts and assembled in order"""
+        content = b"%PDF-1.4 " + bytes(range(64))
+        
+        await bucket.save("ab/cd/large.pdf", chunks_of(*(content[i:i + 10] for i in range(0, len(content), 10))))
+        
+        assert bucket.client.objects[("invoices", "pdf/ab/cd/large.pdf")] == content
+        assert bucket.client.uploads == {}
+    
+    @pytest.mark.asyncio
+    async def test_failed_upload_aborted(self, bucket):
+        """Test that an upload failing after its first part is aborted"""
+        async def failing():
+            yield b"%PDF-1.4 " + b"x" * 32
+            raise HTTPException(status_code=413, detail="Grande demais")
+        
+        with pytest.raises(HTTPException):
+            await bucket.save("ab/cd/failed.pdf", failing())
+        
+        assert bucket.client.objects == {}
+        assert bucket.client.aborted == ["upload-1"]
+    
+    def test_presigned_download(self, bucket):
+        """Test that downloads redirect to a presigned GET and are not cached"""
+        response = bucket.response("ab/cd/file.pdf", {"ETag": '"abc"'}, filename="fatura-1.pdf")
+        
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://s3.test/invoices/pdf/ab/cd/file.pdf?X-Amz-Expires=60"
+        assert response.headers["cache-control"] == "private, no-store"
+        assert bucket.download_url("ab/cd/file.pdf").startswith("https://s3.test/")
+    
+    def test_delete(self, bucket):
+        """Test deleting an object, unless it was stored again since a given time"""
+        bucket.client.put_object(Bucket="invoices", Key="pdf/ab/cd/file.pdf", Body=b"%PDF", ContentType="")
+        listed_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        
+        assert bucket.delete("ab/cd/file.pdf", unmodified_since=listed_at.timestamp()) is False
+        assert bucket.delete("ab/cd/missing.pdf", unmodified_since=listed_at.timestamp()) is False
+        assert bucket.delete("ab/cd/file.pdf") is True
+        assert bucket.client.objects == {}
+    
+    def test_touch(self, bucket):
+        """Test that touching renews an object's modification time, and misses a missing one"""
+        bucket.client.put_object(Bucket="invoices", Key="pdf/ab/cd/file.pdf", Body=b"%PDF", ContentType="")
+        listed_at = datetime.now(timezone.utc)
+        bucket.client.modified[("invoices", "pdf/ab/cd/file.pdf")] = listed_at - timedelta(hours=1)
+        
+        assert bucket.touch("ab/cd/file.pdf") is True
+        assert bucket.touch("ab/cd/missing.pdf") is False
+        assert bucket.delete("ab/cd/file.pdf", unmodified_since=listed_at.timestamp()) is False
+        assert bucket.client.objects == {("invoices", "pdf/ab/cd/file.pdf"): b"%PDF"}
+    
+    def test_read_in_chunks(self, bucket):
+        """Test reading an object a chunk at a time"""
+        bucket.client.put_object(Bucket="invoices", Key="pdf/ab/cd/file.pdf", Body=b"%PDF-1.4 body", ContentType="")
+        
+        assert list(bucket.read("ab/cd/file.pdf", 5)) == [b"%PDF-", b"1.4 b", b"ody"]
+        assert bucket.read("ab/cd/missing.pdf", 5) is None
+    
+    def test_list_objects_pages(self, bucket):
+        """Test that listing follows continuation tokens and strips the prefix"""
+        for n in range(5):
+            bucket.client.put_object(Bucket="invoices", Key=f"pdf/0{n}/file.pdf", Body=b"%PDF" * n, ContentType="")
+        bucket.client.put_object(Bucket="invoices", Key="other/file.pdf", Body=b"%PDF", ContentType="")
+        
+        listed = list(bucket.list_objects())
+        
+        assert [(item.key, item.size) for item in listed] == [(f"0{n}/file.pdf", 4 * n) for n in range(5)]
+
+
+class TestBuildStorage:
+    """Test the backend selection"""
+    
+    def test_local_by_default(self, tmp_path):
+        """Test that the local store is the default"""
+        storage = build_storage(Settings(), str(tmp_path))
+        
+        assert isinstance(storage, LocalStorage)
+        assert storage.root == str(tmp_path)
+    
+    def test_s3_requires_boto3(self, tmp_path, monkeypatch):
+        """Test that choosing S3 without boto3 fails with a clear error"""
+        import sys
+        
+        monkeypatch.setitem(sys.modules, "boto3", None)
+        
+        with pytest.raises(RuntimeError, match="boto3"):
+            build_storage(Settings(STORAGE_BACKEND="s3", S3_BUCKET="invoices"), str(tmp_path))
+        with pytest.raises(ValueError):
+            build_storage(Settings(STORAGE_BACKEND="ftp"), str(tmp_path))
+    
+    def test_s3_built_from_settings(self, tmp_path, monkeypatch):
+        """Test that the S3 backend gets the bucket, prefix and client from the settings"""
+        import sys
+        
+        fake_boto3 = types.SimpleNamespace(client=lambda service, **kwargs: (service, kwargs))
+        monkeypatch.setitem(sys.modules, "boto3", fake_boto3)
+        
+        storage = build_storage(
+            Settings(STORAGE_BACKEND="s3", S3_BUCKET="invoices", S3_PREFIX="pdf/", S3_ENDPOINT_URL="http://minio:9000"),
+            str(tmp_path)
+        )
+        
+        assert isinstance(storage, S3Storage)
+        assert (storage.bucket, storage.prefix) == ("invoices", "pdf/")
+        assert storage.client == ("s3", {"endpoint_url": "http://minio:9000", "region_name": None})
+
+
+class TestObjectStorageUploads:
+    """Test the invoice endpoints on object storage"""
+    
+    def test_upload_and_download_through_bucket(
+        self, client, auth_headers_admin, db, test_company, admin_user, bucket, monkeypatch
+    ):
+        """Test that uploads land in the bucket and downloads never touch the API's disk"""
+        from app.models import Invoice
+        
+        monkeypatch.setattr(file_handler, "storage", bucket)
+        invoice = Invoice(
+            company_id=test_company.id,
+            description="S3",
+            amount=10,
+            due_date=date.today(),
+            created_by=admin_user.id
+        )
+        db.add(invoice)
+        db.commit()
+        content = b"%PDF-1.4 stored in the bucket, in parts"
+        sha256 = hashlib.sha256(content).hexdigest()
+        key = f"pdf/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+        
+        files = {"file": ("boleto.pdf", BytesIO(content), "application/pdf")}
+        uploaded = client.post(f"/api/v1/invoices/{invoice.id}/upload", files=files, headers=auth_headers_admin)
+        downloaded = client.get(
+            f"/api/v1/invoices/{invoice.id}/file", headers=auth_headers_admin, follow_redirects=False
+        )
+        listed = client.get("/api/v1/invoices/", headers=auth_headers_admin).json()
+        
+        assert uploaded.status_code == 200
+        assert bucket.client.objects[("invoices", key)] == content
+        assert downloaded.status_code == 307
+        assert downloaded.headers["location"].startswith(f"https://s3.test/invoices/{key}")
+        assert listed[0]["download_url"].startswith(f"https://s3.test/invoices/{key}")
+        assert file_handler.FileHandler.local_path(uploaded.json()["file_url"]) is None
@@ -0,0 +1,149 @@
+import os
+import time
+import pytest
+from app.core import metrics
+from app.db import sweep_uploads as sweeper
+from app.db.sweep_uploads import sweep_uploads
+from app.models import StoredFile
+from app.storage import LocalStorage
+
+HASH = "ab" * 32
+DAY = 24 * 3600
+
+
+def write(store, key, content=b"%PDF-1.4", age=2 * DAY):
+    """File in the store, last modified age seconds ago"""
+    path = store.path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    modified = time.time() - age
+    os.utime(path, (modified, modified))
+    return path
+
+
+class TestSweepUploads:
+    """Test the removal of files no invoice references"""
+    
+    def test_deletes_only_old_unreferenced_files(self, upload_store, db, make_invoice):
+        """Test that referenced, recent and foreign files are all kept"""
+        referenced = write(upload_store, "01/23/0123abcd.pdf")
+        flat_referenced = write(upload_store, "45/67/4567abcd.pdf")
+        counted = write(upload_store, f"ab/ab/{HASH}.pdf")
+        orphan = write(upload_store, "89/ab/89abcdef.pdf", b"%PDF-1.4 orphan")
+        stale_part = write(upload_store, "tmp1234.part", b"partial")
+        recent = write(upload_store, "cd/ef/cdef0123.pdf", age=60)
+        keep = write(upload_store, ".gitkeep")
+        make_invoice(file_url="/uploads/01/23/0123abcd.pdf")
+        make_invoice(file_url="/uploads/4567abcd.pdf")
+        db.add(StoredFile(sha256=HASH, size=8, ref_count=1))
+        db.commit()
+        deleted = metrics.upload_gc_deleted_files.value()
+        reclaimed = metrics.upload_gc_reclaimed_bytes.value()
+        
+        report = sweep_uploads(db.get_bind(), upload_store, grace_seconds=DAY, batch_size=2)
+        
+        assert (report.scanned, report.orphaned, report.deleted) == (7, 2, 2)
+        assert report.reclaimed_bytes == len(b"%PDF-1.4 orphan") + len(b"partial")
+        assert not os.path.exists(orphan) and not os.path.exists(stale_part)
+        assert all(os.path.exists(path) for path in (referenced, flat_referenced, counted, recent, keep))
+        assert metrics.upload_gc_deleted_files.value() == deleted + 2
+        assert metrics.upload_gc_reclaimed_bytes.value() == reclaimed + report.reclaimed_bytes
+    
+    def test_dry_run_deletes_nothing(self, upload_store, db):
+        """Test that a dry run only reports the orphans"""
+        orphan = write(upload_store, "89/ab/89abcdef.pdf")
+        
+        report = sweep_uploads(db.get_bind(), upload_store, grace_seconds=DAY, dry_run=True)
+        
+        assert (report.orphaned, report.orphaned_bytes, report.deleted) == (1, 8, 0)
+        assert os.path.exists(orphan)
+    
+    def test_file_stored_again_after_listing_kept(self, upload_store, db):
+        """Test that a file rewritten between listing and deletion survives"""
+        path = write(upload_store, "89/ab/89abcdef.pdf")
+        
+        class RewritingStore(LocalStorage):
+            def list_objects(self):
+                for item in super().list_objects():
+                    os.utime(path)
+                    yield item
+        
+        report = sweep_uploads(db.get_bind(), RewritingStore(upload_store.root), grace_seconds=DAY)
+        
+        assert (report.orphaned, report.deleted) == (1, 0)
+        assert os.path.exists(path)
+    
+    def test_touched_file_kept(self, upload_store, db):
+        """Test that a file touched between listing and deletion survives, in either layout"""
+        path = write(upload_store, "89/ab/89abcdef.pdf")
+        
+        class TouchingStore(LocalStorage):
+            def list_objects(self):
+                for item in super().list_objects():
+                    assert self.touch("89abcdef.pdf")
+                    yield item
+        
+        report = sweep_uploads(db.get_bind(), TouchingStore(upload_store.root), grace_seconds=DAY)
+        
+        assert (report.orphaned, report.deleted) == (1, 0)
+        assert os.path.exists(path)
+        assert upload_store.touch("missing.pdf") is False
+    
+    def test_cli(self, upload_store, db, monkeypatch, capsys):
+        """Test the sweep command line"""
+        write(upload_store, "89/ab/89abcdef.pdf")
+        monkeypatch.setattr(sweeper, "engine", db.get_bind())
+        
+        sweeper.main(["--dry-run"])
+        assert "Would delete 1 unreferenced files (8 bytes)" in capsys.readouterr().out
+        
+        sweeper.main([])
+        assert "Deleted 1 unreferenced files (8 bytes)" in capsys.readouterr().out
+    
+    @pytest.mark.asyncio
+    async def test_background_sweep(self, upload_store, db, monkeypatch):
+        """Test that the periodic sweep runs until cancelled and survives failures"""
+        import asyncio
+        from app.core.config import Settings
+        
+        orphan = write(upload_store, "89/ab/89abcdef.pdf")
+        runs = []
+        real_sweep = sweeper.sweep_uploads
+        
+        def flaky_sweep(*args):
+            runs.append(args)
+            if len(runs) == 1:
+                raise OSError("store unavailable")
+            return real_sweep(*args)
+        
+        monkeypatch.setattr(sweeper, "sweep_uploads", flaky_sweep)
+        task = asyncio.create_task(sweeper.sweep_periodically(
+            db.get_bind(), Settings(UPLOAD_GC_INTERVAL_SECONDS=0, UPLOAD_GC_GRACE_SECONDS=DAY)
+        ))
+        while len(runs) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        
+        assert not os.path.exists(orphan)
+    
+    def test_expired_idempotency_keys_removed(self, db, admin_user):
+        """Test that the sweeper deletes expired keys, through a writer when given one"""
+        from datetime import datetime, timedelta
+        from app.db.write_queue import InlineWriter, RequestWriter
+        from app.models import IdempotencyKey
+        
+        now = datetime.utcnow()
+        
+        def key(name, expires_in):
+            return IdempotencyKey(key=name, user_id=admin_user.id, fingerprint="f",
+                                  created_at=now, expires_at=now + expires_in)
+        
+        db.add_all([key("old", -timedelta(hours=1)), key("live", timedelta(hours=1))])
+        db.commit()
+        
+        assert sweeper.expire_idempotency_keys(db.get_bind()) == 1
+        db.add(key("older", -timedelta(hours=2)))
+        db.commit()
+        assert sweeper.expire_idempotency_keys(db.get_bind(), RequestWriter(InlineWriter(db))) == 1
+        assert [record.key for record in db.query(IdempotencyKey).all()] == ["live"]
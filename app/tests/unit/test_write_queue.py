@@ -0,0 +1,231 @@
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, select, func
+from app.core import metrics
+from app.db.write_queue import (
+    WriteQueue,
+    WriteQueueFull,
+    InlineWriter,
+    RequestWriter,
+    install_sqlite_savepoints
+)
+from app.models import Base, Company
+from app.services.company_service import CompanyService
+from app.schemas.company import CompanyCreate
+
+
+@pytest.fixture
+def sqlite_file(tmp_path):
+    """Schema on a WAL database file that fails at once on lock contention"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'writer.db'}",
+        connect_args={"check_same_thread": False, "timeout": 0}
+    )
+
+    @event.listens_for(engine, "connect")
+    def wal(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def writer(sqlite_file):
+    """Write queue on the test database"""
+    install_sqlite_savepoints(sqlite_file)
+    queue = WriteQueue(sqlite_file, max_pending=100, max_batch=64)
+    yield queue
+    queue.stop()
+
+
+def create_company(cnpj: str):
+    """Write job creating a company through the service"""
+    def job(db):
+        return CompanyService(db).create_company(CompanyCreate(name=f"Company {cnpj}", cnpj=cnpj))
+    return job
+
+
+def count_companies(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Company)).scalar()
+
+
+def blocking_job(started: threading.Event, release: threading.Event):
+    """Write job that holds the writer until released"""
+    def job(db):
+        started.set()
+        release.wait(5)
+    return job
+
+
+class TestWriteQueue:
+    """Test the single writer and its group commits"""
+
+    def test_job_result_returned_after_commit(self, writer, sqlite_file):
+        """Test that a job's result comes back once its write is committed"""
+        company = writer.run(create_company("1"))
+
+        assert company.id is not None
+        assert company.version == 1
+        assert count_companies(sqlite_file) == 1
+
+    def test_queued_jobs_committed_together(self, writer, sqlite_file):
+        """Test that jobs queued while the writer is busy share one commit"""
+        started, release = threading.Event(), threading.Event()
+        first = writer.submit(blocking_job(started, release))
+        assert started.wait(5)
+
+        batches, jobs = metrics.write_batch_size.count, metrics.write_batch_size.sum
+        futures = [writer.submit(create_company(str(n))) for n in range(10)]
+        release.set()
+        first.result(5)
+
+        assert [future.result(5).cnpj for future in futures] == [str(n) for n in range(10)]
+        # The blocking job's batch, then all ten together
+        assert metrics.write_batch_size.count == batches + 2
+        assert metrics.write_batch_size.sum == jobs + 11
+        assert count_companies(sqlite_file) == 10
+
+    def test_failed_job_rolled_back_alone(self, writer, sqlite_file):
+        """Test that one failing job does not undo the rest of its batch"""
+        started, release = threading.Event(), threading.Event()
+        writer.submit(blocking_job(started, release))
+        assert started.wait(5)
+
+        def add_then_fail(db):
+            db.add(Company(name="Rolled back", cnpj="x"))
+            db.flush()
+            raise HTTPException(status_code=400, detail="Falhou")
+
+        ok = writer.submit(create_company("1"))
+        failed = writer.submit(add_then_fail)
+        also_ok = writer.submit(create_company("2"))
+        release.set()
+
+        assert ok.result(5).cnpj == "1"
+        with pytest.raises(HTTPException):
+            failed.result(5)
+        assert also_ok.result(5).cnpj == "2"
+        assert count_companies(sqlite_file) == 2
+
+    def test_job_rolled_back_whole_after_committing(self, writer, sqlite_file):
+        """Test that a job failing after a first commit leaves nothing behind"""
+        def create_then_fail(db):
+            create_company("1")(db)
+            create_company("1")(db)
+
+        with pytest.raises(HTTPException):
+            writer.run(create_then_fail)
+        writer.run(create_company("2"))
+
+        assert count_companies(sqlite_file) == 1
+
+    def test_full_queue_rejects_jobs(self, sqlite_file):
+        """Test that a bounded queue refuses work instead of growing"""
+        install_sqlite_savepoints(sqlite_file)
+        queue = WriteQueue(sqlite_file, max_pending=1)
+        started, release = threading.Event(), threading.Event()
+        queue.submit(blocking_job(started, release))
+        assert started.wait(5)
+        rejected = metrics.write_queue_rejected.value()
+
+        queue.submit(create_company("1"))
+        with pytest.raises(WriteQueueFull):
+            queue.submit(create_company("2"))
+
+        assert metrics.write_queue_rejected.value() == rejected + 1
+        release.set()
+        queue.stop()
+        assert count_companies(sqlite_file) == 1
+
+    def test_concurrent_writers_never_locked(self, writer, sqlite_file):
+        """Stress: many threads writing at once get no `database is locked`"""
+        errors = []
+
+        def worker(worker_id: int):
+            for n in range(25):
+                try:
+                    writer.run(create_company(f"{worker_id}-{n}"))
+                except Exception as exc:
+                    errors.append(exc)
+
+        threads = [threading.Thread(target=worker, args=(worker_id,)) for worker_id in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert count_companies(sqlite_file) == 16 * 25
+
+    def test_inline_writer_runs_on_request_session(self, db):
+        """Test that the inline writer commits on the given session"""
+        writer = RequestWriter(InlineWriter(db))
+
+        company = writer.run(create_company("1"))
+
+        assert db.get(Company, company.id) is company
+        with pytest.raises(HTTPException):
+            writer.run(create_company("1"))
+
+    def test_run_async_keeps_inline_jobs_off_event_loop(self, db):
+        """Test that async callers run inline jobs in the thread pool"""
+        writer = RequestWriter(InlineWriter(db))
+        threads = []
+
+        def job(session):
+            threads.append(threading.get_ident())
+            return create_company("1")(session)
+
+        async def call():
+            return threading.get_ident(), await writer.run_async(job)
+
+        loop_thread, company = asyncio.run(call())
+
+        assert db.get(Company, company.id) is company
+        assert threads and threads[0] != loop_thread
+
+    def test_run_async_awaits_queued_jobs(self, writer, sqlite_file):
+        """Test that async callers await the queue's result"""
+        company = asyncio.run(RequestWriter(writer).run_async(create_company("1")))
+
+        assert company.name == "Company 1"
+        assert count_companies(sqlite_file) == 1
+
+    def test_build_write_queue_only_for_sqlite_files(self, tmp_path):
+        """Test that the queue is only built for enabled SQLite database files"""
+        from app.core.config import Settings
+        from app.db.database import build_write_queue
+
+        queue = build_write_queue(f"sqlite:///{tmp_path / 'app.db'}", Settings())
+        assert isinstance(queue, WriteQueue)
+        queue.engine.dispose()
+
+        assert build_write_queue("sqlite://", Settings()) is None
+        assert build_write_queue("postgresql://db/app", Settings()) is None
+        assert build_write_queue(
+            f"sqlite:///{tmp_path / 'app.db'}", Settings(DB_WRITE_QUEUE_ENABLED=False)
+        ) is None
+
+    def test_full_queue_returns_503(self, client, auth_headers_admin):
+        """Test that a rejected write is answered as a retryable 503"""
+        from app.main import app
+        from app.db.database import get_writer
+
+        class FullWriter:
+            def run(self, job):
+                raise WriteQueueFull()
+
+        app.dependency_overrides[get_writer] = FullWriter
+        response = client.post(
+            "/api/v1/companies/",
+            json={"name": "Busy", "cnpj": "99.999.999/0001-99"},
+            headers=auth_headers_admin
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
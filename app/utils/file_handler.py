@@ -1,11 +1,142 @@
+import asyncio
+import hashlib
 import os
-import uuid
+import re
+import weakref
+from http import HTTPStatus
 from fastapi import UploadFile, HTTPException, status
-from typing import Optional
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from typing import AsyncIterator, Optional
+from app.core.config import settings
+from app.core.security import verify_download
+from app.storage import LocalStorage, build_storage, shard_path
+from app.storage.base import etag_matches
 
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Where PDFs are kept: this node's UPLOAD_DIR or a shared object store
+storage = build_storage(settings, UPLOAD_DIR)
+
+UPLOAD_URL_PREFIX = "/uploads/"
+PDF_MAGIC = b"%PDF"
+CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+# Content-addressed files never change under their name; others must be revalidated
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+# One semaphore per event loop: asyncio primitives cannot be shared across loops
+_upload_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def upload_slot() -> asyncio.Semaphore:
+    """Semaphore bounding concurrent uploads on the running event loop"""
+    loop = asyncio.get_running_loop()
+    slot = _upload_slots.get(loop)
+    if slot is None:
+        slot = _upload_slots[loop] = asyncio.Semaphore(settings.UPLOAD_MAX_CONCURRENCY)
+    return slot
+
+
+def too_large() -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Arquivo excede o tamanho máximo de {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB"
+    )
+
+
+def not_a_pdf() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Apenas arquivos PDF são permitidos"
+    )
+
+
+def file_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Arquivo não encontrado"
+    )
+
+
+def storage_key(file_url: Optional[str]) -> Optional[str]:
+    """Storage key of an /uploads URL; None for anything else"""
+    if not file_url or not file_url.startswith(UPLOAD_URL_PREFIX):
+        return None
+    return file_url[len(UPLOAD_URL_PREFIX):]
+
+
+def content_url(sha256: str) -> str:
+    """URL of the file stored under a contents hash"""
+    return f"{UPLOAD_URL_PREFIX}{shard_path(f'{sha256}.pdf')}"
+
+
+def is_flat_url(file_url: Optional[str]) -> bool:
+    """Whether a URL points at the flat layout used before sharding"""
+    if not file_url or not file_url.startswith(UPLOAD_URL_PREFIX):
+        return False
+    return "/" not in file_url[len(UPLOAD_URL_PREFIX):]
+
+
+def sharded_url(file_url: str) -> str:
+    """The same file's URL in the sharded layout"""
+    return UPLOAD_URL_PREFIX + shard_path(file_url[len(UPLOAD_URL_PREFIX):])
+
+
+class UploadFiles(StaticFiles):
+    """Static files for /uploads, tagged with their contents hash
+    
+    Content-addressed files are named after their SHA-256, which is a strong
+    ETag by construction; older uuid-named files keep Starlette's stat-based
+    tag. Flat URLs from before sharding still resolve, from either layout,
+    while files are being moved.
+    """
+    
+    def lookup_path(self, path: str):
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is None and os.sep not in path and "/" not in path:
+            return super().lookup_path(shard_path(path))
+        return full_path, stat_result
+    
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        name = os.path.splitext(os.path.basename(full_path))[0]
+        if CONTENT_HASH.match(name):
+            response.headers["etag"] = f'"{name}"'
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def signed_download_url(file_url: Optional[str], now: Optional[float] = None) -> Optional[str]:
+    """Short-lived link to a stored file, or None when there is no file
+    
+    A signed /files link on local storage, a presigned GET on object storage.
+    """
+    key = storage_key(file_url)
+    return storage.download_url(key, now) if key else None
+
+
+class SignedFiles(UploadFiles):
+    """The upload store behind signed, expiring links
+    
+    A request is served when its expires/signature query parameters carry a
+    valid HMAC of the path: no token decode, user or database lookup. Any
+    static server that can compute HMAC-SHA256 can verify the same links.
+    """
+    
+    async def get_response(self, path: str, scope) -> Response:
+        query = QueryParams(scope["query_string"])
+        if not verify_download(path.replace(os.sep, "/"), query.get("expires"), query.get("signature")):
+            return PlainTextResponse("Link de download inválido ou expirado", status_code=status.HTTP_403_FORBIDDEN)
+        return await super().get_response(path, scope)
+
 
 class FileHandler:
     """Utility for handling file uploads"""
@@ -18,47 +149,125 @@ class FileHandler:
         return file.filename.lower().endswith('.pdf')
     
     @staticmethod
-    async def save_file(file: UploadFile) -> str:
-        """Save uploaded file and return the URL"""
-        # Validate file type
+    def _check_declared(file: UploadFile) -> None:
         if not FileHandler.validate_pdf(file):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Apenas arquivos PDF são permitidos"
-            )
+            raise not_a_pdf()
+        if file.size is not None and file.size > settings.UPLOAD_MAX_BYTES:
+            raise too_large()
+    
+    @staticmethod
+    def _check_chunk(chunk: bytes, size: int) -> int:
+        """Validate the next chunk of an upload; returns the size so far"""
+        if size == 0 and not chunk.startswith(PDF_MAGIC):
+            raise not_a_pdf()
+        size += len(chunk)
+        if size > settings.UPLOAD_MAX_BYTES:
+            raise too_large()
+        return size
+    
+    @staticmethod
+    async def inspect(file: UploadFile) -> tuple[str, int]:
+        """Validate an upload and return its SHA-256 and size, then rewind it
         
-        # Generate unique filename
-        file_ext = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
+        Reads chunk by chunk without writing anything, so an upload whose
+        contents are already stored can be recognised before touching disk.
+        """
+        FileHandler._check_declared(file)
+        digest, size = hashlib.sha256(), 0
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            size = FileHandler._check_chunk(chunk, size)
+            digest.update(chunk)
+        if size == 0:
+            raise not_a_pdf()
+        await file.seek(0)
+        return digest.hexdigest(), size
+    
+    @staticmethod
+    async def _validated_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+        size = 0
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            size = FileHandler._check_chunk(chunk, size)
+            yield chunk
+        if size == 0:
+            raise not_a_pdf()
+    
+    @staticmethod
+    async def save_file(file: UploadFile, sha256: Optional[str] = None) -> str:
+        """Save uploaded file under the hash of its contents and return the URL
         
-        # Save file
-        try:
-            contents = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(contents)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao salvar arquivo: {str(e)}"
-            )
+        The upload is streamed in UPLOAD_CHUNK_SIZE chunks to the storage
+        backend, so memory use does not grow with the file size and
+        identical uploads end up in the same file. The hash (the file's key)
+        is computed first unless the caller already has it from inspect().
+        """
+        if sha256 is None:
+            sha256, _ = await FileHandler.inspect(file)
+        return await FileHandler.store(sha256, FileHandler._validated_chunks(file))
+    
+    @staticmethod
+    async def store(sha256: str, chunks: AsyncIterator[bytes]) -> str:
+        """Hand validated chunks to the storage backend under their contents hash"""
+        file_url = content_url(sha256)
+        
+        async with upload_slot():
+            try:
+                await storage.save(storage_key(file_url), chunks)
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Erro ao salvar arquivo: {str(e)}"
+                )
         
-        # Return relative URL
-        return f"/uploads/{unique_filename}"
+        return file_url
     
     @staticmethod
-    def delete_file(file_url: Optional[str]) -> bool:
-        """Delete a file given its URL"""
-        if not file_url or not file_url.startswith("/uploads/"):
-            return False
+    def local_path(file_url: Optional[str]) -> Optional[str]:
+        """Path on disk of an /uploads URL on local storage; None otherwise"""
+        key = storage_key(file_url)
+        if key is None or not isinstance(storage, LocalStorage):
+            return None
+        return storage.path(key)
+    
+    @staticmethod
+    def file_response(
+        file_url: Optional[str],
+        if_none_match: Optional[str] = None,
+        etag: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Response:
+        """Response serving a stored file without reading it in Python
         
-        filename = os.path.basename(file_url)
-        file_path = os.path.join(UPLOAD_DIR, filename)
+        With a known (content hash) ETag, a matching If-None-Match is answered
+        with 304 before touching disk and the file is cached as immutable.
+        With UPLOAD_ACCEL_REDIRECT_PREFIX set, the front proxy is told to send
+        the file itself through X-Accel-Redirect; otherwise FileResponse
+        streams it, handling Range and If-Range requests.
+        """
+        key = storage_key(file_url)
+        if key is None:
+            raise file_not_found()
         
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                return True
-            except Exception:
-                return False
-        return False
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL if etag else REVALIDATE_CACHE_CONTROL}
+        if etag:
+            headers["ETag"] = etag
+            if etag_matches(if_none_match, etag):
+                return NotModifiedResponse(Headers(headers))
+        
+        response = storage.response(key, headers, if_none_match, filename)
+        if response is None:
+            raise file_not_found()
+        return response
+    
+    @staticmethod
+    def touch_file(file_url: Optional[str]) -> bool:
+        """Mark a file as just stored, keeping it from a running sweep; False when missing"""
+        key = storage_key(file_url)
+        return storage.touch(key) if key else False
+    
+    @staticmethod
+    def delete_file(file_url: Optional[str]) -> bool:
+        """Delete a file given its URL"""
+        key = storage_key(file_url)
+        return storage.delete(key) if key else False
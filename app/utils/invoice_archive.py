@@ -0,0 +1,105 @@
+"""
+Streamed ZIP archives of invoice PDFs.
+
+The archive is produced while it is sent. Each PDF is read from the store
+in UPLOAD_CHUNK_SIZE chunks and written by zipfile in store mode (PDFs are
+already compressed) into a sink that is drained after every chunk, so
+neither the archive nor a whole PDF is ever held in memory or written to
+disk. The output cannot seek, so zipfile puts each member's CRC and sizes
+in a data descriptor after its data, which every unzip tool reads.
+"""
+import csv
+import io
+import os
+import zipfile
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Iterator, Optional
+from app.core.config import settings
+from app.utils import file_handler
+from app.utils.file_handler import CONTENT_HASH, storage_key
+
+MANIFEST_NAME = "manifesto.csv"
+MANIFEST_COLUMNS = ("fatura_id", "descricao", "valor", "vencimento", "pago", "arquivo", "sha256", "tamanho")
+
+
+@dataclass(frozen=True)
+class ArchivedInvoice:
+    """What the archive needs of an invoice, read before streaming starts"""
+    id: int
+    description: str
+    amount: Decimal
+    due_date: date
+    is_paid: bool
+    file_url: Optional[str]
+    
+    @property
+    def member_name(self) -> str:
+        return f"{self.due_date.isoformat()}_fatura-{self.id}.pdf"
+
+
+class _Sink:
+    """Write-only, unseekable buffer emptied by the archive generator"""
+    
+    def __init__(self):
+        self._chunks: list[bytes] = []
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def manifest(rows: list[tuple]) -> bytes:
+    """CSV manifest of the archive; the BOM lets spreadsheets read it as UTF-8"""
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(MANIFEST_COLUMNS)
+    writer.writerows(rows)
+    return text.getvalue().encode("utf-8-sig")
+
+
+def stream_invoice_archive(invoices: list[ArchivedInvoice]) -> Iterator[bytes]:
+    """ZIP of the invoices' PDFs followed by a manifest, yielded as it is built
+    
+    Invoices without a file, or whose file is missing from the store, are
+    only listed in the manifest, with an empty file column. Blocking: meant
+    to be iterated by StreamingResponse, which runs it in the thread pool.
+    """
+    store = file_handler.storage
+    sink = _Sink()
+    rows = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for invoice in invoices:
+            key = storage_key(invoice.file_url)
+            chunks = store.read(key, settings.UPLOAD_CHUNK_SIZE) if key else None
+            name, sha256, size = "", "", 0
+            if chunks is not None:
+                name = invoice.member_name
+                stem = os.path.splitext(key.rsplit("/", 1)[-1])[0]
+                sha256 = stem if CONTENT_HASH.match(stem) else ""
+                with archive.open(name, "w") as member:
+                    for chunk in chunks:
+                        member.write(chunk)
+                        size += len(chunk)
+                        yield sink.drain()
+            rows.append((
+                invoice.id,
+                invoice.description,
+                invoice.amount,
+                invoice.due_date.isoformat(),
+                "sim" if invoice.is_paid else "não",
+                name,
+                sha256,
+                size if name else ""
+            ))
+        archive.writestr(MANIFEST_NAME, manifest(rows))
+    yield sink.drain()
@@ -0,0 +1,240 @@
+"""
+Resumable uploads: one PDF sent over several requests.
+
+A session is two files in UPLOAD_SESSION_DIR: ``<id>.json``, what was
+declared when it was created (invoice, user, file name, total size and
+optionally the SHA-256), and ``<id>.part``, the bytes received so far. The
+size of the .part file is the session's offset, so the bytes of a request
+that was cut off halfway count too and the client only resends what is
+missing. A session whose .part has not grown for UPLOAD_SESSION_TTL_SECONDS
+is stale: it is treated as gone and removed by the upload sweeper.
+
+The partial files live on the node that received them; with several nodes,
+UPLOAD_SESSION_DIR must be a shared volume or sessions pinned to a node.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import secrets
+import time
+import weakref
+from http import HTTPStatus
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, Optional
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.utils.file_handler import PDF_MAGIC, UPLOAD_DIR, not_a_pdf
+
+UPLOAD_OFFSET_HEADER = "Upload-Offset"
+SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass(frozen=True)
+class UploadSession:
+    id: str
+    invoice_id: int
+    user_id: int
+    filename: str
+    size: int
+    sha256: Optional[str]
+    created_at: float
+
+
+def session_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Sessão de upload não encontrada ou expirada"
+    )
+
+
+def offset_mismatch(offset: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Offset incorreto: o upload está em {offset} bytes",
+        headers={UPLOAD_OFFSET_HEADER: str(offset)}
+    )
+
+
+class ResumableUploads:
+    """Upload sessions kept in a directory
+    
+    Blocking methods touch the disk and are called from the thread pool;
+    append() and chunks() do their I/O there themselves.
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+        # One lock per session being appended to, so two requests of the
+        # same client cannot both write at the offset they both read
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+    
+    def _path(self, session_id: str, suffix: str) -> str:
+        return os.path.join(self.root, session_id + suffix)
+    
+    def create(
+        self,
+        invoice_id: int,
+        user_id: int,
+        filename: str,
+        size: int,
+        sha256: Optional[str] = None
+    ) -> UploadSession:
+        """Start an empty session"""
+        os.makedirs(self.root, exist_ok=True)
+        session = UploadSession(secrets.token_hex(16), invoice_id, user_id, filename, size, sha256, time.time())
+        open(self._path(session.id, ".part"), "xb").close()
+        with open(self._path(session.id, ".json"), "x") as meta:
+            json.dump(asdict(session), meta)
+        return session
+    
+    def _load(self, session_id: str) -> Optional[UploadSession]:
+        if not SESSION_ID.match(session_id):
+            return None
+        try:
+            with open(self._path(session_id, ".json")) as meta:
+                return UploadSession(**json.load(meta))
+        except (OSError, ValueError, TypeError):
+            return None
+    
+    def get(self, session_id: str, invoice_id: int, user_id: int, now: Optional[float] = None) -> UploadSession:
+        """The caller's session for an invoice; 404 when unknown, someone else's or stale"""
+        session = self._load(session_id)
+        if session is None or (session.invoice_id, session.user_id) != (invoice_id, user_id):
+            raise session_not_found()
+        if self.expires_at(session) <= (time.time() if now is None else now):
+            self.discard(session.id)
+            raise session_not_found()
+        return session
+    
+    def offset(self, session: UploadSession) -> int:
+        """Bytes received so far"""
+        try:
+            return os.path.getsize(self._path(session.id, ".part"))
+        except FileNotFoundError:
+            return 0
+    
+    def expires_at(self, session: UploadSession) -> float:
+        """When the session goes stale unless more bytes arrive"""
+        try:
+            modified = os.path.getmtime(self._path(session.id, ".part"))
+        except FileNotFoundError:
+            modified = session.created_at
+        return modified + settings.UPLOAD_SESSION_TTL_SECONDS
+    
+    def status(self, session: UploadSession) -> dict:
+        return {
+            "id": session.id,
+            "invoice_id": session.invoice_id,
+            "offset": self.offset(session),
+            "size": session.size,
+            "expires_at": datetime.fromtimestamp(self.expires_at(session), timezone.utc)
+        }
+    
+    async def append(self, session: UploadSession, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """Append a request's bytes at offset, which must be the current one; returns the new offset
+        
+        Every chunk is on disk once written, so a request that breaks off
+        still moves the offset forward for the next attempt.
+        """
+        lock = self._locks.get(session.id)
+        if lock is None:
+            lock = self._locks[session.id] = asyncio.Lock()
+        
+        async with lock:
+            current = await run_in_threadpool(self.offset, session)
+            if offset != current:
+                raise offset_mismatch(current)
+            target = await run_in_threadpool(open, self._path(session.id, ".part"), "ab")
+            try:
+                async for chunk in chunks:
+                    if current == 0 and chunk[:len(PDF_MAGIC)] != PDF_MAGIC[:len(chunk)]:
+                        raise not_a_pdf()
+                    if current + len(chunk) > session.size:
+                        raise HTTPException(
+                            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Dados além do tamanho declarado de {session.size} bytes"
+                        )
+                    await run_in_threadpool(target.write, chunk)
+                    current += len(chunk)
+            finally:
+                await run_in_threadpool(target.close)
+        return current
+    
+    def _read(self, session: UploadSession) -> Iterator[bytes]:
+        with open(self._path(session.id, ".part"), "rb") as source:
+            while chunk := source.read(settings.UPLOAD_CHUNK_SIZE):
+                yield chunk
+    
+    def inspect(self, session: UploadSession) -> tuple[str, int]:
+        """Validate a finished upload and return its SHA-256 and size
+        
+        A file that is not a PDF or does not match the declared hash cannot
+        be completed by sending more bytes, so its session is discarded.
+        """
+        size = self.offset(session)
+        if size < session.size:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload incompleto: {size} de {session.size} bytes recebidos",
+                headers={UPLOAD_OFFSET_HEADER: str(size)}
+            )
+        digest, is_pdf = hashlib.sha256(), None
+        for chunk in self._read(session):
+            if is_pdf is None:
+                is_pdf = chunk.startswith(PDF_MAGIC)
+            digest.update(chunk)
+        if not is_pdf:
+            self.discard(session.id)
+            raise not_a_pdf()
+        sha256 = digest.hexdigest()
+        if session.sha256 and sha256 != session.sha256:
+            self.discard(session.id)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Conteúdo recebido não confere com o sha256 informado"
+            )
+        return sha256, size
+    
+    async def chunks(self, session: UploadSession) -> AsyncIterator[bytes]:
+        """The received bytes, read off the event loop"""
+        source = await run_in_threadpool(open, self._path(session.id, ".part"), "rb")
+        try:
+            while chunk := await run_in_threadpool(source.read, settings.UPLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await run_in_threadpool(source.close)
+    
+    def discard(self, session_id: str) -> None:
+        """Remove a session and its bytes"""
+        for suffix in (".part", ".json"):
+            try:
+                os.remove(self._path(session_id, suffix))
+            except FileNotFoundError:
+                pass
+    
+    def expire(self, now: Optional[float] = None) -> int:
+        """Remove the stale sessions; returns how many"""
+        now = time.time() if now is None else now
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return 0
+        expired = 0
+        for name in names:
+            session_id, suffix = os.path.splitext(name)
+            if suffix != ".json":
+                continue
+            session = self._load(session_id)
+            if session is None or self.expires_at(session) <= now:
+                self.discard(session_id)
+                expired += 1
+        return expired
+
+
+resumable_uploads = ResumableUploads(
+    settings.UPLOAD_SESSION_DIR or os.path.join(UPLOAD_DIR, "..", "upload-sessions")
+)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare the sync and async invoice read endpoints under concurrency.
+
+Uso: python benchmarks/bench_async_vs_sync.py --requests 2000 --concurrency 200
+
+Both stacks run in the same process against a throwaway SQLite database.
+Sync endpoints run in AnyIO's worker threads (default limit 40), so their
+concurrency is capped by the thread limit; async endpoints are only bounded
+by the database. With more worker threads than pooled connections the sync
+path can stall on pool checkout, which shows up as errors below.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="dk-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+import anyio.to_thread  # noqa: E402
+import httpx  # noqa: E402
+from datetime import date, timedelta  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.db.database import engine, SessionLocal  # noqa: E402
+from app.models import Base, User, Company, Invoice, RoleEnum  # noqa: E402
+from app.core.security import get_password_hash, create_access_token  # noqa: E402
+
+PATHS = {
+    "sync": "/api/v1/invoices/?month={month}&year={year}",
+    "async": "/api/v1/async/invoices/?month={month}&year={year}",
+}
+
+
+def seed(invoices_per_company: int) -> str:
+    """Create companies, an admin and invoices; return an admin token"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        admin = User(
+            email="bench@example.com",
+            hashed_password=get_password_hash("bench"),
+            role=RoleEnum.admin
+        )
+        companies = [Company(name=f"Company {i}", cnpj=f"00.000.000/000{i}-00") for i in range(5)]
+        db.add_all([admin, *companies])
+        db.commit()
+        start = date.today().replace(day=1)
+        db.add_all([
+            Invoice(
+                company_id=company.id,
+                description=f"Invoice {n}",
+                amount=100 + n,
+                due_date=start + timedelta(days=n % 28),
+                created_by=admin.id
+            )
+            for company in companies
+            for n in range(invoices_per_company)
+        ])
+        db.commit()
+        return create_access_token({"sub": str(admin.id), "role": admin.role.value})
+    finally:
+        db.close()
+
+
+async def run(label: str, total: int, concurrency: int, threads: int, headers: dict) -> dict:
+    today = date.today()
+    path = PATHS[label].format(month=today.month, year=today.year)
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, headers=headers)
+                    response.raise_for_status()
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+        await one()  # warm up
+        latencies.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "label": label,
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=40, help="AnyIO worker threads")
+    parser.add_argument("--invoices", type=int, default=20, help="invoices per company")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {seed(args.invoices)}"}
+    print(f"{args.requests} requests, concurrency {args.concurrency}, db {DB_PATH}")
+    for label in ("sync", "async"):
+        result = asyncio.run(run(label, args.requests, args.concurrency, args.threads, headers))
+        print(
+            f"{result['label']:>6}: {result['rps']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  "
+            f"errors {result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Measure the Python overhead of the hot repository lookups.
+
+Uso: python benchmarks/bench_cached_statements.py --calls 5000
+
+Each lookup runs against an in-memory SQLite database in two ways:
+
+- query: rebuilt through the legacy Query API on every call (how the
+  repositories used to do it)
+- prebuilt: the module-level statements with bind parameters from
+  app/repositories (built once, compiled once)
+
+Rows are expunged between calls so every call really executes SQL. Reports
+microseconds per call and the saving; the SQL itself is identical.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from datetime import date  # noqa: E402
+from sqlalchemy import create_engine, extract  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.tenancy import TenantScope  # noqa: E402
+from app.models import Base, Company, Invoice, User, RoleEnum  # noqa: E402
+from app.repositories.company_repository import CompanyRepository  # noqa: E402
+from app.repositories.invoice_repository import InvoiceRepository  # noqa: E402
+from app.repositories.user_repository import UserRepository  # noqa: E402
+
+
+def seed(db) -> tuple[Company, User, Invoice]:
+    company = Company(name="Bench", cnpj="00.000.000/0001-00")
+    user = User(email="bench@example.com", hashed_password="-", role=RoleEnum.user)
+    db.add_all([company, user])
+    db.flush()
+    user.company_id = company.id
+    invoice = Invoice(
+        company_id=company.id,
+        description="Bench",
+        amount=100,
+        due_date=date.today(),
+        created_by=user.id
+    )
+    db.add(invoice)
+    db.commit()
+    return company, user, invoice
+
+
+def timed(db, calls: int, lookup) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        lookup()
+        db.expunge_all()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    company, user, invoice = seed(db)
+    scope = TenantScope(company_id=company.id, restricted=True)
+    today = date.today()
+
+    users = UserRepository(db)
+    companies = CompanyRepository(db)
+    invoices = InvoiceRepository(db, scope)
+
+    lookups = {
+        "get_by_email": (
+            lambda: db.query(User).filter(User.email == user.email).first(),
+            lambda: users.get_by_email(user.email),
+        ),
+        "get_by_cnpj": (
+            lambda: db.query(Company).filter(Company.cnpj == company.cnpj).first(),
+            lambda: companies.get_by_cnpj(company.cnpj),
+        ),
+        "scoped get": (
+            lambda: db.query(Invoice).filter(
+                Invoice.company_id == company.id, Invoice.id == invoice.id
+            ).first(),
+            lambda: invoices.get(invoice.id),
+        ),
+        "month lookup": (
+            lambda: db.query(Invoice).filter(
+                Invoice.company_id == company.id,
+                extract('month', Invoice.due_date) == today.month,
+                extract('year', Invoice.due_date) == today.year
+            ).all(),
+            lambda: invoices.get_by_month_year(today.month, today.year),
+        ),
+    }
+
+    print(f"{'lookup':>13} {'query us':>9} {'prebuilt us':>12} {'saved':>7}")
+    for name, (legacy, prebuilt) in lookups.items():
+        timed(db, 100, legacy)
+        timed(db, 100, prebuilt)
+        before = timed(db, args.calls, legacy)
+        after = timed(db, args.calls, prebuilt)
+        print(f"{name:>13} {before:9.1f} {after:12.1f} {(before - after) / before:7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Compare reader and writer throughput with default and read-only sessions.
+
+Uso: python benchmarks/bench_read_only_sessions.py --readers 4 --seconds 3
+
+For each mode, on a fresh WAL database seeded with invoices, one writer
+thread commits single-row updates while reader threads run the invoice
+listing query through sessions of that mode:
+
+- default: a regular session (autoflush, expire on commit), committed at the
+  end of the request like the write routes
+- read_only: a ReadSessionLocal-style session (app/db/read_only.py), closed
+  without committing
+
+Reports reads/s, writes/s, `database is locked` errors and the WAL size left
+after the run (large values mean checkpoints were starved by readers).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from datetime import date, timedelta  # noqa: E402
+from sqlalchemy import create_engine, extract, select, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.config import Settings  # noqa: E402
+from app.db.database import install_sqlite_pragmas  # noqa: E402
+from app.db.read_only import READ_ONLY_KEY, install_read_only_mode, install_query_only_reset  # noqa: E402
+from app.models import Base, Company, Invoice, User, RoleEnum  # noqa: E402
+
+MODES = ("default", "read_only")
+
+
+def make_engine(mode: str, directory: str, invoices: int):
+    path = os.path.join(directory, f"{mode}.db")
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=16
+    )
+    install_sqlite_pragmas(engine, Settings(SQLITE_PRAGMA_PROFILE="balanced"))
+    install_query_only_reset(engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = sessionmaker(bind=engine)()
+    company = Company(name="Bench", cnpj="00.000.000/0001-00")
+    admin = User(email="bench@example.com", hashed_password="-", role=RoleEnum.admin)
+    db.add_all([company, admin])
+    db.flush()
+    start = date.today().replace(day=1)
+    db.add_all([
+        Invoice(
+            company_id=company.id,
+            description=f"Invoice {n}",
+            amount=100 + n,
+            due_date=start + timedelta(days=n % 28),
+            created_by=admin.id
+        )
+        for n in range(invoices)
+    ])
+    db.commit()
+    db.close()
+    return engine, path
+
+
+def make_factory(mode: str, engine):
+    if mode == "read_only":
+        factory = sessionmaker(
+            bind=engine,
+            autoflush=False,
+            expire_on_commit=False,
+            info={READ_ONLY_KEY: True}
+        )
+        install_read_only_mode(factory)
+        return factory
+    return sessionmaker(bind=engine)
+
+
+def run(mode: str, engine, readers: int, seconds: float) -> tuple[float, float, int]:
+    factory = make_factory(mode, engine)
+    writer_factory = sessionmaker(bind=engine)
+    today = date.today()
+    listing = (
+        select(Invoice)
+        .where(extract("month", Invoice.due_date) == today.month)
+        .where(extract("year", Invoice.due_date) == today.year)
+        .order_by(Invoice.due_date)
+    )
+    stop = time.perf_counter() + seconds
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def count(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def writer():
+        n = 0
+        while time.perf_counter() < stop:
+            db = writer_factory()
+            try:
+                db.execute(
+                    update(Invoice).where(Invoice.id == n % 100 + 1).values(amount=n)
+                )
+                db.commit()
+                count("writes")
+            except OperationalError:
+                db.rollback()
+                count("errors")
+            finally:
+                db.close()
+            n += 1
+
+    def reader():
+        while time.perf_counter() < stop:
+            db = factory()
+            try:
+                db.execute(listing).scalars().all()
+                if mode == "default":
+                    db.commit()
+                count("reads")
+            except OperationalError:
+                count("errors")
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts["reads"] / seconds, counts["writes"] / seconds, counts["errors"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="dk-readonly-")
+    print(f"{'mode':>9} {'reads/s':>10} {'writes/s':>10} {'errors':>7} {'wal KiB':>9}")
+    for mode in MODES:
+        engine, path = make_engine(mode, directory, args.invoices)
+        reads, writes, errors = run(mode, engine, args.readers, args.seconds)
+        wal = path + "-wal"
+        wal_kib = os.path.getsize(wal) // 1024 if os.path.exists(wal) else 0
+        engine.dispose()
+        print(f"{mode:>9} {reads:10.0f} {writes:10.0f} {errors:7d} {wal_kib:9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Compare the SQLite pragma profiles from app/db/sqlite_pragmas.py.
+
+Uso: python benchmarks/bench_sqlite_pragmas.py --writes 2000 --seconds 3
+
+For each profile, on a fresh database file:
+- writes: small single-row transactions, one commit each (fsync cost)
+- reads: primary-key lookups
+- mixed: one writer thread committing while a reader thread queries;
+  reports reader throughput and `database is locked` errors
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.core.config import Settings  # noqa: E402
+from app.db.database import install_sqlite_pragmas  # noqa: E402
+from app.db.sqlite_pragmas import PRAGMA_PROFILES  # noqa: E402
+
+
+def make_engine(profile: str, directory: str):
+    path = os.path.join(directory, f"{profile}.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    install_sqlite_pragmas(engine, Settings(SQLITE_PRAGMA_PROFILE=profile))
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE invoices (id INTEGER PRIMARY KEY, description TEXT, amount NUMERIC)"
+        ))
+    return engine
+
+
+def bench_writes(engine, count: int) -> float:
+    started = time.perf_counter()
+    for n in range(count):
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO invoices (description, amount) VALUES (:d, :a)"),
+                {"d": f"Invoice {n}", "a": n}
+            )
+    return count / (time.perf_counter() - started)
+
+
+def bench_reads(engine, count: int) -> float:
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        for n in range(count):
+            conn.execute(text("SELECT * FROM invoices WHERE id = :id"), {"id": n % 500 + 1}).first()
+    return count / (time.perf_counter() - started)
+
+
+def bench_mixed(engine, seconds: float) -> tuple[float, float, int]:
+    stop = time.perf_counter() + seconds
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+
+    def writer():
+        while time.perf_counter() < stop:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO invoices (description, amount) VALUES ('mixed', 1)")
+                    )
+                counts["writes"] += 1
+            except OperationalError:
+                counts["errors"] += 1
+
+    def reader():
+        while time.perf_counter() < stop:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT count(*), sum(amount) FROM invoices")).first()
+                counts["reads"] += 1
+            except OperationalError:
+                counts["errors"] += 1
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts["reads"] / seconds, counts["writes"] / seconds, counts["errors"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--profiles", nargs="*", default=list(PRAGMA_PROFILES))
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="dk-pragmas-")
+    print(f"{'profile':>9} {'writes/s':>10} {'reads/s':>10} {'mixed r/s':>10} {'mixed w/s':>10} {'errors':>7}")
+    for profile in args.profiles:
+        engine = make_engine(profile, directory)
+        writes = bench_writes(engine, args.writes)
+        reads = bench_reads(engine, args.reads)
+        mixed_reads, mixed_writes, errors = bench_mixed(engine, args.seconds)
+        engine.dispose()
+        print(
+            f"{profile:>9} {writes:10.0f} {reads:10.0f} "
+            f"{mixed_reads:10.0f} {mixed_writes:10.0f} {errors:7d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compare concurrent SQLite writes with and without the single-writer queue.
+
+Uso: python benchmarks/bench_write_queue.py --threads 16 --writes 100
+
+Each thread creates companies through CompanyService, one commit per write:
+
+- direct: every thread uses its own session, like request sessions do
+- queue: every write is a job on app/db/write_queue.py's WriteQueue
+
+Both run on a fresh WAL database with the configured busy timeout
+(--busy-timeout, ms). Reports writes/s, `database is locked` errors and the
+mean batch size committed by the writer.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core import metrics  # noqa: E402
+from app.core.config import Settings  # noqa: E402
+from app.db.database import install_sqlite_pragmas  # noqa: E402
+from app.db.write_queue import WriteQueue, install_sqlite_savepoints  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.schemas.company import CompanyCreate  # noqa: E402
+from app.services.company_service import CompanyService  # noqa: E402
+
+
+def make_engine(mode: str, directory: str, busy_timeout: int):
+    engine = create_engine(
+        f"sqlite:///{os.path.join(directory, mode + '.db')}",
+        connect_args={"check_same_thread": False},
+        pool_size=64
+    )
+    install_sqlite_pragmas(engine, Settings(SQLITE_BUSY_TIMEOUT=busy_timeout))
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def create_company(db, cnpj: str):
+    return CompanyService(db).create_company(CompanyCreate(name=f"Company {cnpj}", cnpj=cnpj))
+
+
+def run(mode: str, engine, threads: int, writes: int) -> tuple[float, int]:
+    errors = []
+    if mode == "queue":
+        install_sqlite_savepoints(engine)
+        writer = WriteQueue(engine)
+
+        def write(cnpj: str):
+            writer.run(lambda db: create_company(db, cnpj))
+    else:
+        factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+        def write(cnpj: str):
+            db = factory()
+            try:
+                create_company(db, cnpj)
+            finally:
+                db.close()
+
+    def worker(worker_id: int):
+        for n in range(writes):
+            try:
+                write(f"{worker_id}-{n}")
+            except OperationalError as exc:
+                errors.append(exc)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(worker_id,)) for worker_id in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if mode == "queue":
+        writer.stop()
+    return (threads * writes - len(errors)) / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=100)
+    parser.add_argument("--busy-timeout", type=int, default=100)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="dk-writer-")
+    print(f"{'mode':>7} {'writes/s':>10} {'errors':>7} {'batch':>6}")
+    for mode in ("direct", "queue"):
+        engine = make_engine(mode, directory, args.busy_timeout)
+        batches, jobs = metrics.write_batch_size.count, metrics.write_batch_size.sum
+        rate, errors = run(mode, engine, args.threads, args.writes)
+        engine.dispose()
+        count = metrics.write_batch_size.count - batches
+        batch = (metrics.write_batch_size.sum - jobs) / count if count else 1
+        print(f"{mode:>7} {rate:10.0f} {errors:7d} {batch:6.1f}")
+
+
+if __name__ == "__main__":
+    main()